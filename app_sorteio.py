@@ -1,14 +1,57 @@
 import streamlit as st
-import pandas as pd
-import random
+import secrets
+from collections import Counter, deque
 from pathlib import Path
-import json
 from datetime import datetime
 
+import armazenamento
+import dados
+import exportacao
+import medicao
+from cadastro import CALOURO, REGRAS_PADRAO, VETERANO, rotulo_turma
+from sorteador import (
+    contar_por_turma,
+    gerador,
+    indexar_grupos,
+    melhor_de_n,
+    minimizar_repeticoes,
+    nova_semente,
+    reparar_grupos,
+    sortear_grupos,
+    verificar_regras,
+)
+
 st.set_page_config(page_title="Sorteio de Grupos", page_icon="🎲", layout="wide")
 
-# Arquivo para armazenar grupos
-GRUPOS_FILE = Path(__file__).parent / "grupos_salvos.json"
+# Banco para armazenar grupos (o antigo grupos_salvos.json é migrado automaticamente)
+GRUPOS_FILE = armazenamento.ARQUIVO_PADRAO
+
+# Listas de chamada (um CSV por turno)
+DIRETORIO_LISTAS = Path(__file__).parent / "dados_chamada"
+
+# Sorteios por página no histórico
+SORTEIOS_POR_PAGINA = 10
+
+# Quantas execuções o painel de tempos mostra
+MAX_EXECUCOES_MEDIDAS = 20
+
+# Acima disso os grupos são exibidos em uma tabela única, e não em cartões
+MAX_GRUPOS_EM_CARTOES = 30
+ALTURA_TABELA_GRUPOS = 500
+
+# Alunos sugeridos pela busca dos grupos manuais
+MAX_SUGESTOES_MANUAIS = 20
+
+# Colegas mais frequentes mostrados nas estatísticas de um aluno
+LIMITE_PARCEIROS = 5
+
+# Rótulo de cada situação de Cadastro.situacao_grupos
+SITUACOES = {
+    'valido': "✅ Válido",
+    'sem_calouro': "❌ Sem calouro",
+    'sozinho': "❌ Aluno sozinho",
+    'fora_das_cotas': "⚠️ Fora das cotas",
+}
 
 # Credenciais de autenticação
 CREDENTIALS = {
@@ -53,217 +96,196 @@ def logout():
     st.rerun()
 
 # Funções para salvar e carregar grupos
-def salvar_grupos(grupos, nome_sorteio, grupos_manuais=None):
-    """Salva os grupos em arquivo JSON"""
-    dados = []
-    if GRUPOS_FILE.exists():
-        with open(GRUPOS_FILE, 'r', encoding='utf-8') as f:
-            dados = json.load(f)
-    
-    # Criar novo registro
-    registro = {
-        'id': len(dados) + 1,
-        'nome': nome_sorteio,
-        'data': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-        'grupos_automaticos': grupos,
-        'grupos_manuais': grupos_manuais if grupos_manuais else []
-    }
-    
-    dados.append(registro)
-    
-    with open(GRUPOS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(dados, f, ensure_ascii=False, indent=2)
-    
-    return registro['id']
+def salvar_grupos(grupos, nome_sorteio, grupos_manuais=None, semente=None, fluxo=None):
+    """Salva os grupos no armazenamento de sorteios"""
+    with medicao.etapa('armazenamento.salvar'):
+        return armazenamento.salvar(GRUPOS_FILE, grupos, nome_sorteio, grupos_manuais, semente, fluxo)
 
 def carregar_grupos():
     """Carrega todos os sorteios salvos"""
-    if GRUPOS_FILE.exists():
-        with open(GRUPOS_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return []
+    with medicao.etapa('armazenamento.carregar'):
+        return armazenamento.carregar(GRUPOS_FILE)
+
+def listar_sorteios(filtro_nome=None, data_inicio=None, data_fim=None, limite=10, deslocamento=0):
+    """Resumos paginados dos sorteios salvos (sem os grupos) e o total filtrado"""
+    with medicao.etapa('armazenamento.listar'):
+        return armazenamento.listar(GRUPOS_FILE, filtro_nome, data_inicio, data_fim, limite, deslocamento)
+
+def carregar_sorteio(sorteio_id):
+    """Carrega um único sorteio salvo, com os grupos"""
+    with medicao.etapa('armazenamento.carregar_sorteio'):
+        return armazenamento.carregar_sorteio(GRUPOS_FILE, sorteio_id)
 
 def buscar_aluno(nome_parcial):
     """Busca em qual grupo um aluno está"""
-    sorteios = carregar_grupos()
-    resultados = []
-    
-    nome_parcial = nome_parcial.lower().strip()
-    
-    for sorteio in sorteios:
-        # Buscar nos grupos automáticos
-        for idx, grupo in enumerate(sorteio['grupos_automaticos']):
-            for aluno in grupo:
-                if nome_parcial in aluno.lower():
-                    resultados.append({
-                        'sorteio_id': sorteio['id'],
-                        'sorteio_nome': sorteio['nome'],
-                        'data': sorteio['data'],
-                        'tipo_grupo': 'Automático',
-                        'numero_grupo': idx + 1,
-                        'aluno': aluno,
-                        'grupo_completo': grupo
-                    })
-        
-        # Buscar nos grupos manuais
-        for idx, grupo in enumerate(sorteio['grupos_manuais']):
-            for aluno in grupo:
-                if nome_parcial in aluno.lower():
-                    resultados.append({
-                        'sorteio_id': sorteio['id'],
-                        'sorteio_nome': sorteio['nome'],
-                        'data': sorteio['data'],
-                        'tipo_grupo': 'Manual',
-                        'numero_grupo': idx + 1,
-                        'aluno': aluno,
-                        'grupo_completo': grupo
-                    })
-    
-    return resultados
+    with medicao.etapa('armazenamento.buscar'):
+        return armazenamento.buscar(GRUPOS_FILE, nome_parcial)
 
 def deletar_sorteio(sorteio_id):
     """Deleta um sorteio salvo"""
-    sorteios = carregar_grupos()
-    sorteios = [s for s in sorteios if s['id'] != sorteio_id]
-    
-    with open(GRUPOS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(sorteios, f, ensure_ascii=False, indent=2)
-    
-    return True
+    with medicao.etapa('armazenamento.deletar'):
+        return armazenamento.deletar(GRUPOS_FILE, sorteio_id)
 
-# Função para carregar dados
-@st.cache_data
-def carregar_dados(arquivo):
-    df = pd.read_csv(arquivo, sep=';', encoding='utf-8')
-    df = df[['Nome', 'Turma']].copy()
-    df['Nome'] = df['Nome'].str.strip()
-    df['Turma'] = df['Turma'].astype(int)
-    return df
-
-# Função para validar grupos
-def validar_grupo(grupo, df):
-    """Verifica se o grupo tem pelo menos 1 calouro (Turma 1)"""
-    turmas = df[df['Nome'].isin(grupo)]['Turma'].values
-    return 1 in turmas
-
-# Função para realizar sorteio automático
-def sortear_grupos(df, tamanho_grupo=4, grupos_manuais=None):
-    """Sorteia grupos garantindo que cada grupo tenha pelo menos 1 calouro
-    e que nenhum calouro fique sozinho"""
-    
-    # Separar alunos em calouros e veteranos
-    calouros = df[df['Turma'] == 1]['Nome'].tolist()
-    veteranos = df[df['Turma'] == 2]['Nome'].tolist()
-    
-    # Remover alunos que já estão em grupos manuais
-    if grupos_manuais:
-        alunos_manuais = [aluno for grupo in grupos_manuais for aluno in grupo]
-        calouros = [c for c in calouros if c not in alunos_manuais]
-        veteranos = [v for v in veteranos if v not in alunos_manuais]
-    
-    # Embaralhar listas
-    random.shuffle(calouros)
-    random.shuffle(veteranos)
-    
-    grupos = []
-    total_grupos = len(calouros)
-    
-    # Criar grupos começando com um calouro em cada
-    for i in range(total_grupos):
-        grupo = [calouros[i]]
-        
-        # Adicionar veteranos até completar o grupo
-        while len(grupo) < tamanho_grupo and veteranos:
-            grupo.append(veteranos.pop(0))
-        
-        grupos.append(grupo)
-    
-    # Distribuir veteranos restantes nos grupos
-    idx = 0
-    while veteranos:
-        if len(grupos[idx]) < tamanho_grupo:
-            grupos[idx].append(veteranos.pop(0))
-        idx = (idx + 1) % len(grupos)
-    
-    # Verificar e redistribuir grupos muito pequenos (menos de 2 pessoas)
-    # Calouros sozinhos devem ser redistribuídos
-    grupos_finais = []
-    calouros_sozinhos = []
-    
-    for grupo in grupos:
-        if len(grupo) == 1:
-            # Se é um calouro sozinho, guardar para redistribuir
-            calouros_sozinhos.append(grupo[0])
-        else:
-            grupos_finais.append(grupo)
-    
-    # Redistribuir calouros que ficaram sozinhos
-    # Adicionar aos grupos existentes, priorizando os menores
-    for calouro in calouros_sozinhos:
-        # Ordenar grupos por tamanho (menores primeiro)
-        grupos_finais.sort(key=lambda x: len(x))
-        # Adicionar ao menor grupo
-        if grupos_finais:
-            grupos_finais[0].append(calouro)
+def compactar_historico(dias):
+    """Move os sorteios com mais de `dias` dias para um segmento de arquivo"""
+    with medicao.etapa('armazenamento.compactar'):
+        return armazenamento.compactar(GRUPOS_FILE, dias)
+
+def exportar_grupos(grupos, lista, grupos_manuais, formato):
+    """Gerador do arquivo de um sorteio da sessão, chamado só no download"""
+    def gerar():
+        return exportacao.exportar(exportacao.tabela_grupos(grupos, lista, grupos_manuais), formato)
+    return gerar
+
+def exportar_historico(sorteio_id, lista, formato):
+    """Gerador do arquivo de um sorteio salvo (ou de todos, arquivados inclusive,
+    com `sorteio_id` None), lido do armazenamento só no download"""
+    def gerar():
+        if sorteio_id is None:
+            sorteios = armazenamento.todos_os_sorteios(GRUPOS_FILE)
         else:
-            # Se não houver grupos, criar um novo (caso extremo)
-            grupos_finais.append([calouro])
-    
-    return grupos_finais
+            sorteio = armazenamento.carregar_sorteio(GRUPOS_FILE, sorteio_id)
+            sorteios = [] if sorteio is None else [sorteio]
+        return exportacao.exportar(exportacao.tabela_sorteios(sorteios, lista), formato)
+    return gerar
+
+def listar_segmentos():
+    """Resumos dos segmentos de arquivo do histórico"""
+    with medicao.etapa('armazenamento.segmentos'):
+        return armazenamento.segmentos(GRUPOS_FILE)
+
+def carregar_pares():
+    """Matriz esparsa de quantas vezes cada dupla já ficou no mesmo grupo"""
+    with medicao.etapa('armazenamento.carregar_pares'):
+        return armazenamento.carregar_pares(GRUPOS_FILE)
+
+def carregar_participacoes(nome_parcial=None):
+    """Participações de cada aluno nos sorteios salvos (contagens já agregadas)"""
+    with medicao.etapa('armazenamento.participacoes'):
+        return armazenamento.participacoes(GRUPOS_FILE, nome_parcial)
+
+def estatisticas_aluno(nome):
+    """Participações de um aluno e os colegas com quem mais ficou no mesmo grupo"""
+    with medicao.etapa('armazenamento.estatisticas_aluno'):
+        return armazenamento.estatisticas_aluno(GRUPOS_FILE, nome, LIMITE_PARCEIROS)
+
+def reconstruir_estatisticas():
+    """Recalcula as estatísticas a partir do histórico e informa as divergências"""
+    with medicao.etapa('armazenamento.reconstruir_estatisticas'):
+        return armazenamento.reconstruir_estatisticas(GRUPOS_FILE)
+
+# Função para carregar dados (cache LRU por conteúdo, compartilhado entre sessões)
+def carregar_dados(arquivo):
+    return dados.carregar_lista(arquivo)
+
+def listas_de_chamada():
+    """Listas de chamada de dados_chamada/, relidas quando o diretório muda"""
+    return dados.listas_disponiveis(DIRETORIO_LISTAS)
+
+def carregar_cadastro(arquivo):
+    """Cadastro nome -> turma, construído uma vez para cada arquivo carregado"""
+    return dados.carregar_cadastro(arquivo)
 
 # Função para exibir grupos
-def exibir_grupos(grupos, df, titulo="Grupos Formados"):
+def descrever_turma(turma):
+    """Emoji e nome curto da turma de um aluno"""
+    if turma == CALOURO:
+        return "🆕", "Calouro"
+    if turma == VETERANO:
+        return "👤", "Veterano"
+    return "🎓", f"Turma {turma}"
+
+def exibir_grupos(grupos, cadastro, titulo="Grupos Formados", regras=None):
     st.subheader(titulo)
-    
+    # Grupos esvaziados por um ajuste não aparecem, e os demais mantêm o número anunciado
+    numeros = [idx + 1 for idx, grupo in enumerate(grupos) if grupo]
+    grupos = [grupo for grupo in grupos if grupo]
+    situacoes = cadastro.situacao_grupos(grupos, regras)
+    
+    modo = st.session_state.get('modo_exibicao', 'Automático')
+    if modo == 'Tabela' or (modo == 'Automático' and len(grupos) > MAX_GRUPOS_EM_CARTOES):
+        exibir_tabela_grupos(grupos, numeros, cadastro, situacoes, titulo)
+    else:
+        exibir_cartoes_grupos(grupos, numeros, cadastro, situacoes)
+
+def exibir_cartoes_grupos(grupos, numeros, cadastro, situacoes):
+    """Um cartão por grupo, em três colunas"""
     cols = st.columns(min(3, len(grupos)))
     
-    for idx, grupo in enumerate(grupos):
+    for idx, (grupo, numero, situacao) in enumerate(zip(grupos, numeros, situacoes)):
         with cols[idx % 3]:
-            st.markdown(f"### 🎯 Grupo {idx + 1}")
+            st.markdown(f"### 🎯 Grupo {numero}")
             
             for aluno in grupo:
-                turma = df[df['Nome'] == aluno]['Turma'].values[0]
-                emoji = "🆕" if turma == 1 else "👤"
-                turma_text = "Calouro" if turma == 1 else "Veterano"
+                emoji, turma_text = descrever_turma(cadastro.turma(aluno))
                 st.markdown(f"{emoji} **{aluno}** ({turma_text})")
             
             # Validação
-            tem_calouro = validar_grupo(grupo, df)
             tamanho = len(grupo)
             
-            if tem_calouro and tamanho >= 2:
+            if situacao == 'valido':
                 st.success(f"✅ Grupo válido ({tamanho} membros)")
-            elif not tem_calouro:
+            elif situacao == 'sem_calouro':
                 st.error("❌ Grupo sem calouro!")
-            elif tamanho == 1:
-                # Verificar se é veterano
-                turma = df[df['Nome'] == grupo[0]]['Turma'].values[0]
-                if turma == 2:
-                    st.warning(f"⚠️ Veterano sozinho ({tamanho} membro)")
-                else:
-                    st.error(f"❌ Calouro sozinho! ({tamanho} membro)")
+            elif situacao == 'sozinho':
+                st.error(f"❌ Aluno sozinho! ({tamanho} membro)")
             else:
-                st.info(f"ℹ️ Grupo pequeno ({tamanho} membros)")
+                st.warning(f"⚠️ Fora das cotas por turma ({tamanho} membros)")
             
             st.markdown("---")
 
+def exibir_tabela_grupos(grupos, numeros, cadastro, situacoes, chave):
+    """Todos os grupos em uma única tabela rolável, montada de uma vez"""
+    # Importado aqui: a busca pública não carrega o pandas
+    import pandas as pd
+    
+    resumo = Counter(situacoes)
+    st.caption(" · ".join(f"{SITUACOES[situacao]}: {resumo[situacao]}" for situacao in SITUACOES if resumo[situacao]))
+    
+    filtro = st.text_input(
+        "Filtrar por número do grupo ou nome",
+        key=f"filtro_grupos_{chave}",
+        placeholder="Ex: 12, Maria..."
+    ).strip()
+    
+    tabela = pd.DataFrame({
+        'Grupo': [numero for numero, grupo in zip(numeros, grupos) for _ in grupo],
+        'Aluno': [aluno for grupo in grupos for aluno in grupo],
+        'Turma': [
+            " ".join(descrever_turma(cadastro.turma(aluno)))
+            for grupo in grupos for aluno in grupo
+        ],
+        'Situação': [SITUACOES[situacao] for grupo, situacao in zip(grupos, situacoes) for _ in grupo],
+    })
+    
+    if filtro.isdigit():
+        tabela = tabela[tabela['Grupo'] == int(filtro)]
+    elif filtro:
+        tabela = tabela[tabela['Aluno'].str.contains(filtro, case=False, regex=False)]
+    
+    # O st.dataframe só desenha as linhas visíveis: o custo não cresce com o número de grupos
+    st.dataframe(tabela, hide_index=True, use_container_width=True, height=ALTURA_TABELA_GRUPOS)
+
 # Interface Principal
-def main():
+def interface():
     st.title("🎲 Sistema de Sorteio de Grupos")
     st.markdown("### Sorteio com garantia de pelo menos 1 calouro por grupo")
     
-    # Carregar dados (necessário para todas as abas)
-    arquivo_padrao = Path(__file__).parent / "dados_chamada" / "dados_manha.csv"
-    
-    if arquivo_padrao.exists():
-        df = carregar_dados(arquivo_padrao)
-    else:
+    # Listas descobertas a cada rerun: turnos novos aparecem sem reiniciar o app
+    listas = listas_de_chamada()
+    if not listas:
         st.error("Arquivo de dados não encontrado!")
         return
     
     # Verificar autenticação
     is_authenticated = check_password()
     
+    # O cadastro (sem pandas) de todas as listas basta para a busca pública;
+    # o DataFrame só é lido para os administradores
+    df = None
+    with medicao.etapa('carregar_dados'):
+        cadastro = carregar_cadastro(tuple(listas))
+    
     # Mostrar botão de logout se autenticado
     if is_authenticated:
         with st.sidebar:
@@ -276,20 +298,41 @@ def main():
     if is_authenticated:
         st.sidebar.header("⚙️ Configurações")
         
+        # Listas removidas do diretório saem da seleção; sem seleção, vale a primeira
+        nomes_listas = [lista.name for lista in listas]
+        selecao = [nome for nome in st.session_state.get('listas_selecionadas', []) if nome in nomes_listas]
+        st.session_state.listas_selecionadas = selecao or nomes_listas[:1]
+        st.sidebar.multiselect(
+            "Listas de chamada",
+            nomes_listas,
+            key='listas_selecionadas',
+            help="Selecione mais de uma lista para sortear turnos juntos"
+        )
+        selecionadas = tuple(
+            lista for lista in listas if lista.name in st.session_state.listas_selecionadas
+        ) or tuple(listas[:1])
+        with medicao.etapa('carregar_listas'):
+            df = carregar_dados(selecionadas)
+            cadastro = carregar_cadastro(selecionadas)
+        
         uploaded_file = st.sidebar.file_uploader(
             "Carregar arquivo CSV (opcional)", 
             type=['csv'],
-            help="Se não carregar, usará o arquivo padrão"
+            help="Se não carregar, usará as listas selecionadas"
         )
         
         if uploaded_file:
-            df = carregar_dados(uploaded_file)
+            with medicao.etapa('carregar_upload'):
+                df = carregar_dados(uploaded_file)
+                cadastro = carregar_cadastro(uploaded_file)
     
     # Mostrar estatísticas
-    st.sidebar.markdown("### 📊 Estatísticas")
-    st.sidebar.metric("Total de Alunos", len(df))
-    st.sidebar.metric("Calouros (Turma 1)", len(df[df['Turma'] == 1]))
-    st.sidebar.metric("Veteranos (Turma 2)", len(df[df['Turma'] == 2]))
+    with medicao.etapa('estatisticas'):
+        st.sidebar.markdown("### 📊 Estatísticas")
+        linhas_por_turma = cadastro.linhas_por_turma()
+        st.sidebar.metric("Total de Alunos", sum(linhas_por_turma.values()))
+        for turma, quantidade in linhas_por_turma.items():
+            st.sidebar.metric(rotulo_turma(turma), quantidade)
     
     # Tamanho do grupo
     tamanho_grupo = st.sidebar.slider(
@@ -301,17 +344,33 @@ def main():
     )
     
     # Seed para reprodutibilidade
+    # Cada sessão tem seu próprio fluxo aleatório; o módulo random global não é usado
+    fluxo_sessao = st.session_state.setdefault('fluxo_sessao', secrets.token_hex(4))
+    seed = None
     usar_seed = st.sidebar.checkbox("Usar seed (reproduzível)")
     if usar_seed:
         seed = st.sidebar.number_input("Seed", min_value=0, value=42)
-        random.seed(seed)
+    
+    if is_authenticated:
+        st.sidebar.checkbox(
+            "⏱️ Painel de tempos",
+            key="painel_tempos",
+            help="Mede cada etapa das execuções da página e mostra as últimas"
+        )
+        st.sidebar.selectbox(
+            "Exibição dos grupos",
+            ["Automático", "Cartões", "Tabela"],
+            key="modo_exibicao",
+            help=f"Automático usa cartões até {MAX_GRUPOS_EM_CARTOES} grupos e uma tabela "
+                 "única com filtro acima disso"
+        )
     
     st.sidebar.markdown("---")
     
     # Tabs para diferentes funcionalidades
     tab1, tab2, tab3, tab4 = st.tabs(["🎲 Sorteio Automático", "✏️ Grupos Manuais", "� Consultar Grupos", "📋 Visualizar Dados"])
     
-    with tab1:
+    with tab1, medicao.etapa('aba_sorteio'):
         if not is_authenticated:
             st.warning("🔒 Por favor, faça login para acessar a funcionalidade de sorteio automático.")
         else:
@@ -321,6 +380,15 @@ def main():
             col1, col2 = st.columns([1, 4])
             with col1:
                 sortear = st.button("🎲 Sortear Grupos", type="primary", use_container_width=True)
+            with col2:
+                n_candidatos = st.number_input(
+                    "Candidatos (melhor de N)",
+                    min_value=1,
+                    max_value=10000,
+                    value=1,
+                    help="Gera N sorteios em paralelo e fica com o que repete menos "
+                         "duplas dos sorteios salvos"
+                )
             
             # Incluir grupos manuais no sorteio
             grupos_manuais_para_sorteio = None
@@ -332,19 +400,176 @@ def main():
                 if incluir_manuais:
                     grupos_manuais_para_sorteio = st.session_state.grupos_manuais
             
-            if sortear:
-                grupos = sortear_grupos(df, tamanho_grupo, grupos_manuais_para_sorteio)
-                st.session_state.grupos_sorteados = grupos
-                st.balloons()
+            evitar_repeticoes = st.checkbox(
+                "Evitar repetir duplas de sorteios anteriores",
+                help="Troca alunos da mesma turma entre grupos para reduzir duplas que já "
+                     "ficaram juntas nos sorteios salvos"
+            )
+            
+            # Cotas por turma: mínimo e máximo de alunos de cada turma em cada grupo
+            regras = {}
+            with st.expander("📏 Cotas por turma"):
+                for turma in sorted(int(t) for t in df['Turma'].unique()):
+                    minimo_padrao = REGRAS_PADRAO.get(turma, (0, None))[0]
+                    col_min, col_max = st.columns(2)
+                    with col_min:
+                        minimo = st.number_input(
+                            f"Mínimo por grupo: {rotulo_turma(turma)}",
+                            min_value=0,
+                            value=minimo_padrao,
+                            key=f"cota_min_{turma}"
+                        )
+                    with col_max:
+                        maximo = st.number_input(
+                            f"Máximo por grupo: {rotulo_turma(turma)}",
+                            min_value=0,
+                            value=0,
+                            key=f"cota_max_{turma}",
+                            help="0 = sem limite"
+                        )
+                    if minimo or maximo:
+                        regras[turma] = (minimo, maximo or None)
+            
+            # Configuração inviável é avisada antes de sortear
+            problemas = verificar_regras(
+                contar_por_turma(df, grupos_manuais_para_sorteio), tamanho_grupo, regras
+            )
+            for problema in problemas:
+                st.error(f"❌ {problema}")
+            
+            if sortear and not problemas:
+                try:
+                    with medicao.etapa('sorteio'):
+                        # Com seed, o fluxo é fixo para o mesmo seed repetir o sorteio em qualquer sessão
+                        semente = seed if usar_seed else nova_semente()
+                        fluxo = '0' if usar_seed else fluxo_sessao
+                        
+                        if n_candidatos > 1:
+                            grupos, pontuacao, fluxo = melhor_de_n(
+                                df,
+                                cadastro,
+                                n_candidatos,
+                                tamanho_grupo,
+                                grupos_manuais_para_sorteio,
+                                pares=carregar_pares(),
+                                semente=semente,
+                                fluxo=fluxo,
+                                regras=regras
+                            )
+                            st.info(f"🏆 Melhor de {n_candidatos} candidatos: {pontuacao} duplas repetidas (fluxo {fluxo})")
+                        else:
+                            grupos = sortear_grupos(
+                                df,
+                                tamanho_grupo,
+                                grupos_manuais_para_sorteio,
+                                rng=gerador(semente, fluxo),
+                                regras=regras
+                            )
+                        
+                        if evitar_repeticoes:
+                            grupos, antes, depois = minimizar_repeticoes(
+                                grupos,
+                                cadastro,
+                                carregar_pares(),
+                                rng=gerador(semente, f"{fluxo}/trocas")
+                            )
+                            st.info(f"🔁 Duplas repetidas: {antes} → {depois}")
+                except ValueError as erro:
+                    st.error(f"❌ {erro}")
+                else:
+                    st.session_state.grupos_sorteados = grupos
+                    # As trocas dependem do histórico e do tempo limite: a semente não refaz o sorteio
+                    st.session_state.origem_sorteio = (
+                        {} if evitar_repeticoes else {'semente': semente, 'fluxo': fluxo}
+                    )
+                    st.session_state.pop('movimentos_reparo', None)
+                    st.session_state.pop('indice_sorteio', None)
+                    st.balloons()
             
             # Exibir grupos manuais primeiro
             if grupos_manuais_para_sorteio:
-                exibir_grupos(grupos_manuais_para_sorteio, df, "📌 Grupos Manuais")
+                exibir_grupos(grupos_manuais_para_sorteio, cadastro, "📌 Grupos Manuais")
                 st.markdown("---")
             
-            # Exibir grupos sorteados
+            # Ajustar o sorteio já anunciado a faltas e chegadas
             if 'grupos_sorteados' in st.session_state:
-                exibir_grupos(st.session_state.grupos_sorteados, df, "🎲 Grupos Sorteados")
+                with st.expander("🩹 Ajustar sorteio (faltas e chegadas)"):
+                    no_sorteio = {aluno for grupo in st.session_state.grupos_sorteados for aluno in grupo}
+                    em_manuais = {aluno for grupo in grupos_manuais_para_sorteio or [] for aluno in grupo}
+                    # Como nos grupos manuais, só os primeiros resultados da busca vão para o navegador
+                    busca_ausente = st.text_input(
+                        "🔍 Buscar aluno ausente",
+                        placeholder="Início do nome ou sobrenome, ex.: mar sil",
+                        help=f"Mostra até {MAX_SUGESTOES_MANUAIS} alunos do sorteio"
+                    )
+                    # Quem já saiu por um ajuste anterior sai da seleção
+                    faltaram = [a for a in st.session_state.get('selecao_ausentes', []) if a in no_sorteio]
+                    sugestoes = cadastro.buscar_prefixo(
+                        busca_ausente,
+                        MAX_SUGESTOES_MANUAIS,
+                        excluir=faltaram,
+                        incluir=no_sorteio
+                    )
+                    ausentes = st.multiselect(
+                        "Alunos ausentes",
+                        options=[*faltaram, *sugestoes],
+                        key='selecao_ausentes'
+                    )
+                    busca_chegada = st.text_input(
+                        "🔍 Buscar aluno que chegou",
+                        placeholder="Início do nome ou sobrenome, ex.: mar sil",
+                        help=f"Mostra até {MAX_SUGESTOES_MANUAIS} alunos fora do sorteio"
+                    )
+                    # Quem já foi colocado por um ajuste anterior sai da seleção
+                    chegaram = [a for a in st.session_state.get('selecao_chegadas', []) if a not in no_sorteio]
+                    sugestoes = cadastro.buscar_prefixo(
+                        busca_chegada,
+                        MAX_SUGESTOES_MANUAIS,
+                        excluir=no_sorteio.union(em_manuais, chegaram)
+                    )
+                    novos = st.multiselect(
+                        "Alunos que chegaram",
+                        options=[*chegaram, *sugestoes],
+                        key='selecao_chegadas'
+                    )
+                    
+                    if st.button("🩹 Aplicar ajustes", disabled=not (ausentes or novos)):
+                        # O índice é montado no primeiro ajuste e mantido pelos seguintes
+                        indice = st.session_state.get('indice_sorteio')
+                        if indice is None or indice['tamanho_grupo'] != tamanho_grupo:
+                            indice = indexar_grupos(st.session_state.grupos_sorteados, tamanho_grupo)
+                            st.session_state.indice_sorteio = indice
+                        try:
+                            with medicao.etapa('reparo'):
+                                grupos, movimentos = reparar_grupos(
+                                    st.session_state.grupos_sorteados,
+                                    cadastro,
+                                    ausentes,
+                                    novos,
+                                    tamanho_grupo,
+                                    indice=indice,
+                                    regras=regras
+                                )
+                        except ValueError as erro:
+                            st.error(f"❌ {erro}")
+                        else:
+                            st.session_state.grupos_sorteados = grupos
+                            # O sorteio ajustado não é mais reproduzível pela semente
+                            st.session_state.origem_sorteio = {}
+                            st.session_state.movimentos_reparo = movimentos
+                    
+                    movimentos = st.session_state.get('movimentos_reparo')
+                    if movimentos:
+                        st.markdown(f"**Alterações a anunciar ({len(movimentos)}):**")
+                        for movimento in movimentos:
+                            de = f"Grupo {movimento['de']}" if movimento['de'] else "chegou"
+                            para = f"Grupo {movimento['para']}" if movimento['para'] else "ausente"
+                            st.markdown(f"- {movimento['aluno']}: {de} → {para}")
+                
+                exibir_grupos(st.session_state.grupos_sorteados, cadastro, "🎲 Grupos Sorteados", regras)
+                origem = st.session_state.get('origem_sorteio', {})
+                if origem:
+                    st.caption(f"🔑 Semente {origem['semente']}, fluxo {origem['fluxo']}")
                 
                 # Botões de ação
                 st.markdown("---")
@@ -363,47 +588,26 @@ def main():
                             sorteio_id = salvar_grupos(
                                 st.session_state.grupos_sorteados,
                                 nome_sorteio,
-                                grupos_manuais_para_sorteio
+                                grupos_manuais_para_sorteio,
+                                **st.session_state.get('origem_sorteio', {})
                             )
                             st.success(f"✅ Sorteio '{nome_sorteio}' salvo com sucesso! (ID: {sorteio_id})")
                 
                 with col2:
-                    # Exportar CSV
-                    if st.button("📥 Exportar Grupos (CSV)", use_container_width=True):
-                        resultado = []
-                        
-                        # Adicionar grupos manuais
-                        if grupos_manuais_para_sorteio:
-                            for idx, grupo in enumerate(grupos_manuais_para_sorteio):
-                                for aluno in grupo:
-                                    turma = df[df['Nome'] == aluno]['Turma'].values[0]
-                                    resultado.append({
-                                        'Grupo': f'Manual {idx + 1}',
-                                        'Nome': aluno,
-                                        'Turma': turma
-                                    })
-                        
-                        # Adicionar grupos sorteados
-                        for idx, grupo in enumerate(st.session_state.grupos_sorteados):
-                            for aluno in grupo:
-                                turma = df[df['Nome'] == aluno]['Turma'].values[0]
-                                resultado.append({
-                                    'Grupo': f'Grupo {idx + 1}',
-                                    'Nome': aluno,
-                                    'Turma': turma
-                                })
-                        
-                        df_resultado = pd.DataFrame(resultado)
-                        csv = df_resultado.to_csv(index=False, encoding='utf-8')
-                        
-                        st.download_button(
-                            label="⬇️ Download CSV",
-                            data=csv,
-                            file_name="grupos_sorteados.csv",
-                            mime="text/csv"
-                        )
-    
-    with tab2:
+                    # Exportar: o arquivo só é gerado quando o download é pedido
+                    formato = st.selectbox("Formato", exportacao.formatos_disponiveis(), key='formato_sorteio')
+                    st.download_button(
+                        label=f"📥 Exportar Grupos ({formato})",
+                        data=exportar_grupos(
+                            st.session_state.grupos_sorteados, df, grupos_manuais_para_sorteio, formato
+                        ),
+                        file_name=exportacao.nome_arquivo("grupos_sorteados", formato),
+                        mime=exportacao.tipo_mime(formato),
+                        on_click='ignore',
+                        use_container_width=True
+                    )
+    
+    with tab2, medicao.etapa('aba_manuais'):
         if not is_authenticated:
             st.warning("🔒 Por favor, faça login para criar grupos manualmente.")
         else:
@@ -413,68 +617,79 @@ def main():
             # Inicializar session state
             if 'grupos_manuais' not in st.session_state:
                 st.session_state.grupos_manuais = []
+            # Alunos já alocados, atualizados a cada grupo adicionado ou removido
+            if 'alocados_manuais' not in st.session_state:
+                st.session_state.alocados_manuais = {
+                    aluno for grupo in st.session_state.grupos_manuais for aluno in grupo
+                }
+            alocados = st.session_state.alocados_manuais
             
-            # Obter alunos já alocados
-            alunos_alocados = [aluno for grupo in st.session_state.grupos_manuais for aluno in grupo]
-            alunos_disponiveis = df[~df['Nome'].isin(alunos_alocados)]['Nome'].tolist()
+            disponiveis = len(cadastro) - sum(1 for aluno in alocados if aluno in cadastro)
+            st.markdown(f"**Alunos disponíveis:** {disponiveis}")
             
-            st.markdown(f"**Alunos disponíveis:** {len(alunos_disponiveis)}")
+            st.subheader(f"Criar Grupo {len(st.session_state.grupos_manuais) + 1}")
             
-            # Formulário para criar novo grupo
-            with st.form("novo_grupo_manual"):
-                st.subheader(f"Criar Grupo {len(st.session_state.grupos_manuais) + 1}")
-                
-                # Multiselect para escolher alunos
-                alunos_selecionados = st.multiselect(
-                    "Selecione os alunos (máximo 6)",
-                    options=sorted(alunos_disponiveis),
-                    max_selections=6,
-                    help="Escolha os alunos que farão parte deste grupo"
-                )
-                
-                # Mostrar preview
-                if alunos_selecionados:
-                    st.markdown("**Preview do grupo:**")
-                    for aluno in alunos_selecionados:
-                        turma = df[df['Nome'] == aluno]['Turma'].values[0]
-                        emoji = "🆕" if turma == 1 else "👤"
-                        turma_text = "Calouro" if turma == 1 else "Veterano"
-                        st.text(f"{emoji} {aluno} ({turma_text})")
-                    
-                    # Validação
-                    tem_calouro = any(df[df['Nome'] == aluno]['Turma'].values[0] == 1 
-                                     for aluno in alunos_selecionados)
-                    if tem_calouro:
-                        st.success("✅ Grupo válido (tem calouro)")
-                    else:
-                        st.warning("⚠️ Grupo sem calouro!")
-                
-                submitted = st.form_submit_button("➕ Adicionar Grupo", type="primary")
+            # Só os primeiros resultados da busca vão para o navegador, não a lista inteira
+            busca_manual = st.text_input(
+                "🔍 Buscar aluno",
+                placeholder="Início do nome ou sobrenome, ex.: mar sil",
+                help=f"Mostra até {MAX_SUGESTOES_MANUAIS} alunos disponíveis"
+            )
+            selecionados = st.session_state.get('selecao_manual', [])
+            sugestoes = cadastro.buscar_prefixo(
+                busca_manual, MAX_SUGESTOES_MANUAIS, excluir=alocados.union(selecionados)
+            )
+            
+            # Multiselect para escolher alunos
+            alunos_selecionados = st.multiselect(
+                "Selecione os alunos (máximo 6)",
+                options=[*selecionados, *sugestoes],
+                max_selections=6,
+                key='selecao_manual',
+                help="Escolha os alunos que farão parte deste grupo"
+            )
+            
+            # Mostrar preview
+            if alunos_selecionados:
+                st.markdown("**Preview do grupo:**")
+                for aluno in alunos_selecionados:
+                    turma = cadastro.turma(aluno)
+                    emoji = "🆕" if turma == CALOURO else "👤"
+                    turma_text = "Calouro" if turma == CALOURO else "Veterano"
+                    st.text(f"{emoji} {aluno} ({turma_text})")
                 
-                if submitted and alunos_selecionados:
-                    st.session_state.grupos_manuais.append(alunos_selecionados)
-                    st.success(f"Grupo {len(st.session_state.grupos_manuais)} adicionado!")
-                    st.rerun()
+                # Validação
+                if cadastro.tem_calouro(alunos_selecionados):
+                    st.success("✅ Grupo válido (tem calouro)")
+                else:
+                    st.warning("⚠️ Grupo sem calouro!")
+            
+            if st.button("➕ Adicionar Grupo", type="primary") and alunos_selecionados:
+                st.session_state.grupos_manuais.append(alunos_selecionados)
+                alocados.update(alunos_selecionados)
+                del st.session_state.selecao_manual
+                st.rerun()
             
             # Exibir grupos manuais criados
             if st.session_state.grupos_manuais:
                 st.markdown("---")
-                exibir_grupos(st.session_state.grupos_manuais, df, "📌 Grupos Manuais Criados")
+                exibir_grupos(st.session_state.grupos_manuais, cadastro, "📌 Grupos Manuais Criados")
                 
                 # Botões de ação
                 col1, col2 = st.columns(2)
                 with col1:
                     if st.button("🗑️ Limpar Todos os Grupos Manuais", type="secondary"):
                         st.session_state.grupos_manuais = []
+                        alocados.clear()
                         st.rerun()
                 
                 with col2:
                     if st.button("❌ Remover Último Grupo"):
                         if st.session_state.grupos_manuais:
-                            st.session_state.grupos_manuais.pop()
+                            alocados.difference_update(st.session_state.grupos_manuais.pop())
                             st.rerun()
     
-    with tab3:
+    with tab3, medicao.etapa('aba_consulta'):
         st.header("🔍 Consultar Grupos Salvos")
         
         # Buscar aluno
@@ -524,9 +739,9 @@ def main():
                         st.markdown("**Membros do grupo:**")
                         
                         for membro in resultado['grupo_completo']:
-                            turma = df[df['Nome'] == membro]['Turma'].values[0] if membro in df['Nome'].values else '?'
-                            emoji = "🆕" if turma == 1 else "👤" if turma == 2 else "❓"
-                            turma_text = "Calouro" if turma == 1 else "Veterano" if turma == 2 else "Desconhecido"
+                            turma = cadastro.turma(membro)
+                            emoji = "🆕" if turma == CALOURO else "👤" if turma == VETERANO else "❓"
+                            turma_text = "Calouro" if turma == CALOURO else "Veterano" if turma == VETERANO else "Desconhecido"
                             
                             # Destacar o aluno buscado
                             if membro == resultado['aluno']:
@@ -541,49 +756,146 @@ def main():
             st.markdown("---")
             st.subheader("📋 Todos os Sorteios Salvos")
             
-            sorteios = carregar_grupos()
+            # Filtros e paginação feitos no banco
+            col1, col2 = st.columns([2, 1])
+            with col1:
+                filtro_nome = st.text_input("Filtrar por nome do sorteio")
+            with col2:
+                periodo = st.date_input("Período", value=(), format="DD/MM/YYYY")
+            data_inicio = periodo[0] if len(periodo) > 0 else None
+            data_fim = periodo[1] if len(periodo) > 1 else data_inicio
             
-            if sorteios:
-                st.info(f"Total de sorteios salvos: {len(sorteios)}")
+            _, total_sorteios = listar_sorteios(filtro_nome, data_inicio, data_fim, limite=0)
+            # Sorteios antigos saem do banco, mas continuam aparecendo na busca e na exportação
+            segmentos = listar_segmentos()
+            
+            # Exportação direto do armazenamento, sem passar pela sessão
+            if total_sorteios or segmentos:
+                col1, col2 = st.columns([2, 1])
+                with col1:
+                    formato_historico = st.selectbox(
+                        "Formato da exportação", exportacao.formatos_disponiveis(), key='formato_historico'
+                    )
+                with col2:
+                    st.download_button(
+                        label="📥 Exportar todos",
+                        data=exportar_historico(None, df, formato_historico),
+                        file_name=exportacao.nome_arquivo("sorteios", formato_historico),
+                        mime=exportacao.tipo_mime(formato_historico),
+                        on_click='ignore',
+                        help="Inclui os sorteios arquivados",
+                        use_container_width=True
+                    )
+            
+            if total_sorteios:
+                total_paginas = -(-total_sorteios // SORTEIOS_POR_PAGINA)
+                pagina = 1
+                if total_paginas > 1:
+                    pagina = st.number_input("Página", min_value=1, max_value=total_paginas, value=1)
+                
+                st.info(f"Total de sorteios salvos: {total_sorteios} (página {pagina} de {total_paginas})")
+                
+                sorteios, _ = listar_sorteios(
+                    filtro_nome,
+                    data_inicio,
+                    data_fim,
+                    limite=SORTEIOS_POR_PAGINA,
+                    deslocamento=(pagina - 1) * SORTEIOS_POR_PAGINA
+                )
                 
-                for sorteio in reversed(sorteios):  # Mostrar os mais recentes primeiro
+                for sorteio in sorteios:  # Os mais recentes primeiro
                     with st.expander(f"📁 {sorteio['nome']} - {sorteio['data']}", expanded=False):
                         col1, col2 = st.columns([3, 1])
                         
                         with col1:
                             st.markdown(f"**ID:** {sorteio['id']}")
                             st.markdown(f"**Data:** {sorteio['data']}")
-                            
-                            total_grupos = len(sorteio['grupos_automaticos']) + len(sorteio['grupos_manuais'])
-                            total_alunos = sum(len(g) for g in sorteio['grupos_automaticos']) + sum(len(g) for g in sorteio['grupos_manuais'])
-                            
-                            st.markdown(f"**Total de grupos:** {total_grupos}")
-                            st.markdown(f"**Total de alunos:** {total_alunos}")
+                            st.markdown(f"**Total de grupos:** {sorteio['total_grupos']}")
+                            st.markdown(f"**Total de alunos:** {sorteio['total_alunos']}")
+                            if sorteio['semente'] is not None:
+                                st.markdown(f"**Semente:** {sorteio['semente']} (fluxo {sorteio['fluxo']})")
                         
                         with col2:
                             if st.button(f"🗑️ Deletar", key=f"del_{sorteio['id']}", type="secondary"):
                                 deletar_sorteio(sorteio['id'])
                                 st.success(f"Sorteio '{sorteio['nome']}' deletado!")
                                 st.rerun()
+                            st.download_button(
+                                label="📥 Exportar",
+                                data=exportar_historico(sorteio['id'], df, formato_historico),
+                                file_name=exportacao.nome_arquivo(f"sorteio_{sorteio['id']}", formato_historico),
+                                mime=exportacao.tipo_mime(formato_historico),
+                                key=f"exp_{sorteio['id']}",
+                                on_click='ignore'
+                            )
+                        
+                        # Os grupos só são carregados quando pedidos
+                        if not st.toggle("Mostrar grupos", key=f"ver_{sorteio['id']}"):
+                            continue
+                        
+                        completo = carregar_sorteio(sorteio['id'])
                         
                         # Mostrar grupos manuais
-                        if sorteio['grupos_manuais']:
+                        if completo['grupos_manuais']:
                             st.markdown("### 📌 Grupos Manuais")
-                            for idx, grupo in enumerate(sorteio['grupos_manuais']):
+                            for idx, grupo in enumerate(completo['grupos_manuais']):
                                 st.markdown(f"**Grupo Manual {idx + 1}:** {', '.join(grupo)}")
                         
                         # Mostrar grupos automáticos
-                        if sorteio['grupos_automaticos']:
+                        if completo['grupos_automaticos']:
                             st.markdown("### 🎲 Grupos Automáticos")
-                            for idx, grupo in enumerate(sorteio['grupos_automaticos']):
-                                st.markdown(f"**Grupo {idx + 1}:** {', '.join(grupo)}")
+                            for idx, grupo in enumerate(completo['grupos_automaticos']):
+                                if grupo:
+                                    st.markdown(f"**Grupo {idx + 1}:** {', '.join(grupo)}")
+            elif filtro_nome or data_inicio:
+                st.info("📭 Nenhum sorteio encontrado com esses filtros.")
             else:
                 st.info("📭 Nenhum sorteio salvo ainda. Faça um sorteio e clique em 'Salvar Sorteio'!")
+            
+            with st.expander("🗄️ Arquivar sorteios antigos"):
+                if segmentos:
+                    st.caption(
+                        f"{sum(seg['total_sorteios'] for seg in segmentos)} sorteio(s) arquivado(s) em "
+                        f"{len(segmentos)} segmento(s), de {segmentos[0]['data_inicio'][:10]} a "
+                        f"{segmentos[-1]['data_fim'][:10]}. Eles continuam aparecendo na busca por aluno."
+                    )
+                    # Os arquivados não aparecem na lista acima: a exportação é pelo ID
+                    col1, col2 = st.columns([2, 1])
+                    with col1:
+                        arquivado_id = st.number_input(
+                            "ID do sorteio arquivado",
+                            min_value=min(seg['primeiro_id'] for seg in segmentos),
+                            max_value=max(seg['ultimo_id'] for seg in segmentos),
+                            value=max(seg['ultimo_id'] for seg in segmentos)
+                        )
+                    with col2:
+                        st.download_button(
+                            label="📥 Exportar",
+                            data=exportar_historico(int(arquivado_id), df, formato_historico),
+                            file_name=exportacao.nome_arquivo(f"sorteio_{int(arquivado_id)}", formato_historico),
+                            mime=exportacao.tipo_mime(formato_historico),
+                            on_click='ignore',
+                            key='exportar_arquivado',
+                            use_container_width=True
+                        )
+                dias = st.number_input(
+                    "Arquivar sorteios com mais de (dias)",
+                    min_value=0,
+                    value=armazenamento.RETENCAO_PADRAO_DIAS
+                )
+                if st.button("🗄️ Arquivar"):
+                    resumo = compactar_historico(dias)
+                    if resumo:
+                        st.success(f"✅ {resumo['total_sorteios']} sorteio(s) arquivado(s).")
+                    else:
+                        st.info(f"Nenhum sorteio com mais de {dias} dias.")
     
-    with tab4:
+    with tab4, medicao.etapa('aba_dados'):
         if not is_authenticated:
             st.warning("🔒 Por favor, faça login para visualizar os dados dos alunos.")
         else:
+            import pandas as pd
+            
             st.header("📋 Visualizar Dados dos Alunos")
             
             # Filtros
@@ -591,9 +903,9 @@ def main():
             with col1:
                 filtro_turma = st.multiselect(
                     "Filtrar por turma",
-                    options=[1, 2],
-                    default=[1, 2],
-                    format_func=lambda x: "Turma 1 (Calouros)" if x == 1 else "Turma 2 (Veteranos)"
+                    options=sorted(int(t) for t in df['Turma'].unique()),
+                    default=sorted(int(t) for t in df['Turma'].unique()),
+                    format_func=rotulo_turma
                 )
             
             with col2:
@@ -616,6 +928,90 @@ def main():
             )
             
             st.metric("Total filtrado", len(df_filtrado))
+            
+            # Estatísticas por aluno, mantidas a cada salvamento/exclusão
+            st.markdown("---")
+            st.subheader("📈 Participação nos Sorteios Salvos")
+            
+            participacoes = carregar_participacoes(busca)
+            if participacoes:
+                st.dataframe(
+                    pd.DataFrame(participacoes),
+                    use_container_width=True,
+                    hide_index=True,
+                    height=ALTURA_TABELA_GRUPOS,
+                    column_config={
+                        "aluno": st.column_config.TextColumn("Aluno", width="large"),
+                        "sorteios": st.column_config.NumberColumn("Sorteios"),
+                        "automaticos": st.column_config.NumberColumn("Grupos automáticos"),
+                        "manuais": st.column_config.NumberColumn("Grupos manuais"),
+                    }
+                )
+                
+                aluno = st.selectbox(
+                    "Ver colegas mais frequentes de",
+                    options=[p['aluno'] for p in participacoes],
+                    index=None,
+                    placeholder="Escolha um aluno"
+                )
+                if aluno:
+                    estatisticas = estatisticas_aluno(aluno)
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        st.metric("Sorteios", estatisticas['sorteios'])
+                    with col2:
+                        st.metric("Grupos automáticos", estatisticas['automaticos'])
+                    with col3:
+                        st.metric("Grupos manuais", estatisticas['manuais'])
+                    if estatisticas['parceiros']:
+                        for colega, vezes in estatisticas['parceiros']:
+                            st.markdown(f"👥 {colega}: {vezes} vez(es) no mesmo grupo")
+                    else:
+                        st.caption("Ainda não dividiu grupo com ninguém.")
+            else:
+                st.info("📭 Nenhum aluno encontrado nos sorteios salvos.")
+            
+            if st.button("🔄 Conferir estatísticas"):
+                divergencias = reconstruir_estatisticas()
+                if any(divergencias.values()):
+                    st.warning(
+                        f"Estatísticas recalculadas: {divergencias['participacoes']} aluno(s) e "
+                        f"{divergencias['pares']} dupla(s) estavam divergentes."
+                    )
+                else:
+                    st.success("✅ Estatísticas consistentes com o histórico.")
+
+# Painel de tempos (apenas para usuários autenticados)
+def exibir_painel_tempos(execucoes):
+    """Mostra na barra lateral o tempo de cada etapa das últimas execuções"""
+    import pandas as pd
+    
+    linhas = []
+    for execucao in reversed(execucoes):
+        linha = {'Início': execucao['inicio'][11:], 'Total (ms)': execucao['total_ms']}
+        for etapa in execucao['etapas']:
+            linha[etapa['etapa']] = linha.get(etapa['etapa'], 0) + etapa['duracao_ms']
+        linhas.append(linha)
+    
+    with st.sidebar.expander("⏱️ Tempos das últimas execuções", expanded=True):
+        st.dataframe(pd.DataFrame(linhas), hide_index=True, use_container_width=True)
+        # Caches do armazenamento, compartilhados por todas as sessões deste processo
+        for nome, contadores in armazenamento.estatisticas_cache().items():
+            st.caption(f"Cache de {nome}: {contadores['acertos']} acertos, {contadores['falhas']} falhas")
+
+def main():
+    """Executa a interface medindo o tempo de cada etapa"""
+    medicao.iniciar(ativa=bool(medicao.ARQUIVO_LOG) or st.session_state.get('painel_tempos', False))
+    try:
+        interface()
+    finally:
+        registro = medicao.finalizar()
+    
+    if registro and st.session_state.get('authenticated') and st.session_state.get('painel_tempos'):
+        if 'execucoes_medidas' not in st.session_state:
+            st.session_state.execucoes_medidas = deque(maxlen=MAX_EXECUCOES_MEDIDAS)
+        st.session_state.execucoes_medidas.append(registro)
+        exibir_painel_tempos(st.session_state.execucoes_medidas)
 
 if __name__ == "__main__":
     main()
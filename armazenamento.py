@@ -0,0 +1,1261 @@
+"""Armazenamento dos sorteios salvos.
+
+Os sorteios ficam em um banco SQLite em modo WAL: cada salvamento é um
+único INSERT (custo independente do tamanho do histórico), os IDs vêm da
+sequência AUTOINCREMENT do próprio SQLite e várias sessões podem salvar
+ao mesmo tempo sem perder escritas nem repetir IDs.
+
+Os grupos são gravados como listas de IDs inteiros da tabela `nomes`, o
+dicionário de alunos compartilhado por todos os sorteios: cada nome é
+gravado uma única vez, e os IDs só são convertidos em nomes quando os
+grupos de um sorteio são lidos. Isso encolhe a tabela de sorteios, mas
+a maior parte do arquivo são os índices de ocorrências e de pares.
+
+Este módulo usa apenas a biblioteca padrão, para poder ser importado
+pelo app Streamlit, pela linha de comando e por outros processos.
+
+As estatísticas por aluno (tabelas `pares` e `participacoes`) são
+atualizadas na mesma transação de cada salvamento e exclusão, então
+consultá-las não exige reler o histórico; `reconstruir_estatisticas`
+refaz tudo a partir dos sorteios gravados.
+
+Sorteios antigos podem ser movidos para segmentos de arquivo
+(`compactar`): arquivos JSON compactados e imutáveis, cada um com um
+pequeno índice dos nomes que contém. O banco guarda só os sorteios
+recentes; a busca só abre os segmentos para os alunos que não estão nele.
+As estatísticas por aluno continuam contando os sorteios arquivados.
+
+Para compactar pela linha de comando:
+
+    python -m armazenamento --dias 365
+"""
+import argparse
+import gzip
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+from collections.abc import Mapping
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sorteios (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nome TEXT NOT NULL,
+    data TEXT NOT NULL,
+    grupos_automaticos TEXT NOT NULL,
+    grupos_manuais TEXT NOT NULL,
+    total_grupos INTEGER,
+    total_alunos INTEGER,
+    semente INTEGER,
+    fluxo TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    chave TEXT PRIMARY KEY,
+    valor TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS nomes (
+    id INTEGER PRIMARY KEY,
+    nome TEXT NOT NULL UNIQUE,
+    nome_normalizado TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trigramas (
+    trigrama TEXT NOT NULL,
+    nome_id INTEGER NOT NULL,
+    PRIMARY KEY (trigrama, nome_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ocorrencias (
+    nome_id INTEGER NOT NULL,
+    sorteio_id INTEGER NOT NULL,
+    tipo_grupo INTEGER NOT NULL,
+    numero_grupo INTEGER NOT NULL,
+    posicao INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ocorrencias_nome ON ocorrencias (nome_id);
+CREATE INDEX IF NOT EXISTS ocorrencias_sorteio ON ocorrencias (sorteio_id);
+CREATE TABLE IF NOT EXISTS pares (
+    nome_a INTEGER NOT NULL,
+    nome_b INTEGER NOT NULL,
+    contagem INTEGER NOT NULL,
+    PRIMARY KEY (nome_a, nome_b)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS pares_nome_b ON pares (nome_b);
+CREATE TABLE IF NOT EXISTS participacoes (
+    nome_id INTEGER PRIMARY KEY,
+    sorteios INTEGER NOT NULL,
+    automaticos INTEGER NOT NULL,
+    manuais INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS segmentos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    arquivo TEXT NOT NULL UNIQUE,
+    primeiro_id INTEGER NOT NULL,
+    ultimo_id INTEGER NOT NULL,
+    total_sorteios INTEGER NOT NULL,
+    data_inicio TEXT NOT NULL,
+    data_fim TEXT NOT NULL,
+    criado TEXT NOT NULL
+);
+"""
+
+# Colunas criadas depois da primeira versão da tabela sorteios
+_COLUNAS_ADICIONADAS = (
+    ('total_grupos', 'INTEGER'),
+    ('total_alunos', 'INTEGER'),
+    ('semente', 'INTEGER'),
+    ('fluxo', 'TEXT'),
+)
+
+# Versão do índice de nomes, de pares e de participações; ao mudar, o índice é
+# reconstruído na abertura
+_VERSAO_INDICE = '3'
+
+# Formato das colunas de grupos: listas de IDs da tabela nomes (antes, listas de nomes)
+_FORMATO_GRUPOS = 'ids'
+
+# Rótulos dos tipos de grupo, indexados pelo código gravado em ocorrencias
+_TIPOS_GRUPO = ('Automático', 'Manual')
+
+# Sorteios mais antigos que isso (em dias) vão para os segmentos de arquivo
+RETENCAO_PADRAO_DIAS = 365
+
+# Banco usado pelo app e pela linha de comando quando nenhum outro é informado
+ARQUIVO_PADRAO = Path(__file__).parent / "grupos_salvos.db"
+
+# Uma conexão por thread e por arquivo. O Streamlit roda cada rerun em uma
+# thread nova, então conexões novas são frequentes e precisam ser baratas
+_local = threading.local()
+
+# Bancos já criados e migrados por este processo: as conexões seguintes só
+# configuram a conexão, sem o esquema, as migrações e a conferência do índice
+_bancos_prontos = set()
+_trava_bancos = threading.Lock()
+
+# Matriz de pares em memória, compartilhada pelas threads: caminho -> (versão, vizinhos)
+_cache_pares = {}
+_trava_cache = threading.Lock()
+
+# Histórico lido em memória, compartilhado pelas threads: caminho -> (versão,
+# {id: sorteio}). Atualizado no lugar a cada salvamento/exclusão deste processo
+_cache_historico = {}
+
+# Acertos e falhas dos caches em memória, para monitoramento
+_contadores_cache = {
+    'histórico': {'acertos': 0, 'falhas': 0},
+    'pares': {'acertos': 0, 'falhas': 0},
+}
+
+# Nomes de cada segmento de arquivo: arquivo -> [(nome, nome normalizado)].
+# Os segmentos são imutáveis, então a entrada nunca fica desatualizada
+_cache_segmentos = {}
+
+# Dicionário de alunos em memória: caminho -> {id: nome}. A tabela nomes só
+# cresce e seus IDs nunca mudam, então basta buscar os IDs que faltam
+_cache_nomes = {}
+
+
+def _caminho_json_legado(caminho):
+    """Arquivo JSON usado pelas versões anteriores do app"""
+    return Path(caminho).with_suffix('.json')
+
+
+def _chave(caminho):
+    """Forma canônica do caminho, usada como chave de conexões e caches"""
+    return str(Path(caminho).resolve())
+
+
+def _conexao(caminho):
+    """Retorna a conexão SQLite da thread atual, criando o banco se necessário"""
+    caminho = _chave(caminho)
+    conexoes = getattr(_local, 'conexoes', None)
+    if conexoes is None:
+        conexoes = _local.conexoes = {}
+
+    conn = conexoes.get(caminho)
+    if conn is None:
+        # Um arquivo apagado depois da migração é criado e migrado de novo
+        existe = os.path.exists(caminho)
+        conn = sqlite3.connect(caminho, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.create_function('normalizar', 1, normalizar, deterministic=True)
+        with _trava_bancos:
+            pronto = existe and caminho in _bancos_prontos
+        if not pronto:
+            conn.executescript(_SCHEMA)
+            _migrar_json(conn, _caminho_json_legado(caminho))
+            _migrar_colunas(conn)
+            _migrar_para_ids(conn)
+            _verificar_indice(conn, caminho)
+            with _trava_bancos:
+                _bancos_prontos.add(caminho)
+        conexoes[caminho] = conn
+    return conn
+
+
+def _migrar_json(conn, arquivo_json):
+    """Importa o antigo grupos_salvos.json uma única vez, preservando os IDs.
+
+    O JSON antigo numerava os sorteios por len(dados) + 1, então um
+    histórico com exclusões pode ter IDs repetidos: vale a primeira
+    ocorrência, e as seguintes recebem IDs novos depois do maior.
+    """
+    if not arquivo_json.exists():
+        return
+
+    with _transacao(conn):
+        ja_migrado = conn.execute(
+            "SELECT 1 FROM meta WHERE chave = 'json_migrado'"
+        ).fetchone()
+        if ja_migrado:
+            return
+        with open(arquivo_json, 'r', encoding='utf-8') as f:
+            dados = json.load(f)
+
+        maior = conn.execute('SELECT MAX(id) FROM sorteios').fetchone()[0] or 0
+        proximo = max([maior, *(s['id'] for s in dados)]) + 1
+        usados = set()
+        ids = []
+        for s in dados:
+            if s['id'] in usados:
+                ids.append(proximo)
+                proximo += 1
+            else:
+                ids.append(s['id'])
+            usados.add(ids[-1])
+
+        conn.executemany(
+            'INSERT INTO sorteios (id, nome, data, grupos_automaticos, grupos_manuais) '
+            'VALUES (?, ?, ?, ?, ?)',
+            [
+                (
+                    sorteio_id,
+                    s['nome'],
+                    s['data'],
+                    json.dumps(s['grupos_automaticos'], ensure_ascii=False),
+                    json.dumps(s.get('grupos_manuais') or [], ensure_ascii=False),
+                )
+                for sorteio_id, s in zip(ids, dados)
+            ]
+        )
+        conn.execute(
+            "INSERT INTO meta (chave, valor) VALUES ('json_migrado', ?)",
+            (str(arquivo_json),)
+        )
+        # Força a conversão para IDs e a reconstrução do índice com os sorteios importados
+        conn.execute("DELETE FROM meta WHERE chave IN ('indice_versao', 'formato_grupos')")
+
+
+def _versao(conn):
+    """Versão do banco, incrementada a cada escrita"""
+    linha = conn.execute("SELECT valor FROM meta WHERE chave = 'versao'").fetchone()
+    return int(linha[0]) if linha else 0
+
+
+def _incrementar_versao(conn):
+    """Incrementa a versão do banco (dentro da transação de escrita)"""
+    versao = _versao(conn) + 1
+    conn.execute(
+        "INSERT OR REPLACE INTO meta (chave, valor) VALUES ('versao', ?)",
+        (str(versao),)
+    )
+    return versao
+
+
+def _totais(grupos_automaticos, grupos_manuais):
+    """Resumo (total de grupos, total de alunos) gravado junto com o sorteio"""
+    # Grupos esvaziados por um ajuste (sorteador.reparar_grupos) guardam só o número
+    grupos = [grupo for grupo in [*grupos_automaticos, *grupos_manuais] if grupo]
+    return len(grupos), sum(len(grupo) for grupo in grupos)
+
+
+def _migrar_colunas(conn):
+    """Adiciona as colunas novas em bancos antigos e preenche os resumos que faltam"""
+    colunas = {linha[1] for linha in conn.execute('PRAGMA table_info(sorteios)')}
+    faltando = [(nome, tipo) for nome, tipo in _COLUNAS_ADICIONADAS if nome not in colunas]
+    pendentes = faltando or conn.execute(
+        'SELECT 1 FROM sorteios WHERE total_grupos IS NULL LIMIT 1'
+    ).fetchone()
+    if not pendentes:
+        return
+
+    with _transacao(conn):
+        for nome, tipo in faltando:
+            conn.execute(f'ALTER TABLE sorteios ADD COLUMN {nome} {tipo}')
+        linhas = conn.execute(
+            'SELECT id, grupos_automaticos, grupos_manuais FROM sorteios WHERE total_grupos IS NULL'
+        ).fetchall()
+        conn.executemany(
+            'UPDATE sorteios SET total_grupos = ?, total_alunos = ? WHERE id = ?',
+            [
+                (*_totais(json.loads(automaticos), json.loads(manuais)), sorteio_id)
+                for sorteio_id, automaticos, manuais in linhas
+            ]
+        )
+
+
+@contextmanager
+def _transacao(conn):
+    """Executa o bloco em uma transação de escrita"""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
+
+
+def normalizar(nome):
+    """Forma do nome usada na busca (mesma regra da busca por substring).
+
+    Pública: leitores do histórico fora deste módulo (consulta.py) devem
+    comparar nomes pela mesma regra.
+    """
+    return nome.lower().strip()
+
+
+def _trigramas(texto):
+    """Conjunto de trigramas de um texto já normalizado"""
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def _indexar_nome(conn, nome_id, normalizado):
+    """Cadastra os trigramas de um nome"""
+    conn.executemany(
+        'INSERT INTO trigramas (trigrama, nome_id) VALUES (?, ?)',
+        [(t, nome_id) for t in _trigramas(normalizado)]
+    )
+
+
+def _nome_ids(conn, nomes):
+    """IDs dos nomes no dicionário de alunos, cadastrando os nomes novos e seus trigramas"""
+    nomes = set(nomes)
+    ids = dict(conn.execute(
+        'SELECT nome, id FROM nomes WHERE nome IN (SELECT value FROM json_each(?))',
+        (json.dumps(list(nomes), ensure_ascii=False),)
+    ))
+
+    for nome in nomes - ids.keys():
+        normalizado = normalizar(nome)
+        nome_id = conn.execute(
+            'INSERT INTO nomes (nome, nome_normalizado) VALUES (?, ?)',
+            (nome, normalizado)
+        ).lastrowid
+        _indexar_nome(conn, nome_id, normalizado)
+        ids[nome] = nome_id
+    return ids
+
+
+def _codificar(grupos, ids):
+    """Grupos de nomes -> JSON compacto com os IDs do dicionário de alunos"""
+    return json.dumps([[ids[aluno] for aluno in grupo] for grupo in grupos], separators=(',', ':'))
+
+
+def _dicionario(caminho, conn, faltando=()):
+    """Dicionário id -> nome do banco, completado com os IDs em `faltando`"""
+    chave = _chave(caminho)
+    with _trava_cache:
+        nomes = _cache_nomes.setdefault(chave, {})
+        if nomes and all(nome_id in nomes for nome_id in faltando):
+            return nomes
+        ultimo = max(nomes, default=0)
+
+    novos = conn.execute('SELECT id, nome FROM nomes WHERE id > ?', (ultimo,)).fetchall()
+    with _trava_cache:
+        nomes.update(novos)
+    return nomes
+
+
+def _decodificar(caminho, conn, grupos_json):
+    """JSON de grupos de IDs gravado no banco -> grupos de nomes"""
+    return _nomes_dos_grupos(caminho, conn, json.loads(grupos_json))
+
+
+def _nomes_dos_grupos(caminho, conn, grupos):
+    """Grupos de IDs -> grupos de nomes"""
+    nomes = _dicionario(caminho, conn)
+    try:
+        return [list(map(nomes.__getitem__, grupo)) for grupo in grupos]
+    except KeyError:
+        # Nomes cadastrados depois da última leitura (por esta ou outra sessão)
+        nomes = _dicionario(caminho, conn, {nome_id for grupo in grupos for nome_id in grupo})
+        return [list(map(nomes.__getitem__, grupo)) for grupo in grupos]
+
+
+def _migrar_para_ids(conn):
+    """Converte uma única vez os grupos gravados como nomes em listas de IDs"""
+    linha = conn.execute("SELECT valor FROM meta WHERE chave = 'formato_grupos'").fetchone()
+    if linha and linha[0] == _FORMATO_GRUPOS:
+        return
+
+    with _transacao(conn):
+        atualizacoes = []
+        for sorteio_id, automaticos, manuais in conn.execute(
+            'SELECT id, grupos_automaticos, grupos_manuais FROM sorteios'
+        ).fetchall():
+            grupos = (json.loads(automaticos), json.loads(manuais))
+            nomes = [aluno for tipo in grupos for grupo in tipo for aluno in grupo]
+            if not any(isinstance(aluno, str) for aluno in nomes):
+                continue
+            ids = _nome_ids(conn, nomes)
+            atualizacoes.append((*(_codificar(tipo, ids) for tipo in grupos), sorteio_id))
+        conn.executemany(
+            'UPDATE sorteios SET grupos_automaticos = ?, grupos_manuais = ? WHERE id = ?',
+            atualizacoes
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (chave, valor) VALUES ('formato_grupos', ?)",
+            (_FORMATO_GRUPOS,)
+        )
+    if atualizacoes:
+        # Devolve ao sistema o espaço que os nomes ocupavam
+        conn.execute('VACUUM')
+
+
+def _pares_do_grupo(nome_ids):
+    """Pares (menor, maior) de IDs distintos de um grupo"""
+    nome_ids = sorted(set(nome_ids))
+    return [
+        (a, b)
+        for i, a in enumerate(nome_ids)
+        for b in nome_ids[i + 1:]
+    ]
+
+
+def _contar_participacoes(ocorrencias):
+    """{nome_id: [grupos automáticos, grupos manuais]} de um sorteio
+
+    `ocorrencias` são pares (nome_id, tipo_grupo).
+    """
+    contagens = {}
+    for nome_id, tipo in ocorrencias:
+        contagens.setdefault(nome_id, [0, 0])[tipo] += 1
+    return contagens
+
+
+def _indexar_sorteio(conn, sorteio_id, grupos_automaticos, grupos_manuais, arquivado=False):
+    """Adiciona as ocorrências, os pares e as participações de um sorteio (grupos de IDs) ao índice.
+
+    Sorteios arquivados não têm ocorrências: só entram nas estatísticas.
+    """
+    ocorrencias = []
+    pares = []
+    for tipo, grupos in enumerate((grupos_automaticos, grupos_manuais)):
+        for numero, nome_ids in enumerate(grupos, start=1):
+            for posicao, nome_id in enumerate(nome_ids):
+                ocorrencias.append((nome_id, sorteio_id, tipo, numero, posicao))
+            pares.extend(_pares_do_grupo(nome_ids))
+    participacoes = _contar_participacoes((nome_id, tipo) for nome_id, _, tipo, _, _ in ocorrencias)
+    if arquivado:
+        ocorrencias = []
+    conn.executemany(
+        'INSERT INTO ocorrencias (nome_id, sorteio_id, tipo_grupo, numero_grupo, posicao) '
+        'VALUES (?, ?, ?, ?, ?)',
+        ocorrencias
+    )
+    conn.executemany(
+        'INSERT INTO pares (nome_a, nome_b, contagem) VALUES (?, ?, 1) '
+        'ON CONFLICT (nome_a, nome_b) DO UPDATE SET contagem = contagem + 1',
+        pares
+    )
+    conn.executemany(
+        'INSERT INTO participacoes (nome_id, sorteios, automaticos, manuais) VALUES (?, 1, ?, ?) '
+        'ON CONFLICT (nome_id) DO UPDATE SET sorteios = sorteios + 1, '
+        'automaticos = automaticos + excluded.automaticos, manuais = manuais + excluded.manuais',
+        [(nome_id, automaticos, manuais) for nome_id, (automaticos, manuais) in participacoes.items()]
+    )
+
+
+def _desindexar_sorteio(conn, sorteio_id):
+    """Remove as ocorrências, os pares e as participações de um sorteio do índice.
+
+    Retorna os grupos (listas de nomes) que foram removidos.
+    """
+    grupos = {}
+    for tipo, numero, nome_id, nome in conn.execute(
+        'SELECT o.tipo_grupo, o.numero_grupo, o.nome_id, n.nome FROM ocorrencias o '
+        'JOIN nomes n ON n.id = o.nome_id WHERE o.sorteio_id = ?',
+        (sorteio_id,)
+    ):
+        grupos.setdefault((tipo, numero), []).append((nome_id, nome))
+
+    pares = [
+        par
+        for membros in grupos.values()
+        for par in _pares_do_grupo([nome_id for nome_id, _ in membros])
+    ]
+    conn.executemany(
+        'UPDATE pares SET contagem = contagem - 1 WHERE nome_a = ? AND nome_b = ?',
+        pares
+    )
+    conn.execute('DELETE FROM pares WHERE contagem <= 0')
+
+    participacoes = _contar_participacoes(
+        (nome_id, tipo) for (tipo, _), membros in grupos.items() for nome_id, _ in membros
+    )
+    conn.executemany(
+        'UPDATE participacoes SET sorteios = sorteios - 1, automaticos = automaticos - ?, '
+        'manuais = manuais - ? WHERE nome_id = ?',
+        [(automaticos, manuais, nome_id) for nome_id, (automaticos, manuais) in participacoes.items()]
+    )
+    conn.execute('DELETE FROM participacoes WHERE sorteios <= 0')
+    conn.execute('DELETE FROM ocorrencias WHERE sorteio_id = ?', (sorteio_id,))
+    return [[nome for _, nome in membros] for membros in grupos.values()]
+
+
+def _verificar_indice(conn, caminho):
+    """Reconstrói o índice de nomes se ele for de outra versão (ou não existir)"""
+    linha = conn.execute("SELECT valor FROM meta WHERE chave = 'indice_versao'").fetchone()
+    if linha and linha[0] == _VERSAO_INDICE:
+        return
+
+    with _transacao(conn):
+        _reconstruir_indice(conn, caminho)
+
+
+def _reconstruir_indice(conn, caminho):
+    """Refaz o índice a partir dos sorteios gravados (dentro da transação de escrita).
+
+    Os sorteios arquivados entram só nas estatísticas (pares e participações).
+    """
+    # O dicionário de alunos é mantido: os sorteios gravados apontam para os seus IDs
+    conn.execute('DELETE FROM ocorrencias')
+    conn.execute('DELETE FROM pares')
+    conn.execute('DELETE FROM participacoes')
+    conn.execute('DELETE FROM trigramas')
+    for nome_id, normalizado in conn.execute('SELECT id, nome_normalizado FROM nomes').fetchall():
+        _indexar_nome(conn, nome_id, normalizado)
+    linhas = conn.execute(
+        'SELECT id, grupos_automaticos, grupos_manuais FROM sorteios'
+    ).fetchall()
+    for sorteio_id, automaticos, manuais in linhas:
+        _indexar_sorteio(conn, sorteio_id, json.loads(automaticos), json.loads(manuais))
+    for arquivo, in conn.execute('SELECT arquivo FROM segmentos ORDER BY id').fetchall():
+        for sorteio in _ler_segmento(caminho, arquivo):
+            grupos = (sorteio['grupos_automaticos'], sorteio['grupos_manuais'])
+            ids = _nome_ids(conn, (aluno for tipo in grupos for grupo in tipo for aluno in grupo))
+            _indexar_sorteio(
+                conn, sorteio['id'], *([[ids[aluno] for aluno in grupo] for grupo in tipo] for tipo in grupos),
+                arquivado=True
+            )
+    _incrementar_versao(conn)
+    conn.execute(
+        "INSERT OR REPLACE INTO meta (chave, valor) VALUES ('indice_versao', ?)",
+        (_VERSAO_INDICE,)
+    )
+
+
+def _nomes_correspondentes(conn, nome_parcial):
+    """IDs dos nomes que contêm o texto buscado"""
+    trigramas = _trigramas(nome_parcial)
+    if trigramas:
+        # Candidatos: nomes que têm todos os trigramas do texto buscado
+        marcadores = ', '.join('?' * len(trigramas))
+        candidatos = conn.execute(
+            f'SELECT n.id, n.nome_normalizado FROM trigramas t '
+            f'JOIN nomes n ON n.id = t.nome_id '
+            f'WHERE t.trigrama IN ({marcadores}) '
+            f'GROUP BY t.nome_id HAVING COUNT(*) = ?',
+            (*trigramas, len(trigramas))
+        ).fetchall()
+    else:
+        # Textos com menos de 3 letras: varre apenas os nomes distintos
+        candidatos = conn.execute('SELECT id, nome_normalizado FROM nomes').fetchall()
+    return [nome_id for nome_id, normalizado in candidatos if nome_parcial in normalizado]
+
+
+# Chaves de um sorteio, na ordem em que o app as conhece
+_CHAVES_SORTEIO = ('id', 'nome', 'data', 'grupos_automaticos', 'grupos_manuais', 'semente', 'fluxo')
+
+
+class _Sorteio(Mapping):
+    """Sorteio lido do banco, somente leitura: os grupos guardam o JSON de IDs
+    e só viram listas de nomes no primeiro acesso.
+
+    Ler o histórico inteiro custa só a leitura das linhas; quem abre poucos
+    sorteios decodifica só esses.
+    """
+
+    __slots__ = ('_caminho', '_campos', '_grupos_json')
+
+    def __init__(self, caminho, linha):
+        self._caminho = caminho
+        self._campos = {'id': linha[0], 'nome': linha[1], 'data': linha[2], 'semente': linha[5], 'fluxo': linha[6]}
+        self._grupos_json = {'grupos_automaticos': linha[3], 'grupos_manuais': linha[4]}
+
+    def __getitem__(self, chave):
+        valor = self._campos.get(chave, self)
+        if valor is self:
+            # Decodificado com a conexão da thread que acessa; a cópia decodificada fica guardada
+            valor = self._campos[chave] = _decodificar(
+                self._caminho, _conexao(self._caminho), self._grupos_json[chave]
+            )
+        return valor
+
+    def __iter__(self):
+        return iter(_CHAVES_SORTEIO)
+
+    def __len__(self):
+        return len(_CHAVES_SORTEIO)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+def salvar(caminho, grupos, nome_sorteio, grupos_manuais=None, semente=None, fluxo=None):
+    """Salva um sorteio e retorna o ID gerado pela sequência do banco.
+
+    `semente` e `fluxo` identificam o gerador usado no sorteio, para que
+    ele possa ser refeito (veja sorteador.gerador).
+    """
+    conn = _conexao(caminho)
+    grupos_manuais = grupos_manuais if grupos_manuais else []
+    data = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    fluxo = None if fluxo is None else str(fluxo)
+    with _transacao(conn):
+        versao_anterior = _versao(conn)
+        ids = _nome_ids(conn, (aluno for grupo in [*grupos, *grupos_manuais] for aluno in grupo))
+        sorteio_id = conn.execute(
+            'INSERT INTO sorteios (nome, data, grupos_automaticos, grupos_manuais, '
+            'total_grupos, total_alunos, semente, fluxo) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (
+                nome_sorteio,
+                data,
+                _codificar(grupos, ids),
+                _codificar(grupos_manuais, ids),
+                *_totais(grupos, grupos_manuais),
+                semente,
+                fluxo,
+            )
+        ).lastrowid
+        _indexar_sorteio(
+            conn,
+            sorteio_id,
+            [[ids[aluno] for aluno in grupo] for grupo in grupos],
+            [[ids[aluno] for aluno in grupo] for grupo in grupos_manuais]
+        )
+        versao = _incrementar_versao(conn)
+    _ajustar_cache_pares(caminho, versao_anterior, versao, [*grupos, *grupos_manuais], 1)
+    _ajustar_cache_historico(caminho, versao_anterior, versao, sorteio_id, {
+        'id': sorteio_id,
+        'nome': nome_sorteio,
+        'data': data,
+        'grupos_automaticos': [list(grupo) for grupo in grupos],
+        'grupos_manuais': [list(grupo) for grupo in grupos_manuais],
+        'semente': semente,
+        'fluxo': fluxo,
+    })
+    return sorteio_id
+
+
+def _historico_em_cache(conn, caminho):
+    """Sorteios em cache {id: sorteio}, se estiverem na versão atual do banco (senão None)"""
+    versao = _versao(conn)
+    with _trava_cache:
+        entrada = _cache_historico.get(_chave(caminho))
+        valida = entrada is not None and entrada[0] == versao
+        _contadores_cache['histórico']['acertos' if valida else 'falhas'] += 1
+        return entrada[1] if valida else None
+
+
+def carregar(caminho):
+    """Carrega todos os sorteios salvos no banco (sem os arquivados), em ordem de ID.
+
+    O histórico lido fica em memória, compartilhado entre as sessões, e é
+    atualizado sem reler o banco a cada salvamento/exclusão deste processo:
+    as leituras seguintes só conferem a versão do banco. Os sorteios
+    retornados são compartilhados: não os altere.
+    """
+    conn = _conexao(caminho)
+    historico = _historico_em_cache(conn, caminho)
+    if historico is None:
+        historico = _ler_historico(conn, caminho)
+    return list(historico.values())
+
+
+def _ler_historico(conn, caminho):
+    """Lê todos os sorteios (grupos decodificados sob demanda), guardando-os no cache em memória"""
+    # Leitura consistente: versão e sorteios da mesma transação
+    conn.execute('BEGIN')
+    try:
+        versao = _versao(conn)
+        linhas = conn.execute(
+            'SELECT id, nome, data, grupos_automaticos, grupos_manuais, semente, fluxo '
+            'FROM sorteios ORDER BY id'
+        ).fetchall()
+        historico = {linha[0]: _Sorteio(caminho, linha) for linha in linhas}
+    finally:
+        conn.execute('COMMIT')
+
+    with _trava_cache:
+        _cache_historico[_chave(caminho)] = (versao, historico)
+    return historico
+
+
+def carregar_sorteio(caminho, sorteio_id):
+    """Carrega um único sorteio pelo ID (ou None se não existir).
+
+    Os sorteios do banco vêm do histórico em cache; os arquivados, do
+    segmento que contém o ID.
+    """
+    conn = _conexao(caminho)
+    historico = _historico_em_cache(conn, caminho)
+    if historico is None:
+        historico = _ler_historico(conn, caminho)
+    if sorteio_id in historico:
+        return historico[sorteio_id]
+
+    for arquivo, in conn.execute(
+        'SELECT arquivo FROM segmentos WHERE ? BETWEEN primeiro_id AND ultimo_id', (sorteio_id,)
+    ).fetchall():
+        for sorteio in _ler_segmento(caminho, arquivo):
+            if sorteio['id'] == sorteio_id:
+                return sorteio
+    return None
+
+
+def listar(caminho, filtro_nome=None, data_inicio=None, data_fim=None, limite=10, deslocamento=0):
+    """Resumos dos sorteios salvos, do mais recente para o mais antigo, sem os grupos.
+
+    Filtra por parte do nome do sorteio e por intervalo de datas
+    (datetime.date, inclusive) e pagina com `limite`/`deslocamento`.
+    Retorna (resumos, total de sorteios que passam no filtro).
+    """
+    conn = _conexao(caminho)
+    condicoes = []
+    parametros = []
+    if filtro_nome and filtro_nome.strip():
+        condicoes.append('instr(normalizar(nome), ?) > 0')
+        parametros.append(normalizar(filtro_nome))
+    if data_inicio:
+        condicoes.append('data >= ?')
+        parametros.append(data_inicio.isoformat())
+    if data_fim:
+        condicoes.append("data < date(?, '+1 day')")
+        parametros.append(data_fim.isoformat())
+    where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ''
+
+    total = conn.execute(f'SELECT COUNT(*) FROM sorteios {where}', parametros).fetchone()[0]
+    linhas = conn.execute(
+        f'SELECT id, nome, data, total_grupos, total_alunos, semente, fluxo FROM sorteios {where} '
+        f'ORDER BY id DESC LIMIT ? OFFSET ?',
+        (*parametros, limite, deslocamento)
+    ).fetchall()
+    chaves = ('id', 'nome', 'data', 'total_grupos', 'total_alunos', 'semente', 'fluxo')
+    resumos = [dict(zip(chaves, linha)) for linha in linhas]
+    return resumos, total
+
+
+def deletar(caminho, sorteio_id):
+    """Deleta um sorteio salvo.
+
+    Retorna False se o sorteio não existe. Sorteios arquivados não podem
+    ser excluídos (os segmentos são imutáveis): lança ValueError.
+    """
+    conn = _conexao(caminho)
+    with _transacao(conn):
+        if conn.execute('SELECT 1 FROM sorteios WHERE id = ?', (sorteio_id,)).fetchone() is None:
+            for arquivo, in conn.execute(
+                'SELECT arquivo FROM segmentos WHERE ? BETWEEN primeiro_id AND ultimo_id', (sorteio_id,)
+            ).fetchall():
+                if any(sorteio['id'] == sorteio_id for sorteio in _ler_segmento(caminho, arquivo)):
+                    raise ValueError(
+                        f"O sorteio {sorteio_id} está arquivado em {arquivo} e não pode ser excluído."
+                    )
+            return False
+        versao_anterior = _versao(conn)
+        grupos = _desindexar_sorteio(conn, sorteio_id)
+        conn.execute('DELETE FROM sorteios WHERE id = ?', (sorteio_id,))
+        versao = _incrementar_versao(conn)
+    _ajustar_cache_pares(caminho, versao_anterior, versao, grupos, -1)
+    _ajustar_cache_historico(caminho, versao_anterior, versao, sorteio_id, None)
+    return True
+
+
+def buscar(caminho, nome_parcial):
+    """Busca em qual grupo um aluno está, usando o índice de trigramas.
+
+    Os segmentos de arquivo só são lidos para os nomes encontrados que
+    não estão em nenhum sorteio do banco.
+    """
+    conn = _conexao(caminho)
+    nome_parcial = normalizar(nome_parcial)
+    # O dicionário de alunos também tem os nomes arquivados
+    nome_ids = _nomes_correspondentes(conn, nome_parcial)
+    if not nome_ids:
+        return []
+
+    # Só o grupo de cada ocorrência é extraído do JSON do sorteio
+    ocorrencias = conn.execute(
+        'SELECT o.sorteio_id, s.nome, s.data, o.tipo_grupo, o.numero_grupo, n.nome, o.nome_id, '
+        "json_extract(CASE o.tipo_grupo WHEN 0 THEN s.grupos_automaticos ELSE s.grupos_manuais END, "
+        "'$[' || (o.numero_grupo - 1) || ']') "
+        'FROM ocorrencias o '
+        'JOIN nomes n ON n.id = o.nome_id '
+        'JOIN sorteios s ON s.id = o.sorteio_id '
+        'WHERE o.nome_id IN (SELECT value FROM json_each(?)) '
+        'ORDER BY o.sorteio_id, o.tipo_grupo, o.numero_grupo, o.posicao',
+        (json.dumps(nome_ids),)
+    ).fetchall()
+
+    grupos = _nomes_dos_grupos(caminho, conn, [json.loads(linha[7]) for linha in ocorrencias])
+    resultados = []
+    for (sorteio_id, sorteio_nome, data, tipo, numero_grupo, aluno, _, _), grupo in zip(ocorrencias, grupos):
+        resultados.append({
+            'sorteio_id': sorteio_id,
+            'sorteio_nome': sorteio_nome,
+            'data': data,
+            'tipo_grupo': _TIPOS_GRUPO[tipo],
+            'numero_grupo': numero_grupo,
+            'aluno': aluno,
+            'grupo_completo': grupo
+        })
+
+    # Nomes que só aparecem em sorteios arquivados
+    no_banco = {linha[6] for linha in ocorrencias}
+    arquivados = [nome_id for nome_id in nome_ids if nome_id not in no_banco]
+    if not arquivados:
+        return resultados
+    nomes = _dicionario(caminho, conn, arquivados)
+    resultados += _buscar_arquivados(caminho, conn, {nomes[nome_id] for nome_id in arquivados})
+    # Cada sorteio vem inteiro de uma das fontes, já na ordem de grupo e posição
+    return sorted(resultados, key=lambda resultado: resultado['sorteio_id'])
+
+
+def versao(caminho):
+    """Versão atual do banco: muda a cada salvamento, exclusão ou compactação.
+
+    Consulta barata (uma linha da tabela meta), para quem guarda dados
+    derivados do histórico saber quando relê-los.
+    """
+    return _versao(_conexao(caminho))
+
+
+def ler_ocorrencias(caminho):
+    """Todas as ocorrências de alunos, no banco e nos segmentos de arquivo, com a versão lida.
+
+    Versão e linhas vêm da mesma transação. Retorna (versão, linhas), cada
+    linha uma tupla (sorteio_id, nome do sorteio, data, tipo do grupo,
+    número do grupo, posição, aluno, nome normalizado, arquivado), em
+    ordem de sorteio, grupo e posição. Como em `buscar`, as ocorrências
+    arquivadas só contam para os alunos que não estão em nenhum sorteio
+    do banco; as demais linhas arquivadas servem para completar os grupos.
+    """
+    conn = _conexao(caminho)
+    conn.execute('BEGIN')
+    try:
+        versao_lida = _versao(conn)
+        linhas = conn.execute(
+            'SELECT o.sorteio_id, s.nome, s.data, o.tipo_grupo, o.numero_grupo, o.posicao, '
+            'n.nome, n.nome_normalizado '
+            'FROM ocorrencias o '
+            'JOIN nomes n ON n.id = o.nome_id '
+            'JOIN sorteios s ON s.id = o.sorteio_id '
+            'ORDER BY o.sorteio_id, o.tipo_grupo, o.numero_grupo, o.posicao'
+        ).fetchall()
+        # Os arquivos dos segmentos são gravados antes do registro e nunca mudam
+        arquivos = [arquivo for arquivo, in conn.execute('SELECT arquivo FROM segmentos ORDER BY primeiro_id')]
+    finally:
+        conn.execute('COMMIT')
+
+    ocorrencias = [
+        (sorteio_id, sorteio_nome, data, _TIPOS_GRUPO[tipo], *resto, False)
+        for sorteio_id, sorteio_nome, data, tipo, *resto in linhas
+    ]
+    for arquivo in arquivos:
+        for sorteio in _ler_segmento(caminho, arquivo):
+            for tipo, grupos in enumerate((sorteio['grupos_automaticos'], sorteio['grupos_manuais'])):
+                for numero, grupo in enumerate(grupos, start=1):
+                    for posicao, aluno in enumerate(grupo):
+                        ocorrencias.append((
+                            sorteio['id'], sorteio['nome'], sorteio['data'], _TIPOS_GRUPO[tipo],
+                            numero, posicao, aluno, normalizar(aluno), True,
+                        ))
+    if arquivos:
+        ocorrencias.sort(key=lambda linha: (linha[0], _TIPOS_GRUPO.index(linha[3]), linha[4], linha[5]))
+    return versao_lida, ocorrencias
+
+
+def participacoes(caminho, nome_parcial=None):
+    """Quantas vezes cada aluno participou dos sorteios salvos.
+
+    Lê as contagens mantidas a cada salvamento/exclusão, sem percorrer o
+    histórico. Retorna dicionários {'aluno', 'sorteios', 'automaticos',
+    'manuais'} (grupos automáticos e manuais em que o aluno foi colocado),
+    do mais frequente para o menos, opcionalmente filtrados por parte do nome.
+    """
+    conn = _conexao(caminho)
+    condicao = ''
+    parametros = ()
+    if nome_parcial and nome_parcial.strip():
+        nome_ids = _nomes_correspondentes(conn, normalizar(nome_parcial))
+        condicao = 'WHERE p.nome_id IN (SELECT value FROM json_each(?))'
+        parametros = (json.dumps(nome_ids),)
+
+    linhas = conn.execute(
+        f'SELECT n.nome, p.sorteios, p.automaticos, p.manuais FROM participacoes p '
+        f'JOIN nomes n ON n.id = p.nome_id {condicao} '
+        f'ORDER BY p.sorteios DESC, n.nome',
+        parametros
+    ).fetchall()
+    chaves = ('aluno', 'sorteios', 'automaticos', 'manuais')
+    return [dict(zip(chaves, linha)) for linha in linhas]
+
+
+def estatisticas_aluno(caminho, nome, limite_parceiros=5):
+    """Participações de um aluno e os colegas com quem ele mais ficou no mesmo grupo.
+
+    Consulta só as linhas do próprio aluno (chave primária e índices de
+    pares). Retorna o dicionário de `participacoes` com a chave extra
+    'parceiros' ([(nome, vezes)], do mais frequente para o menos), ou None
+    se o aluno não está em nenhum sorteio salvo.
+    """
+    conn = _conexao(caminho)
+    conn.execute('BEGIN')
+    try:
+        linha = conn.execute(
+            'SELECT n.id, p.sorteios, p.automaticos, p.manuais FROM nomes n '
+            'JOIN participacoes p ON p.nome_id = n.id WHERE n.nome = ?',
+            (nome,)
+        ).fetchone()
+        if linha is None:
+            return None
+        nome_id, sorteios, automaticos, manuais = linha
+        parceiros = conn.execute(
+            'SELECT n.nome, v.contagem FROM ('
+            'SELECT nome_b AS outro, contagem FROM pares WHERE nome_a = ? '
+            'UNION ALL SELECT nome_a, contagem FROM pares WHERE nome_b = ?'
+            ') v JOIN nomes n ON n.id = v.outro '
+            'ORDER BY v.contagem DESC, n.nome LIMIT ?',
+            (nome_id, nome_id, limite_parceiros)
+        ).fetchall()
+    finally:
+        conn.execute('COMMIT')
+
+    return {
+        'aluno': nome,
+        'sorteios': sorteios,
+        'automaticos': automaticos,
+        'manuais': manuais,
+        'parceiros': parceiros,
+    }
+
+
+def reconstruir_estatisticas(caminho):
+    """Refaz do zero o índice e as estatísticas a partir dos sorteios gravados.
+
+    Serve para conferir a consistência das contagens mantidas de forma
+    incremental. Retorna quantas linhas de pares e de participações
+    estavam diferentes do recalculado: {'pares': n, 'participacoes': n}.
+    """
+    conn = _conexao(caminho)
+    with _transacao(conn):
+        antes = _estatisticas_gravadas(conn)
+        _reconstruir_indice(conn, caminho)
+        depois = _estatisticas_gravadas(conn)
+    return {
+        tabela: sum(1 for chave in antes[tabela].keys() | depois[tabela].keys()
+                    if antes[tabela].get(chave) != depois[tabela].get(chave))
+        for tabela in antes
+    }
+
+
+def _estatisticas_gravadas(conn):
+    """Linhas das tabelas de estatísticas, indexadas pela chave primária"""
+    return {
+        'pares': {(a, b): contagem for a, b, contagem in conn.execute('SELECT nome_a, nome_b, contagem FROM pares')},
+        'participacoes': {
+            nome_id: contagens
+            for nome_id, *contagens in conn.execute(
+                'SELECT nome_id, sorteios, automaticos, manuais FROM participacoes'
+            )
+        },
+    }
+
+
+def _ajustar_cache_pares(caminho, versao_anterior, versao, grupos, sinal):
+    """Aplica uma escrita feita por este processo à matriz de pares em memória.
+
+    Se a matriz em cache não estiver exatamente na versão anterior à escrita
+    (outro processo escreveu no meio), ela é descartada e recarregada na
+    próxima consulta.
+    """
+    chave = _chave(caminho)
+    with _trava_cache:
+        entrada = _cache_pares.pop(chave, None)
+        if entrada is None or entrada[0] != versao_anterior:
+            return
+
+        vizinhos = entrada[1]
+        for grupo in grupos:
+            membros = sorted(set(grupo))
+            for i, a in enumerate(membros):
+                for b in membros[i + 1:]:
+                    for x, y in ((a, b), (b, a)):
+                        contagens = vizinhos.setdefault(x, {})
+                        contagem = contagens.get(y, 0) + sinal
+                        if contagem > 0:
+                            contagens[y] = contagem
+                        else:
+                            contagens.pop(y, None)
+                            if not contagens:
+                                del vizinhos[x]
+        _cache_pares[chave] = (versao, vizinhos)
+
+
+def _ajustar_cache_historico(caminho, versao_anterior, versao, sorteio_id, sorteio):
+    """Aplica uma escrita deste processo ao histórico em memória (sorteio None = exclusão).
+
+    Mesma regra da matriz de pares: se o cache não estiver na versão
+    anterior à escrita, ele é descartado e relido na próxima consulta.
+    """
+    chave = _chave(caminho)
+    with _trava_cache:
+        entrada = _cache_historico.pop(chave, None)
+        if entrada is None or entrada[0] != versao_anterior:
+            return
+
+        # Cópia rasa (só referências): as leituras em andamento usam o dicionário antigo sem trava
+        historico = dict(entrada[1])
+        if sorteio is None:
+            historico.pop(sorteio_id, None)
+        else:
+            historico[sorteio_id] = sorteio
+        _cache_historico[chave] = (versao, historico)
+
+
+def estatisticas_cache():
+    """Acertos e falhas dos caches em memória deste processo: {cache: {'acertos', 'falhas'}}"""
+    with _trava_cache:
+        return {nome: dict(contadores) for nome, contadores in _contadores_cache.items()}
+
+
+def carregar_pares(caminho):
+    """Quantas vezes cada par de alunos já ficou no mesmo grupo.
+
+    Retorna um dicionário esparso e simétrico {nome: {outro_nome: vezes}},
+    contando grupos automáticos e manuais de todos os sorteios salvos. O
+    dicionário fica em memória, compartilhado entre as sessões, e é
+    atualizado no lugar a cada salvamento/exclusão: não o altere.
+    """
+    conn = _conexao(caminho)
+    chave = _chave(caminho)
+    versao = _versao(conn)
+    with _trava_cache:
+        entrada = _cache_pares.get(chave)
+        valida = entrada is not None and entrada[0] == versao
+        _contadores_cache['pares']['acertos' if valida else 'falhas'] += 1
+        if valida:
+            return entrada[1]
+
+    # Leitura consistente: versão e pares da mesma transação
+    conn.execute('BEGIN')
+    try:
+        versao = _versao(conn)
+        nomes = dict(conn.execute('SELECT id, nome FROM nomes'))
+        linhas = conn.execute('SELECT nome_a, nome_b, contagem FROM pares').fetchall()
+    finally:
+        conn.execute('COMMIT')
+
+    vizinhos = {}
+    for nome_a, nome_b, contagem in linhas:
+        a = nomes[nome_a]
+        b = nomes[nome_b]
+        vizinhos.setdefault(a, {})[b] = contagem
+        vizinhos.setdefault(b, {})[a] = contagem
+
+    with _trava_cache:
+        _cache_pares[chave] = (versao, vizinhos)
+    return vizinhos
+
+
+def diretorio_arquivo(caminho):
+    """Diretório dos segmentos de arquivo de um banco"""
+    return Path(caminho).with_suffix('.arquivo')
+
+
+def _gravar_atomico(destino, conteudo):
+    """Grava os bytes em um arquivo temporário e o move para o destino"""
+    descritor, temporario = tempfile.mkstemp(dir=destino.parent, prefix=destino.name, suffix='.tmp')
+    try:
+        with os.fdopen(descritor, 'wb') as f:
+            f.write(conteudo)
+        os.replace(temporario, destino)
+    except BaseException:
+        os.unlink(temporario)
+        raise
+
+
+def _ler_segmento(caminho, arquivo):
+    """Sorteios (com os nomes por extenso) de um segmento de arquivo"""
+    with gzip.open(diretorio_arquivo(caminho) / f"{arquivo}.json.gz", 'rt', encoding='utf-8') as f:
+        return json.load(f)['sorteios']
+
+
+def _nomes_segmento(caminho, arquivo):
+    """Índice de nomes de um segmento: [(nome, nome normalizado)]"""
+    indice = diretorio_arquivo(caminho) / f"{arquivo}.nomes.json"
+    with _trava_cache:
+        nomes = _cache_segmentos.get(str(indice))
+    if nomes is None:
+        nomes = [(nome, normalizar(nome)) for nome in json.loads(indice.read_text(encoding='utf-8'))]
+        with _trava_cache:
+            _cache_segmentos[str(indice)] = nomes
+    return nomes
+
+
+def _buscar_arquivados(caminho, conn, nomes):
+    """Ocorrências dos `nomes` nos segmentos de arquivo, abrindo só os segmentos que têm algum deles"""
+    resultados = []
+    for arquivo, in conn.execute('SELECT arquivo FROM segmentos ORDER BY primeiro_id').fetchall():
+        encontrados = {nome for nome, _ in _nomes_segmento(caminho, arquivo) if nome in nomes}
+        if not encontrados:
+            continue
+        for sorteio in _ler_segmento(caminho, arquivo):
+            for tipo, grupos in enumerate((sorteio['grupos_automaticos'], sorteio['grupos_manuais'])):
+                for numero, grupo in enumerate(grupos, start=1):
+                    for aluno in grupo:
+                        if aluno in encontrados:
+                            resultados.append({
+                                'sorteio_id': sorteio['id'],
+                                'sorteio_nome': sorteio['nome'],
+                                'data': sorteio['data'],
+                                'tipo_grupo': _TIPOS_GRUPO[tipo],
+                                'numero_grupo': numero,
+                                'aluno': aluno,
+                                'grupo_completo': grupo
+                            })
+    return resultados
+
+
+def segmentos(caminho):
+    """Resumos dos segmentos de arquivo, do mais antigo para o mais recente"""
+    conn = _conexao(caminho)
+    chaves = ('arquivo', 'primeiro_id', 'ultimo_id', 'total_sorteios', 'data_inicio', 'data_fim', 'criado')
+    linhas = conn.execute(f"SELECT {', '.join(chaves)} FROM segmentos ORDER BY id").fetchall()
+    return [dict(zip(chaves, linha)) for linha in linhas]
+
+
+def todos_os_sorteios(caminho):
+    """Gera todos os sorteios: os arquivados, um segmento de cada vez, e depois os do banco.
+
+    A lista de segmentos e os sorteios do banco vêm da mesma leitura, então
+    um arquivamento feito no meio não repete nem perde sorteios. Só um
+    segmento fica na memória por vez.
+    """
+    conn = _conexao(caminho)
+    conn.execute('BEGIN')
+    try:
+        arquivos = [arquivo for arquivo, in conn.execute('SELECT arquivo FROM segmentos ORDER BY primeiro_id')]
+        linhas = conn.execute(
+            'SELECT id, nome, data, grupos_automaticos, grupos_manuais, semente, fluxo '
+            'FROM sorteios ORDER BY id'
+        ).fetchall()
+    finally:
+        conn.execute('COMMIT')
+
+    for arquivo in arquivos:
+        yield from _ler_segmento(caminho, arquivo)
+    for linha in linhas:
+        yield _Sorteio(caminho, linha)
+
+
+def compactar(caminho, dias=RETENCAO_PADRAO_DIAS, agora=None):
+    """Move os sorteios com mais de `dias` dias para um novo segmento de arquivo.
+
+    O segmento (JSON compactado com gzip) e o seu índice de nomes são
+    gravados antes de os sorteios saírem do banco, na mesma transação que
+    os registra na tabela segmentos: uma falha no meio não perde nenhum
+    sorteio. Retorna o resumo do segmento criado, ou None se não havia
+    sorteios antigos.
+    """
+    conn = _conexao(caminho)
+    limite = ((agora or datetime.now()) - timedelta(days=dias)).strftime('%Y-%m-%d %H:%M:%S')
+    diretorio = diretorio_arquivo(caminho)
+    diretorio.mkdir(exist_ok=True)
+
+    with _transacao(conn):
+        versao_anterior = _versao(conn)
+        linhas = conn.execute(
+            'SELECT id, nome, data, grupos_automaticos, grupos_manuais, semente, fluxo '
+            'FROM sorteios WHERE data < ? ORDER BY id',
+            (limite,)
+        ).fetchall()
+        if not linhas:
+            return None
+
+        sorteios = [dict(_Sorteio(caminho, linha)) for linha in linhas]
+        ids = [sorteio['id'] for sorteio in sorteios]
+        datas = sorted(sorteio['data'] for sorteio in sorteios)
+        resumo = {
+            'arquivo': f"segmento_{ids[0]:08d}_{ids[-1]:08d}",
+            'primeiro_id': ids[0],
+            'ultimo_id': ids[-1],
+            'total_sorteios': len(sorteios),
+            'data_inicio': datas[0],
+            'data_fim': datas[-1],
+            'criado': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        conn.execute(
+            'INSERT INTO segmentos (arquivo, primeiro_id, ultimo_id, total_sorteios, data_inicio, data_fim, criado) '
+            'VALUES (:arquivo, :primeiro_id, :ultimo_id, :total_sorteios, :data_inicio, :data_fim, :criado)',
+            resumo
+        )
+
+        nomes = sorted({
+            aluno
+            for sorteio in sorteios
+            for grupo in [*sorteio['grupos_automaticos'], *sorteio['grupos_manuais']]
+            for aluno in grupo
+        })
+        conteudo = json.dumps({'sorteios': sorteios}, ensure_ascii=False, separators=(',', ':'))
+        _gravar_atomico(diretorio / f"{resumo['arquivo']}.json.gz", gzip.compress(conteudo.encode('utf-8')))
+        _gravar_atomico(
+            diretorio / f"{resumo['arquivo']}.nomes.json",
+            json.dumps(nomes, ensure_ascii=False).encode('utf-8')
+        )
+
+        # Pares e participações ficam: as estatísticas continuam contando os arquivados
+        marcadores = (json.dumps(ids),)
+        conn.execute('DELETE FROM ocorrencias WHERE sorteio_id IN (SELECT value FROM json_each(?))', marcadores)
+        conn.execute('DELETE FROM sorteios WHERE id IN (SELECT value FROM json_each(?))', marcadores)
+        versao = _incrementar_versao(conn)
+
+    # A matriz de pares não muda; o histórico em memória é relido na próxima consulta
+    _ajustar_cache_pares(caminho, versao_anterior, versao, [], 1)
+    with _trava_cache:
+        _cache_historico.pop(_chave(caminho), None)
+    # Devolve ao sistema o espaço que os sorteios arquivados ocupavam (em modo
+    # WAL, o arquivo só diminui no checkpoint)
+    conn.execute('VACUUM')
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    return resumo
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move os sorteios antigos para segmentos de arquivo")
+    parser.add_argument('--banco', type=Path, default=ARQUIVO_PADRAO, help="Banco do histórico")
+    parser.add_argument('--dias', type=int, default=RETENCAO_PADRAO_DIAS,
+                        help="Arquiva os sorteios com mais de DIAS dias")
+    args = parser.parse_args(argv)
+
+    resumo = compactar(args.banco, args.dias)
+    if resumo is None:
+        print(f"Nenhum sorteio com mais de {args.dias} dias.", file=sys.stderr)
+    else:
+        print(
+            f"{resumo['total_sorteios']} sorteio(s) (IDs {resumo['primeiro_id']} a {resumo['ultimo_id']}) "
+            f"arquivado(s) em {diretorio_arquivo(args.banco) / resumo['arquivo']}.json.gz",
+            file=sys.stderr,
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""Teste de carga local do servidor de consulta pública (consulta.py).
+
+Gera um histórico sintético, publica o snapshot, sobe o servidor em outro
+processo e dispara buscas de vários clientes ao mesmo tempo, como uma
+turma inteira procurando o próprio grupo quando o resultado sai:
+
+    python -m benchmarks.consulta --clientes 8 --duracao 10 --meta-rps 1000
+
+Imprime vazão e latências em JSON e termina com código 1 se alguma meta
+(--meta-rps, --meta-p95-ms) não for atingida. Execute a partir da raiz
+do repositório.
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import quote
+
+import consulta
+from benchmarks.desempenho import RAIZ, gerar_historico, gerar_lista
+from dados import ler_lista
+
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _aguardar(porta, limite=10.0):
+    """Espera o servidor responder em /saude"""
+    prazo = time.monotonic() + limite
+    while time.monotonic() < prazo:
+        try:
+            conexao = http.client.HTTPConnection('127.0.0.1', porta, timeout=1)
+            conexao.request('GET', '/saude')
+            if conexao.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("O servidor de consulta não respondeu")
+
+
+def _cliente(args):
+    """Faz buscas em uma conexão persistente até o prazo; retorna as latências"""
+    porta, consultas, duracao, semente = args
+    rng = random.Random(semente)
+    conexao = http.client.HTTPConnection('127.0.0.1', porta, timeout=10)
+    latencias = []
+    erros = 0
+    prazo = time.perf_counter() + duracao
+    while time.perf_counter() < prazo:
+        caminho = f"/buscar?nome={quote(rng.choice(consultas))}"
+        inicio = time.perf_counter()
+        conexao.request('GET', caminho)
+        resposta = conexao.getresponse()
+        resposta.read()
+        latencias.append(time.perf_counter() - inicio)
+        if resposta.status != 200:
+            erros += 1
+    conexao.close()
+    return latencias, erros
+
+
+def executar(n_alunos, n_sorteios, clientes, duracao, diretorio):
+    """Roda o teste de carga e retorna o relatório"""
+    df = ler_lista(gerar_lista(diretorio / "lista.csv", n_alunos, semente=1))
+    banco = diretorio / "historico.db"
+    gerar_historico(banco, df, n_sorteios)
+
+    inicio = time.perf_counter()
+    consulta.publicar(banco)
+    tempo_publicacao = time.perf_counter() - inicio
+
+    # Buscas pelo número de cada aluno: cada uma encontra uma pessoa por sorteio
+    consultas = [nome[-7:] for nome in df['Nome'].tolist()]
+    porta = _porta_livre()
+    servidor = subprocess.Popen(
+        [sys.executable, '-m', 'consulta', '--banco', str(banco), '--host', '127.0.0.1', '--porta', str(porta)],
+        cwd=RAIZ,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        _aguardar(porta)
+        with multiprocessing.get_context('spawn').Pool(clientes) as pool:
+            inicio = time.perf_counter()
+            resultados = pool.map(_cliente, [(porta, consultas, duracao, i) for i in range(clientes)])
+            decorrido = time.perf_counter() - inicio
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+    latencias = sorted(l for lista, _ in resultados for l in lista)
+    quantis = statistics.quantiles(latencias, n=100)
+    return {
+        'n_alunos': n_alunos,
+        'n_sorteios': n_sorteios,
+        'clientes': clientes,
+        'publicar_s': tempo_publicacao,
+        'requisicoes': len(latencias),
+        'erros': sum(erros for _, erros in resultados),
+        'rps': len(latencias) / decorrido,
+        'p50_ms': quantis[49] * 1000,
+        'p95_ms': quantis[94] * 1000,
+        'p99_ms': quantis[98] * 1000,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga da consulta pública")
+    parser.add_argument('--alunos', type=int, default=200, help="Alunos em cada sorteio sintético")
+    parser.add_argument('--sorteios', type=int, default=100, help="Sorteios no histórico sintético")
+    parser.add_argument('--clientes', type=int, default=8, help="Clientes simultâneos (um processo cada)")
+    parser.add_argument('--duracao', type=float, default=5.0, help="Duração da carga em segundos")
+    parser.add_argument('--meta-rps', type=float, help="Vazão mínima aceitável (requisições/s)")
+    parser.add_argument('--meta-p95-ms', type=float, help="Latência p95 máxima aceitável (ms)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        relatorio = executar(args.alunos, args.sorteios, args.clientes, args.duracao, Path(tmp))
+    print(json.dumps(relatorio, ensure_ascii=False, indent=2))
+
+    falhas = []
+    if relatorio['erros']:
+        falhas.append(f"{relatorio['erros']} respostas com erro")
+    if args.meta_rps is not None and relatorio['rps'] < args.meta_rps:
+        falhas.append(f"vazão {relatorio['rps']:.0f} req/s abaixo da meta de {args.meta_rps:.0f}")
+    if args.meta_p95_ms is not None and relatorio['p95_ms'] > args.meta_p95_ms:
+        falhas.append(f"p95 de {relatorio['p95_ms']:.1f} ms acima da meta de {args.meta_p95_ms:.1f}")
+    for falha in falhas:
+        print(f"❌ {falha}", file=sys.stderr)
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""Benchmark reproduzível dos caminhos de sorteio, busca, salvamento e exibição.
+
+Gera listas de chamada sintéticas no mesmo formato de
+dados_chamada/dados_manha.csv e um histórico sintético de sorteios, mede
+cada operação e grava os tempos em JSON para comparar entre commits:
+
+    python -m benchmarks.desempenho --saida bench.json
+    python -m benchmarks.desempenho --alunos 100 1000 --historicos 10 100
+
+Execute a partir da raiz do repositório.
+"""
+import argparse
+import itertools
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import armazenamento
+from cadastro import CALOURO, VETERANO, Cadastro
+from dados import ler_lista
+from sorteador import sortear_grupos
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+NOMES = ['ANA', 'BRUNO', 'CAMILY', 'DAVI', 'ELOÁ', 'FELIPE', 'GABRIELA', 'HEITOR',
+         'ISADORA', 'JOÃO', 'LARISSA', 'MIGUEL', 'NICOLAS', 'PEDRO', 'RAFAELA', 'SOFIA']
+SOBRENOMES = ['SILVA', 'SANTOS', 'OLIVEIRA', 'SOUZA', 'LIMA', 'PEREIRA', 'COSTA',
+              'RODRIGUES', 'ALMEIDA', 'BARBOSA', 'DURÃES', 'ARARUNA', 'VERSIANE']
+
+
+def gerar_lista(caminho, n_alunos, semente=0, proporcao_calouros=0.4):
+    """Grava uma lista de chamada sintética com nomes únicos (mesmo formato do CSV real)"""
+    rng = random.Random(semente)
+    with open(caminho, 'w', encoding='utf-8-sig', newline='') as f:
+        f.write('Nome;Turma;;;;\n')
+        for i in range(n_alunos):
+            nome = f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)} {i:07d} "
+            turma = CALOURO if rng.random() < proporcao_calouros else VETERANO
+            f.write(f"{nome};{turma};;;;\n")
+    return caminho
+
+
+def gerar_historico(banco, df, n_sorteios, semente=0):
+    """Salva `n_sorteios` sorteios sintéticos da lista `df` no banco"""
+    rng = random.Random(semente)
+    for i in range(n_sorteios):
+        armazenamento.salvar(banco, sortear_grupos(df, 4, rng=rng), f"Sorteio sintético {i + 1}")
+
+
+def medir(funcao, repeticoes):
+    """Executa `funcao` `repeticoes` vezes e retorna os tempos em segundos"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return tempos
+
+
+def _resultado(operacao, tempos, **parametros):
+    return {
+        'operacao': operacao,
+        **parametros,
+        'repeticoes': len(tempos),
+        'min_s': min(tempos),
+        'mediana_s': statistics.median(tempos),
+        'max_s': max(tempos),
+    }
+
+
+def _repeticoes(n_alunos):
+    """Menos repetições para as entradas grandes"""
+    return max(1, min(20, 200_000 // max(n_alunos, 1)))
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _app():
+    """Importa o módulo do app em modo bare (sem servidor Streamlit)"""
+    import streamlit.config
+    import streamlit.logger
+
+    import app_sorteio
+
+    # Sem servidor, cada chamada do Streamlit emitiria um aviso. A leitura da
+    # configuração redefine o nível do log, então ela é forçada antes
+    streamlit.config.get_config_options()
+    streamlit.logger.set_log_level('error')
+    return app_sorteio
+
+
+def executar(alunos, historicos, max_alunos_exibicao, alunos_historico, diretorio):
+    """Roda todas as medições e retorna a lista de resultados"""
+    resultados = []
+
+    for n in alunos:
+        arquivo = gerar_lista(diretorio / f"lista_{n}.csv", n, semente=n)
+        repeticoes = _repeticoes(n)
+
+        tempos = medir(lambda: ler_lista(arquivo), repeticoes)
+        resultados.append(_resultado('carregar_dados', tempos, n_alunos=n))
+        df = ler_lista(arquivo)
+
+        rng = random.Random(n)
+        tempos = medir(lambda: sortear_grupos(df, 4, rng=rng), repeticoes)
+        resultados.append(_resultado('sortear_grupos', tempos, n_alunos=n))
+
+        if n <= max_alunos_exibicao:
+            exibir_grupos = _app().exibir_grupos
+            grupos = sortear_grupos(df, 4, rng=rng)
+            cadastro = Cadastro.de_dataframe(df)
+            tempos = medir(lambda: exibir_grupos(grupos, cadastro), max(1, repeticoes // 4))
+            resultados.append(_resultado('exibir_grupos', tempos, n_alunos=n))
+
+        print(f"lista com {n} alunos: ok", file=sys.stderr)
+
+    arquivo = gerar_lista(diretorio / "lista_historico.csv", alunos_historico, semente=1)
+    df = ler_lista(arquivo)
+    nomes = df['Nome'].tolist()
+    banco = diretorio / "historico.db"
+    total = 0
+    # O salvamento é medido pela função do app, com tudo o que ela faz além de gravar
+    app = _app()
+    app.GRUPOS_FILE = banco
+
+    for n_sorteios in sorted(historicos):
+        gerar_historico(banco, df, n_sorteios - total, semente=n_sorteios)
+        total = n_sorteios
+        repeticoes = max(1, min(20, 20_000 // n_sorteios))
+        parametros = {'n_sorteios': n_sorteios, 'n_alunos': alunos_historico}
+
+        grupos = sortear_grupos(df, 4, rng=random.Random(0))
+        ids = []
+        tempos = medir(lambda: ids.append(app.salvar_grupos(grupos, "bench")), 5)
+        for sorteio_id in ids:
+            app.deletar_sorteio(sorteio_id)
+        resultados.append(_resultado('salvar_grupos', tempos, **parametros))
+
+        tempos = medir(lambda: armazenamento.carregar(banco), repeticoes)
+        resultados.append(_resultado('carregar_grupos', tempos, **parametros))
+
+        # Busca pelo número do aluno: encontra uma pessoa em cada sorteio
+        rng = random.Random(n_sorteios)
+        consultas = itertools.cycle([rng.choice(nomes)[-7:] for _ in range(20)])
+        tempos = medir(lambda: armazenamento.buscar(banco, next(consultas)), 20)
+        resultados.append(_resultado('buscar_aluno', tempos, **parametros))
+
+        print(f"histórico com {n_sorteios} sorteios: ok", file=sys.stderr)
+
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do sistema de sorteio")
+    parser.add_argument('--alunos', type=int, nargs='+', default=[100, 1_000, 10_000, 100_000, 1_000_000],
+                        help="Tamanhos das listas de chamada sintéticas")
+    parser.add_argument('--historicos', type=int, nargs='+', default=[10, 100, 1_000, 10_000],
+                        help="Quantidades de sorteios salvos no histórico sintético")
+    parser.add_argument('--alunos-historico', type=int, default=200,
+                        help="Alunos em cada sorteio do histórico sintético")
+    parser.add_argument('--max-alunos-exibicao', type=int, default=10_000,
+                        help="Maior lista usada para medir a exibição dos grupos")
+    parser.add_argument('--saida', type=Path, help="Arquivo JSON de saída (padrão: saída padrão)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        resultados = executar(
+            sorted(args.alunos),
+            args.historicos,
+            args.max_alunos_exibicao,
+            args.alunos_historico,
+            Path(tmp),
+        )
+
+    relatorio = {
+        'metadados': {
+            'data': datetime.now().isoformat(timespec='seconds'),
+            'commit': _commit(),
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+        },
+        'resultados': resultados,
+    }
+    texto = json.dumps(relatorio, ensure_ascii=False, indent=2)
+    if args.saida:
+        args.saida.write_text(texto, encoding='utf-8')
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
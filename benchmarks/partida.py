@@ -0,0 +1,117 @@
+"""Tempo de partida a frio do app: importações e primeira renderização.
+
+Cada medição roda em um processo Python novo, como um contêiner recém-
+criado: importa os módulos do app e renderiza a página uma vez com o
+AppTest do Streamlit, como visitante (só a busca pública) ou como
+administrador (renderização logo após o login):
+
+    python -m benchmarks.partida --repeticoes 5
+
+Imprime em JSON a mediana de cada tempo por perfil e quais módulos
+pesados (pandas, numpy, pyarrow) cada perfil chegou a carregar. Execute a
+partir da raiz do repositório.
+"""
+import argparse
+import importlib
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+APP = RAIZ / "app_sorteio.py"
+
+# Módulos do repositório importados pelo app
+MODULOS_APP = ['armazenamento', 'cadastro', 'dados', 'exportacao', 'medicao', 'sorteador']
+MODULOS_PESADOS = ['pandas', 'numpy', 'pyarrow']
+
+PERFIS = ('visitante', 'admin')
+
+
+def _medir_processo(perfil, banco):
+    """Executado no processo novo: mede e retorna os tempos deste perfil"""
+    inicio = time.perf_counter()
+    for modulo in MODULOS_APP:
+        importlib.import_module(modulo)
+    importacao = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    import streamlit.config
+    import streamlit.logger
+    from streamlit.testing.v1 import AppTest
+    importacao_streamlit = time.perf_counter() - inicio
+
+    # Sem servidor, cada chamada do Streamlit emitiria um aviso
+    streamlit.config.get_config_options()
+    streamlit.logger.set_log_level('error')
+    sys.modules['armazenamento'].ARQUIVO_PADRAO = banco
+
+    at = AppTest.from_file(str(APP), default_timeout=120)
+    inicio = time.perf_counter()
+    at.run()
+    primeira = time.perf_counter() - inicio
+    resultado = {
+        'importacao_app_s': importacao,
+        'importacao_streamlit_s': importacao_streamlit,
+        'primeira_renderizacao_s': primeira,
+    }
+
+    if perfil == 'admin':
+        at.sidebar.text_input[0].input('pharmabio')
+        at.sidebar.text_input[1].input('pharmabio')
+        inicio = time.perf_counter()
+        at.sidebar.button[0].click().run()
+        resultado['renderizacao_admin_s'] = time.perf_counter() - inicio
+
+    resultado['erros'] = [erro.message for erro in at.exception]
+    resultado['modulos_pesados'] = [modulo for modulo in MODULOS_PESADOS if modulo in sys.modules]
+    return resultado
+
+
+def executar(perfil, repeticoes, diretorio):
+    """Mede `repeticoes` partidas a frio do perfil, cada uma em um processo novo"""
+    medicoes = []
+    for i in range(repeticoes):
+        banco = diretorio / f"partida_{perfil}_{i}.db"
+        saida = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.partida', '--filho', perfil, '--banco', str(banco)],
+            cwd=RAIZ,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        medicoes.append(json.loads(saida.stdout.strip().splitlines()[-1]))
+
+    tempos = [chave for chave in medicoes[0] if chave.endswith('_s')]
+    return {
+        'perfil': perfil,
+        'repeticoes': repeticoes,
+        **{f"mediana_{chave}": statistics.median(m[chave] for m in medicoes) for chave in tempos},
+        'modulos_pesados': medicoes[-1]['modulos_pesados'],
+        'erros': [erro for m in medicoes for erro in m['erros']],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tempo de partida a frio do app")
+    parser.add_argument('--repeticoes', type=int, default=5, help="Processos novos por perfil")
+    parser.add_argument('--perfis', nargs='+', choices=PERFIS, default=list(PERFIS))
+    parser.add_argument('--filho', choices=PERFIS, help=argparse.SUPPRESS)
+    parser.add_argument('--banco', type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.filho:
+        print(json.dumps(_medir_processo(args.filho, args.banco)))
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        resultados = [executar(perfil, args.repeticoes, Path(tmp)) for perfil in args.perfis]
+    print(json.dumps(resultados, ensure_ascii=False, indent=2))
+    return 1 if any(r['erros'] for r in resultados) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
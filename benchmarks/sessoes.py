@@ -0,0 +1,254 @@
+"""Teste de carga do app com várias sessões simultâneas (AppTest do Streamlit).
+
+Cada sessão é um `AppTest` de app_sorteio.py. Parte das sessões é de
+alunos (só buscas públicas) e parte de administradores (login, sorteios,
+salvamentos e buscas). Tudo roda contra um banco temporário:
+
+    python -m benchmarks.sessoes --concorrencia 1 2 4 8 --acoes 20
+
+Para cada nível de concorrência, mede a latência de cada rerun (p50, p95,
+p99 por ação) e a vazão em reruns por segundo. No fim confere o
+histórico salvo: todo salvamento confirmado na tela precisa estar no
+banco, com o ID informado, e nenhum ID pode se repetir. Termina com
+código 1 se houver escritas perdidas, IDs duplicados ou erros no app.
+Execute a partir da raiz do repositório.
+
+O AppTest troca estado global do Streamlit (Runtime e configuração) a
+cada rerun e não pode rodar em várias threads, então cada sessão roda em
+seu próprio processo. O servidor real roda todas as sessões em um só
+processo: lá elas também disputam o GIL, e os números deste teste são
+um limite otimista.
+"""
+import argparse
+import json
+import multiprocessing
+import random
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import armazenamento
+from benchmarks.desempenho import RAIZ
+
+APP = RAIZ / "app_sorteio.py"
+
+# Ação de cada rerun de uma sessão de administrador, escolhida ao acaso
+PESOS_ADMIN = {'busca': 2, 'sorteio': 1, 'salvar': 1}
+
+_ID_SALVO = re.compile(r"salvo com sucesso! \(ID: (\d+)\)")
+
+
+def _quantis(tempos):
+    """Mediana, p95 e p99 em milissegundos"""
+    if len(tempos) < 2:
+        valor = tempos[0] * 1000 if tempos else None
+        return {'p50_ms': valor, 'p95_ms': valor, 'p99_ms': valor}
+    quantis = statistics.quantiles(tempos, n=100)
+    return {
+        'p50_ms': statistics.median(tempos) * 1000,
+        'p95_ms': quantis[94] * 1000,
+        'p99_ms': quantis[98] * 1000,
+    }
+
+
+class _Sessao:
+    """Uma sessão simulada: executa ações e registra a latência de cada rerun"""
+
+    def __init__(self, indice, admin, acoes, consultas, timeout):
+        from streamlit.testing.v1 import AppTest
+
+        self.indice = indice
+        self.admin = admin
+        self.acoes = acoes
+        self.consultas = consultas
+        self.rng = random.Random(indice)
+        self.at = AppTest.from_file(str(APP), default_timeout=timeout)
+        self.tempos = []
+        self.salvos = []
+        self.erros = []
+
+    def _rodar(self, acao, elemento=None):
+        inicio = time.perf_counter()
+        (elemento or self.at).run()
+        self.tempos.append((acao, time.perf_counter() - inicio))
+        if self.at.exception:
+            self.erros.append(f"sessão {self.indice}, {acao}: {self.at.exception[0].message}")
+
+    def _botao(self, texto):
+        return next(b for b in self.at.button if texto in b.label)
+
+    def buscar(self):
+        campo = next(t for t in self.at.text_input if 'parte do nome' in t.label)
+        campo.input(self.rng.choice(self.consultas))
+        self._rodar('busca', self._botao('Buscar').click())
+
+    def login(self):
+        usuario, senha = self.at.sidebar.text_input[0], self.at.sidebar.text_input[1]
+        usuario.input('pharmabio')
+        senha.input('pharmabio')
+        self._rodar('login', self.at.sidebar.button[0].click())
+
+    def sortear(self):
+        self._rodar('sorteio', self._botao('Sortear').click())
+
+    def salvar(self):
+        if 'grupos_sorteados' not in self.at.session_state:
+            self.sortear()
+        nome = f"Carga s{self.indice} n{len(self.salvos)}"
+        next(t for t in self.at.text_input if t.label == 'Nome do sorteio').input(nome)
+        self._rodar('salvar', self._botao('Salvar').click())
+        confirmacao = [m.group(1) for s in self.at.success if (m := _ID_SALVO.search(s.value))]
+        self.salvos.append((nome, int(confirmacao[0]) if confirmacao else None))
+
+    def executar(self, barreira):
+        self._rodar('abrir')
+        barreira.wait()
+        # O relógio do nível começa quando todas as sessões já abriram o app
+        self.tempos.clear()
+        if self.admin:
+            self.login()
+
+        acoes = list(PESOS_ADMIN)
+        pesos = list(PESOS_ADMIN.values())
+        for _ in range(self.acoes):
+            if self.erros:
+                return
+            acao = self.rng.choices(acoes, pesos)[0] if self.admin else 'busca'
+            {'busca': self.buscar, 'sorteio': self.sortear, 'salvar': self.salvar}[acao]()
+
+
+def _executar_sessao(indice, admin, acoes, consultas, timeout, banco, barreira, fila):
+    """Roda uma sessão em um processo separado e envia o resultado pela fila"""
+    import streamlit.config
+    import streamlit.logger
+
+    # Sem servidor, cada chamada do Streamlit emitiria um aviso
+    streamlit.config.get_config_options()
+    streamlit.logger.set_log_level('error')
+    armazenamento.ARQUIVO_PADRAO = banco
+
+    resultado = {'tempos': [], 'salvos': [], 'erros': []}
+    try:
+        sessao = _Sessao(indice, admin, acoes, consultas, timeout)
+        resultado = {'tempos': sessao.tempos, 'salvos': sessao.salvos, 'erros': sessao.erros}
+        sessao.executar(barreira)
+    except Exception as erro:
+        resultado['erros'].append(f"sessão {indice}: {erro!r}")
+        # Libera as outras sessões e o processo principal, que esperam na barreira
+        barreira.abort()
+    fila.put(resultado)
+
+
+def _conferir(banco, sessoes):
+    """Escritas perdidas, IDs duplicados e IDs divergentes no histórico salvo"""
+    salvos = armazenamento.carregar(banco)
+    ids = [s['id'] for s in salvos]
+    por_nome = {}
+    for sorteio in salvos:
+        por_nome.setdefault(sorteio['nome'], []).append(sorteio['id'])
+
+    confirmados = [tuple(salvo) for sessao in sessoes for salvo in sessao['salvos']]
+    return {
+        'salvamentos': len(confirmados),
+        'sem_confirmacao': sum(1 for _, sorteio_id in confirmados if sorteio_id is None),
+        'perdidos': sum(1 for nome, _ in confirmados if nome not in por_nome),
+        'ids_duplicados': len(ids) - len(set(ids)),
+        'ids_divergentes': sum(
+            1 for nome, sorteio_id in confirmados
+            if sorteio_id is not None and por_nome.get(nome) != [sorteio_id]
+        ),
+    }
+
+
+def executar_nivel(concorrencia, acoes, proporcao_admins, consultas, timeout, diretorio):
+    """Roda `concorrencia` sessões ao mesmo tempo contra um banco novo"""
+    banco = diretorio / f"carga_{concorrencia}.db"
+    admins = max(1, round(concorrencia * proporcao_admins))
+
+    contexto = multiprocessing.get_context('spawn')
+    barreira = contexto.Barrier(concorrencia + 1)
+    fila = contexto.Queue()
+    processos = [
+        contexto.Process(
+            target=_executar_sessao,
+            args=(i, i < admins, acoes, consultas, timeout, banco, barreira, fila),
+        )
+        for i in range(concorrencia)
+    ]
+    for processo in processos:
+        processo.start()
+
+    # O relógio começa quando todas as sessões já abriram o app
+    try:
+        barreira.wait()
+    except threading.BrokenBarrierError:
+        pass
+    inicio = time.perf_counter()
+    sessoes = [fila.get() for _ in processos]
+    decorrido = time.perf_counter() - inicio
+    for processo in processos:
+        processo.join()
+
+    tempos = [(acao, t) for s in sessoes for acao, t in s['tempos']]
+    por_acao = {}
+    for acao, t in tempos:
+        por_acao.setdefault(acao, []).append(t)
+
+    return {
+        'concorrencia': concorrencia,
+        'admins': admins,
+        'reruns': len(tempos),
+        'reruns_por_s': len(tempos) / decorrido if decorrido else None,
+        **_quantis([t for _, t in tempos]),
+        'por_acao': {acao: {'reruns': len(ts), **_quantis(ts)} for acao, ts in sorted(por_acao.items())},
+        'historico': _conferir(banco, sessoes),
+        'erros': [erro for s in sessoes for erro in s['erros']],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga do app com sessões simultâneas")
+    parser.add_argument('--concorrencia', type=int, nargs='+', default=[1, 2, 4, 8, 16],
+                        help="Números de sessões simultâneas a testar")
+    parser.add_argument('--acoes', type=int, default=10, help="Ações (reruns) por sessão")
+    parser.add_argument('--admins', type=float, default=0.25,
+                        help="Proporção de sessões de administrador (as demais só buscam)")
+    parser.add_argument('--timeout', type=float, default=120, help="Tempo máximo de um rerun (s)")
+    parser.add_argument('--saida', type=Path, help="Arquivo JSON de saída (padrão: saída padrão)")
+    args = parser.parse_args(argv)
+
+    from dados import ler_lista
+    nomes = ler_lista(RAIZ / "dados_chamada" / "dados_manha.csv")['Nome'].tolist()
+    consultas = [nome.split()[0].lower() for nome in nomes]
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for concorrencia in sorted(args.concorrencia):
+            resultado = executar_nivel(concorrencia, args.acoes, args.admins, consultas, args.timeout, Path(tmp))
+            resultados.append(resultado)
+            print(
+                f"{concorrencia} sessões: {resultado['reruns_por_s']:.1f} reruns/s, "
+                f"p95 {resultado['p95_ms']:.0f} ms",
+                file=sys.stderr,
+            )
+
+    texto = json.dumps(resultados, ensure_ascii=False, indent=2)
+    if args.saida:
+        args.saida.write_text(texto, encoding='utf-8')
+    else:
+        print(texto)
+
+    problemas = sum(
+        r['historico']['perdidos'] + r['historico']['ids_duplicados']
+        + r['historico']['ids_divergentes'] + r['historico']['sem_confirmacao'] + len(r['erros'])
+        for r in resultados
+    )
+    return 1 if problemas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
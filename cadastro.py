@@ -0,0 +1,150 @@
+"""Consulta rápida das turmas dos alunos de uma lista de chamada.
+
+Evita filtrar o DataFrame inteiro para cada aluno exibido: a lista é
+convertida uma única vez em um dicionário nome -> turma.
+"""
+import bisect
+
+CALOURO = 1
+VETERANO = 2
+
+# Cotas por grupo de cada turma: {turma: (mínimo, máximo ou None)}
+REGRAS_PADRAO = {CALOURO: (1, None)}
+
+# Nome das turmas conhecidas; as demais aparecem só pelo número
+NOMES_TURMAS = {CALOURO: 'Calouros', VETERANO: 'Veteranos'}
+
+
+def rotulo_turma(turma):
+    """Rótulo de uma turma, ex.: 'Calouros (Turma 1)' ou 'Turma 3'"""
+    nome = NOMES_TURMAS.get(turma)
+    return f"{nome} (Turma {turma})" if nome else f"Turma {turma}"
+
+
+class Cadastro:
+    """Dicionário nome -> turma de uma lista de chamada"""
+
+    def __init__(self, nomes, turmas):
+        # Em nomes repetidos vale a primeira ocorrência, como no filtro do DataFrame
+        self._turmas = {}
+        # Linhas da lista por turma, contando nomes repetidos (como no DataFrame)
+        self._linhas_por_turma = {}
+        for nome, turma in zip(nomes, turmas):
+            self._turmas.setdefault(nome, turma)
+            self._linhas_por_turma[turma] = self._linhas_por_turma.get(turma, 0) + 1
+        # Índice de prefixos, montado na primeira busca
+        self._prefixos = None
+
+    @classmethod
+    def de_dataframe(cls, df):
+        """Cria o cadastro a partir do DataFrame retornado por carregar_dados"""
+        return cls(df['Nome'].tolist(), df['Turma'].tolist())
+
+    @classmethod
+    def unir(cls, cadastros):
+        """Cadastro de várias listas juntas, na ordem dada (vale a primeira ocorrência)"""
+        unido = cls((), ())
+        for cadastro in cadastros:
+            for nome, turma in cadastro._turmas.items():
+                unido._turmas.setdefault(nome, turma)
+            for turma, linhas in cadastro._linhas_por_turma.items():
+                unido._linhas_por_turma[turma] = unido._linhas_por_turma.get(turma, 0) + linhas
+        return unido
+
+    def __len__(self):
+        return len(self._turmas)
+
+    def __contains__(self, nome):
+        return nome in self._turmas
+
+    def linhas_por_turma(self):
+        """Número de linhas da lista de cada turma, em ordem de turma"""
+        return dict(sorted(self._linhas_por_turma.items()))
+
+    def turma(self, nome, padrao=None):
+        """Turma do aluno (ou `padrao` se o nome não estiver na lista)"""
+        return self._turmas.get(nome, padrao)
+
+    def tem_calouro(self, grupo):
+        """Verifica se o grupo tem pelo menos 1 calouro (Turma 1)"""
+        turmas = self._turmas
+        return any(turmas.get(aluno) == CALOURO for aluno in grupo)
+
+    def situacao_grupos(self, grupos, regras=None):
+        """Situação de cada grupo, calculada de uma vez para todos:
+        'valido', 'sem_calouro', 'sozinho' ou 'fora_das_cotas'.
+
+        `regras` são as cotas por turma usadas no sorteio (padrão:
+        REGRAS_PADRAO, pelo menos 1 calouro por grupo).
+        """
+        regras = REGRAS_PADRAO if regras is None else regras
+        exige_calouro = regras.get(CALOURO, (0, None))[0] > 0
+        situacoes = []
+        for grupo in grupos:
+            contagens = {}
+            for aluno in grupo:
+                turma = self._turmas.get(aluno)
+                contagens[turma] = contagens.get(turma, 0) + 1
+
+            if exige_calouro and not contagens.get(CALOURO):
+                situacoes.append('sem_calouro')
+            elif len(grupo) < 2:
+                situacoes.append('sozinho')
+            elif not all(
+                minimo <= contagens.get(turma, 0) and (maximo is None or contagens.get(turma, 0) <= maximo)
+                for turma, (minimo, maximo) in regras.items()
+            ):
+                situacoes.append('fora_das_cotas')
+            else:
+                situacoes.append('valido')
+        return situacoes
+
+    def _indice_prefixos(self):
+        """Palavras de todos os nomes em ordem alfabética, com o nome de cada uma,
+        e os nomes em ordem alfabética"""
+        if self._prefixos is None:
+            entradas = sorted(
+                (palavra, nome)
+                for nome in self._turmas
+                for palavra in set(nome.lower().split())
+            )
+            self._prefixos = (
+                [palavra for palavra, _ in entradas],
+                [nome for _, nome in entradas],
+                sorted(self._turmas),
+            )
+        return self._prefixos
+
+    def buscar_prefixo(self, texto, limite=20, excluir=(), incluir=None):
+        """Até `limite` alunos cujo nome tem palavras começando por cada palavra de `texto`.
+
+        Usa um índice ordenado das palavras dos nomes (busca binária), então
+        o custo depende de `limite` e de `excluir`, não do tamanho da lista.
+        Texto vazio retorna os primeiros nomes em ordem alfabética. Com
+        `incluir`, só entram os nomes que estão nele.
+        """
+        palavras, nomes, ordenados = self._indice_prefixos()
+        termos = texto.lower().split()
+        if not termos:
+            encontrados = []
+            for nome in ordenados:
+                if len(encontrados) >= limite:
+                    break
+                if nome not in excluir and (incluir is None or nome in incluir):
+                    encontrados.append(nome)
+            return encontrados
+
+        # O termo mais longo é o mais seletivo: percorre só as palavras que começam por ele
+        chave = max(termos, key=len)
+        resto = [termo for termo in termos if termo is not chave]
+        encontrados = []
+        for i in range(bisect.bisect_left(palavras, chave), len(palavras)):
+            if len(encontrados) >= limite or not palavras[i].startswith(chave):
+                break
+            nome = nomes[i]
+            if nome in excluir or nome in encontrados or (incluir is not None and nome not in incluir):
+                continue
+            palavras_nome = nome.lower().split()
+            if all(any(palavra.startswith(termo) for palavra in palavras_nome) for termo in resto):
+                encontrados.append(nome)
+        return encontrados
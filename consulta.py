@@ -0,0 +1,388 @@
+"""Consulta pública "em qual grupo eu fiquei?", servida fora do Streamlit.
+
+O servidor deste módulo mantém um snapshot compacto do histórico ao lado
+do banco (`grupos_salvos.consulta`): uma thread confere a versão do banco
+a cada segundo e, quando ela muda, gera o snapshot novo em segundo plano
+enquanto as buscas continuam no anterior. Salvar um sorteio no app não
+espera por isso. O snapshot é um único arquivo binário, aberto com mmap
+e substituído de forma atômica:
+
+    cabeçalho  '<8sQQQQ' assinatura, versão do banco, nº de nomes, nº de grupos,
+               tamanho do texto
+    texto      b'\\n' + nomes normalizados separados por b'\\n' + b'\\n'
+    inicios    (nomes + 1) uint64: posição do separador antes de cada nome
+    p_nomes    (nomes + 1) uint64: início do registro JSON de cada nome
+    p_grupos   (grupos + 1) uint64: início do registro JSON de cada grupo
+    registros  JSON dos nomes ({aluno, ocorrencias: [[grupo, posição], ...]})
+               seguido do JSON dos grupos
+
+A busca por parte do nome é um `find` no texto mapeado, sem SQLite e
+sem rodar o script do Streamlit. O servidor HTTP deste módulo responde
+apenas leituras, em JSON, com ETag e Cache-Control:
+
+    python -m consulta --porta 8502
+
+    GET /buscar?nome=davi   -> lista no mesmo formato de armazenamento.buscar
+    GET /saude              -> versão e tamanho do snapshot
+
+Usa apenas a biblioteca padrão.
+"""
+import argparse
+import bisect
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import armazenamento
+
+logger = logging.getLogger(__name__)
+
+_ASSINATURA = b'SORTCON1'
+_CABECALHO = struct.Struct('<8sQQQQ')
+
+# Tempo que navegadores e proxies podem reaproveitar uma resposta
+MAX_AGE_PADRAO = 30
+
+# Respostas JSON prontas guardadas pelo servidor (por versão do snapshot)
+MAX_RESPOSTAS_EM_CACHE = 4096
+
+# Intervalo (segundos) entre as conferências da versão do banco pelo servidor
+INTERVALO_REPUBLICACAO = 1.0
+
+
+def caminho_snapshot(caminho_banco):
+    """Arquivo do snapshot de consulta de um banco de sorteios"""
+    return Path(caminho_banco).with_suffix('.consulta')
+
+
+def _versao_publicada(destino):
+    """Versão do banco gravada no snapshot existente (None se não houver)"""
+    try:
+        with open(destino, 'rb') as f:
+            assinatura, versao, *_ = _CABECALHO.unpack(f.read(_CABECALHO.size))
+    except (OSError, struct.error):
+        return None
+    return versao if assinatura == _ASSINATURA else None
+
+
+def publicar(caminho_banco, destino=None):
+    """Gera o snapshot de consulta do banco e o substitui de forma atômica.
+
+    Não faz nada se o snapshot já estiver na versão atual (ou mais nova)
+    do banco. Custo proporcional ao total de alunos em todos os sorteios,
+    inclusive os arquivados.
+    Retorna a versão publicada.
+    """
+    destino = Path(destino or caminho_snapshot(caminho_banco))
+    publicada = _versao_publicada(destino)
+    if publicada is not None and publicada >= armazenamento.versao(caminho_banco):
+        return publicada
+
+    # Versão e ocorrências do mesmo estado do banco
+    versao, linhas = armazenamento.ler_ocorrencias(caminho_banco)
+
+    # Como em armazenamento.buscar, os sorteios arquivados só contam para quem
+    # não está no banco; grupos arquivados sem nenhum desses alunos ficam de fora
+    no_banco = {linha[6] for linha in linhas if not linha[8]}
+    usados = {(linha[0], linha[3], linha[4]) for linha in linhas if not (linha[8] and linha[6] in no_banco)}
+
+    # Grupos na ordem de armazenamento.buscar; cada nome aponta para os seus
+    grupos = []
+    nomes = {}
+    chave_atual = None
+    for sorteio_id, sorteio_nome, data, tipo, numero_grupo, posicao, aluno, normalizado, arquivado in linhas:
+        if (sorteio_id, tipo, numero_grupo) not in usados:
+            continue
+        if (sorteio_id, tipo, numero_grupo) != chave_atual:
+            chave_atual = (sorteio_id, tipo, numero_grupo)
+            grupos.append({
+                'sorteio_id': sorteio_id,
+                'sorteio_nome': sorteio_nome,
+                'data': data,
+                'tipo_grupo': tipo,
+                'numero_grupo': numero_grupo,
+                'grupo_completo': [],
+            })
+        grupos[-1]['grupo_completo'].append(aluno)
+        if arquivado and aluno in no_banco:
+            continue
+        registro = nomes.setdefault(normalizado, {'aluno': aluno, 'ocorrencias': []})
+        registro['ocorrencias'].append([len(grupos) - 1, posicao])
+
+    normalizados = sorted(nomes)
+    texto = b'\n' + b''.join(n.encode('utf-8') + b'\n' for n in normalizados)
+    inicios = array('Q', [0])
+    for normalizado in normalizados:
+        inicios.append(inicios[-1] + len(normalizado.encode('utf-8')) + 1)
+
+    registros = bytearray()
+    p_nomes = array('Q')
+    for normalizado in normalizados:
+        p_nomes.append(len(registros))
+        registros += json.dumps(nomes[normalizado], ensure_ascii=False).encode('utf-8')
+    p_nomes.append(len(registros))
+    p_grupos = array('Q')
+    for grupo in grupos:
+        p_grupos.append(len(registros))
+        registros += json.dumps(grupo, ensure_ascii=False).encode('utf-8')
+    p_grupos.append(len(registros))
+
+    descritor, temporario = tempfile.mkstemp(dir=destino.parent, prefix=destino.name, suffix='.tmp')
+    try:
+        with os.fdopen(descritor, 'wb') as f:
+            f.write(_CABECALHO.pack(_ASSINATURA, versao, len(normalizados), len(grupos), len(texto)))
+            f.write(texto)
+            for tabela in (inicios, p_nomes, p_grupos):
+                f.write(tabela.tobytes())
+            f.write(registros)
+        os.replace(temporario, destino)
+    except BaseException:
+        Path(temporario).unlink(missing_ok=True)
+        raise
+    return versao
+
+
+class Snapshot:
+    """Snapshot de consulta aberto com mmap (somente leitura)"""
+
+    def __init__(self, caminho):
+        with open(caminho, 'rb') as f:
+            info = os.fstat(f.fileno())
+            self.identidade = (info.st_ino, info.st_mtime_ns, info.st_size)
+            self._mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (assinatura, self.versao, self.total_nomes, self.total_grupos,
+         tamanho_texto) = _CABECALHO.unpack_from(self._mapa)
+        if assinatura != _ASSINATURA:
+            raise ValueError(f"{caminho} não é um snapshot de consulta")
+
+        def tabela(inicio, tamanho):
+            valores = array('Q')
+            valores.frombytes(self._mapa[inicio:inicio + tamanho * valores.itemsize])
+            return valores, inicio + tamanho * valores.itemsize
+
+        self._inicio_texto = _CABECALHO.size
+        self._fim_texto = self._inicio_texto + tamanho_texto
+        self._inicios, posicao = tabela(self._fim_texto, self.total_nomes + 1)
+        self._p_nomes, posicao = tabela(posicao, self.total_nomes + 1)
+        self._p_grupos, posicao = tabela(posicao, self.total_grupos + 1)
+        self._inicio_registros = posicao
+
+    def _registro(self, ponteiros, indice):
+        inicio = self._inicio_registros + ponteiros[indice]
+        fim = self._inicio_registros + ponteiros[indice + 1]
+        return json.loads(self._mapa[inicio:fim])
+
+    def _nomes_correspondentes(self, nome_parcial):
+        """Índices dos nomes que contêm o texto buscado"""
+        alvo = armazenamento.normalizar(nome_parcial).encode('utf-8')
+        if not alvo:
+            return list(range(self.total_nomes))
+        if b'\n' in alvo:
+            return []
+
+        indices = []
+        posicao = self._inicio_texto
+        while True:
+            posicao = self._mapa.find(alvo, posicao, self._fim_texto)
+            if posicao < 0:
+                return indices
+            indice = bisect.bisect_right(self._inicios, posicao - self._inicio_texto) - 1
+            indices.append(indice)
+            # Continua a partir do próximo nome (um nome conta uma vez só)
+            posicao = self._inicio_texto + self._inicios[indice + 1]
+
+    def buscar(self, nome_parcial):
+        """Mesmo resultado de armazenamento.buscar, lido do snapshot"""
+        ocorrencias = []
+        for indice in self._nomes_correspondentes(nome_parcial):
+            registro = self._registro(self._p_nomes, indice)
+            for grupo, posicao in registro['ocorrencias']:
+                ocorrencias.append((grupo, posicao, registro['aluno']))
+        ocorrencias.sort()
+
+        resultados = []
+        for grupo, _, aluno in ocorrencias:
+            resultado = self._registro(self._p_grupos, grupo)
+            resultado['aluno'] = aluno
+            resultados.append(resultado)
+        return resultados
+
+
+class _Servidor(ThreadingHTTPServer):
+    """Servidor HTTP que troca de snapshot quando o arquivo é republicado.
+
+    Com `banco`, uma thread em segundo plano republica o snapshot sempre
+    que a versão do banco muda.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, endereco, caminho, max_age, banco=None, intervalo=INTERVALO_REPUBLICACAO):
+        super().__init__(endereco, _Requisicao)
+        self.caminho = Path(caminho)
+        self.max_age = max_age
+        self._snapshot = None
+        self._respostas = OrderedDict()
+        self._trava = threading.Lock()
+        self._encerrado = threading.Event()
+        if banco is not None:
+            threading.Thread(target=self._republicar, args=(Path(banco), intervalo), daemon=True).start()
+
+    def _republicar(self, banco, intervalo):
+        """Confere a versão do banco a cada `intervalo` segundos e republica quando muda"""
+        while True:
+            try:
+                # Não cria um banco vazio só para conferir a versão
+                if banco.exists():
+                    publicar(banco, self.caminho)
+            except Exception:
+                logger.exception("Falha ao republicar o snapshot de consulta")
+            if self._encerrado.wait(intervalo):
+                return
+
+    def server_close(self):
+        self._encerrado.set()
+        super().server_close()
+
+    def snapshot(self):
+        """Snapshot atual, reaberto se o arquivo mudou (None se não existe)"""
+        try:
+            info = self.caminho.stat()
+        except FileNotFoundError:
+            return None
+
+        atual = self._snapshot
+        if atual is None or atual.identidade != (info.st_ino, info.st_mtime_ns, info.st_size):
+            with self._trava:
+                atual = self._snapshot
+                if atual is None or atual.identidade != (info.st_ino, info.st_mtime_ns, info.st_size):
+                    # O mapa anterior é liberado quando a última requisição que o usa termina
+                    atual = self._snapshot = Snapshot(self.caminho)
+                    self._respostas.clear()
+        return atual
+
+    def resposta(self, snapshot, nome_parcial):
+        """Corpo JSON da busca, reaproveitado entre requisições iguais"""
+        chave = (snapshot.versao, armazenamento.normalizar(nome_parcial))
+        with self._trava:
+            corpo = self._respostas.get(chave)
+            if corpo is not None:
+                self._respostas.move_to_end(chave)
+                return corpo
+
+        corpo = json.dumps(snapshot.buscar(nome_parcial), ensure_ascii=False).encode('utf-8')
+        with self._trava:
+            self._respostas[chave] = corpo
+            while len(self._respostas) > MAX_RESPOSTAS_EM_CACHE:
+                self._respostas.popitem(last=False)
+        return corpo
+
+
+class _Requisicao(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'ConsultaSorteio/1'
+    # Cabeçalho e corpo saem em escritas separadas: sem isso, cada resposta espera o ACK atrasado
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        snapshot = self.server.snapshot()
+        if snapshot is None:
+            self._enviar(HTTPStatus.SERVICE_UNAVAILABLE, {'erro': 'Nenhum sorteio publicado'})
+            return
+
+        if url.path == '/saude':
+            self._enviar(HTTPStatus.OK, {
+                'versao': snapshot.versao,
+                'nomes': snapshot.total_nomes,
+                'grupos': snapshot.total_grupos,
+            })
+            return
+
+        if url.path != '/buscar':
+            self._enviar(HTTPStatus.NOT_FOUND, {'erro': 'Use /buscar?nome=...'})
+            return
+
+        nome = parse_qs(url.query).get('nome', [''])[0]
+        if not nome.strip():
+            self._enviar(HTTPStatus.BAD_REQUEST, {'erro': 'Informe o parâmetro nome'})
+            return
+
+        # A resposta só muda quando um novo snapshot é publicado
+        etag = f'"{snapshot.versao}"'
+        if self.headers.get('If-None-Match') == etag:
+            self._enviar(HTTPStatus.NOT_MODIFIED, None, etag)
+            return
+        self._enviar(HTTPStatus.OK, self.server.resposta(snapshot, nome), etag)
+
+    def _enviar(self, status, corpo, etag=None):
+        if corpo is not None and not isinstance(corpo, bytes):
+            corpo = json.dumps(corpo, ensure_ascii=False).encode('utf-8')
+
+        self.send_response(status)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', f'public, max-age={self.server.max_age}')
+        else:
+            self.send_header('Cache-Control', 'no-store')
+        if corpo is None:
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        logger.debug(formato, *args)
+
+
+def servir(caminho, host='0.0.0.0', porta=8502, max_age=MAX_AGE_PADRAO, banco=None):
+    """Atende consultas do snapshot até ser interrompido (republicando-o a partir de `banco`)"""
+    servidor = _Servidor((host, porta), caminho, max_age, banco)
+    print(f"Consulta pública em http://{host}:{servidor.server_port}/buscar?nome=...", file=sys.stderr)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor somente leitura da consulta de grupos")
+    parser.add_argument('--banco', type=Path, default=armazenamento.ARQUIVO_PADRAO,
+                        help="Banco de sorteios cujo snapshot será servido e republicado")
+    parser.add_argument('--snapshot', type=Path, help="Arquivo do snapshot (padrão: ao lado do banco)")
+    parser.add_argument('--host', default='0.0.0.0', help="Endereço de escuta")
+    parser.add_argument('--porta', type=int, default=8502, help="Porta de escuta")
+    parser.add_argument('--max-age', type=int, default=MAX_AGE_PADRAO,
+                        help="Segundos que os clientes podem reaproveitar uma resposta")
+    parser.add_argument('--publicar', action='store_true',
+                        help="Publica o snapshot antes de começar a atender (senão, as buscas "
+                             "respondem 503 até a primeira publicação em segundo plano)")
+    args = parser.parse_args(argv)
+
+    snapshot = args.snapshot or caminho_snapshot(args.banco)
+    if args.publicar:
+        publicar(args.banco, snapshot)
+    servir(snapshot, args.host, args.porta, args.max_age, args.banco)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+"""Leitura das listas de chamada (CSV `Nome;Turma` separado por ponto e vírgula).
+
+Sem dependência do Streamlit: usado pelo app e pela linha de comando.
+
+As listas lidas ficam em um cache LRU compartilhado por todo o processo,
+limitado pelo tamanho em memória e indexado pelo conteúdo do arquivo:
+enviar de novo o mesmo arquivo (em qualquer sessão) não custa uma nova
+leitura. Os DataFrames do cache são compartilhados: não os altere.
+
+As listas de um diretório (um CSV por turno: manhã, tarde, noite...) são
+descobertas a cada consulta por `listas_disponiveis`, que só relê o
+diretório quando ele muda. Cada lista lida vira uma cópia colunar em
+Parquet (`.cache/<arquivo>.parquet` no mesmo diretório), válida enquanto
+o CSV tiver o mesmo tamanho e a mesma data de modificação: processos
+novos leem a cópia em vez de interpretar o CSV de novo. Várias listas
+podem ser unidas em uma só (`carregar_lista([...])`).
+
+O pandas só é importado quando alguém pede o DataFrame (`ler_lista`,
+`carregar_lista`). O cadastro nome -> turma, que é tudo o que a busca
+pública precisa, é lido com o módulo csv da biblioteca padrão.
+"""
+import csv
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from functools import cache
+from importlib.util import find_spec
+from pathlib import Path
+
+from cadastro import Cadastro
+
+# Arquivos maiores que isso são lidos em pedaços, para limitar o pico de memória
+LIMITE_LEITURA_EM_PEDACOS = 64 * 1024 * 1024
+LINHAS_POR_PEDACO = 500_000
+
+# Memória máxima ocupada pelas listas em cache
+LIMITE_CACHE_BYTES = 256 * 1024 * 1024
+
+_COLUNAS = ['Nome', 'Turma']
+
+# Diretório das cópias colunares, dentro do diretório de cada lista
+DIRETORIO_COPIAS = '.cache'
+
+# Listagem de cada diretório de listas: caminho -> (mtime do diretório, arquivos)
+_listagens = {}
+
+_cache = OrderedDict()
+_bytes_em_cache = 0
+_trava = threading.Lock()
+
+
+@cache
+def _leitor():
+    """Engine do read_csv e tipo da coluna Nome (pyarrow, dependência do Streamlit, se houver)"""
+    if find_spec('pyarrow'):
+        return 'pyarrow', 'string[pyarrow]'
+    return 'c', 'category'
+
+
+def _enxugar(df):
+    """Nome como string compacta e Turma como inteiro pequeno"""
+    df['Nome'] = df['Nome'].str.strip().astype(_leitor()[1])
+    df['Turma'] = df['Turma'].astype('int8')
+    return df
+
+
+def ler_lista(arquivo):
+    """Lê a lista de chamada, mantendo apenas as colunas Nome e Turma"""
+    import pandas as pd
+
+    engine, tipo_nome = _leitor()
+    tamanho = _tamanho(arquivo)
+    if tamanho is not None and tamanho > LIMITE_LEITURA_EM_PEDACOS:
+        pedacos = pd.read_csv(
+            arquivo, sep=';', encoding='utf-8', usecols=_COLUNAS, chunksize=LINHAS_POR_PEDACO
+        )
+        df = pd.concat([_enxugar(pedaco) for pedaco in pedacos], ignore_index=True)
+        df['Nome'] = df['Nome'].astype(tipo_nome)
+        return df
+
+    df = pd.read_csv(arquivo, sep=';', encoding='utf-8', usecols=_COLUNAS, engine=engine)
+    return _enxugar(df)
+
+
+def ler_cadastro(arquivo):
+    """Lê só o cadastro nome -> turma da lista, sem pandas"""
+    if isinstance(arquivo, (str, Path)):
+        with open(arquivo, encoding='utf-8-sig', newline='') as f:
+            return _cadastro_de_linhas(f)
+    return _cadastro_de_linhas(io.StringIO(arquivo.getvalue().decode('utf-8-sig'), newline=''))
+
+
+def _cadastro_de_linhas(linhas):
+    """Cadastro a partir das linhas do CSV (mesmas regras de ler_lista)"""
+    leitor = csv.reader(linhas, delimiter=';')
+    cabecalho = next(leitor)
+    coluna_nome = cabecalho.index('Nome')
+    coluna_turma = cabecalho.index('Turma')
+    nomes = []
+    turmas = []
+    for linha in leitor:
+        # Linhas em branco são ignoradas, como no read_csv
+        if linha:
+            nomes.append(linha[coluna_nome].strip())
+            turmas.append(int(linha[coluna_turma]))
+    return Cadastro(nomes, turmas)
+
+
+def listas_disponiveis(diretorio):
+    """Listas de chamada (*.csv) do diretório, em ordem de nome.
+
+    O diretório é relido só quando sua data de modificação muda (um
+    arquivo criado, removido ou renomeado); mudanças no conteúdo de uma
+    lista são percebidas pela chave do cache na próxima leitura.
+    """
+    diretorio = Path(diretorio)
+    try:
+        versao = diretorio.stat().st_mtime_ns
+    except FileNotFoundError:
+        return []
+    with _trava:
+        listagem = _listagens.get(str(diretorio))
+        if listagem is not None and listagem[0] == versao:
+            return listagem[1]
+
+    arquivos = sorted(
+        Path(entrada.path) for entrada in os.scandir(diretorio)
+        if entrada.is_file() and entrada.name.lower().endswith('.csv')
+    )
+    with _trava:
+        _listagens[str(diretorio)] = (versao, arquivos)
+    return arquivos
+
+
+def _caminho_copia(arquivo):
+    """Cópia colunar (Parquet) de uma lista de chamada"""
+    arquivo = Path(arquivo)
+    return arquivo.parent / DIRETORIO_COPIAS / f"{arquivo.name}.parquet"
+
+
+def _origem(arquivo):
+    """Identidade do CSV gravada na cópia: tamanho e data de modificação"""
+    info = Path(arquivo).stat()
+    return f"{info.st_size}:{info.st_mtime_ns}".encode()
+
+
+def _ler_copia(arquivo):
+    """DataFrame da cópia colunar, se ela existir e for do CSV atual (senão None)"""
+    if _leitor()[0] != 'pyarrow':
+        return None
+    import pandas as pd
+    import pyarrow.parquet as pq
+
+    copia = _caminho_copia(arquivo)
+    try:
+        metadados = pq.read_schema(copia).metadata or {}
+    except (OSError, ValueError):
+        return None
+    if metadados.get(b'origem') != _origem(arquivo):
+        return None
+    return pd.read_parquet(copia)
+
+
+def _gravar_copia(arquivo, df, origem):
+    """Grava a cópia colunar de forma atômica; sem permissão de escrita, segue sem ela"""
+    if _leitor()[0] != 'pyarrow':
+        return
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    copia = _caminho_copia(arquivo)
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    tabela = tabela.replace_schema_metadata({**(tabela.schema.metadata or {}), b'origem': origem})
+    try:
+        copia.parent.mkdir(exist_ok=True)
+        descritor, temporario = tempfile.mkstemp(dir=copia.parent, prefix=copia.name, suffix='.tmp')
+        os.close(descritor)
+        try:
+            pq.write_table(tabela, temporario)
+            os.replace(temporario, copia)
+        except BaseException:
+            os.unlink(temporario)
+            raise
+    except OSError:
+        pass
+
+
+def _ler_lista_com_copia(arquivo):
+    """DataFrame de um CSV em disco, pela cópia colunar quando ela está em dia"""
+    df = _ler_copia(arquivo)
+    if df is None:
+        # Identidade lida antes do CSV: se ele mudar durante a leitura, a cópia fica inválida
+        origem = _origem(arquivo)
+        df = ler_lista(arquivo)
+        _gravar_copia(arquivo, df, origem)
+    return df
+
+
+def _tamanho(arquivo):
+    """Tamanho em bytes de um caminho ou arquivo enviado (None se desconhecido)"""
+    if isinstance(arquivo, (str, Path)):
+        return Path(arquivo).stat().st_size
+    return getattr(arquivo, 'size', None)
+
+
+def _chave(arquivo):
+    """Chave de cache barata: metadados para caminhos, digest do conteúdo para envios"""
+    if isinstance(arquivo, (str, Path)):
+        info = Path(arquivo).stat()
+        return ('arquivo', str(Path(arquivo).resolve()), info.st_size, info.st_mtime_ns)
+
+    conteudo = arquivo.getvalue()
+    return ('conteudo', hashlib.blake2b(conteudo, digest_size=16).hexdigest())
+
+
+def _carregar(arquivo, com_df):
+    """Entrada do cache para o arquivo: {'cadastro': ..., 'df': ... (se já lido)}.
+
+    Com `com_df` falso, lê só o cadastro (sem pandas); o DataFrame é lido
+    depois, na primeira vez em que for pedido, e o cadastro é mantido.
+    Uma lista ou tupla de arquivos é carregada como uma lista só, unindo
+    as entradas de cada arquivo (também guardadas no cache).
+    """
+    global _bytes_em_cache
+
+    varios = isinstance(arquivo, (list, tuple))
+    chave = ('listas', tuple(map(_chave, arquivo))) if varios else _chave(arquivo)
+    with _trava:
+        entrada = _cache.get(chave)
+        if entrada is not None and (not com_df or 'df' in entrada):
+            _cache.move_to_end(chave)
+            return entrada
+
+    if varios:
+        partes = [_carregar(parte, com_df) for parte in arquivo]
+        cadastro = entrada['cadastro'] if entrada else Cadastro.unir(p['cadastro'] for p in partes)
+        if com_df:
+            import pandas as pd
+
+            df = pd.concat([p['df'] for p in partes], ignore_index=True)
+            df['Nome'] = df['Nome'].astype(_leitor()[1])
+            nova = {'df': df, 'cadastro': cadastro, 'bytes': int(df.memory_usage(deep=True).sum())}
+        else:
+            nova = {'cadastro': cadastro, 'bytes': sum(p['bytes'] for p in partes)}
+    elif com_df:
+        if isinstance(arquivo, (str, Path)):
+            df = _ler_lista_com_copia(arquivo)
+        else:
+            arquivo.seek(0)
+            df = ler_lista(arquivo)
+        nova = {
+            'df': df,
+            'cadastro': entrada['cadastro'] if entrada else Cadastro.de_dataframe(df),
+            'bytes': int(df.memory_usage(deep=True).sum()),
+        }
+    else:
+        if not isinstance(arquivo, (str, Path)):
+            arquivo.seek(0)
+        # Sem DataFrame, o tamanho do arquivo é uma boa estimativa da memória ocupada
+        nova = {'cadastro': ler_cadastro(arquivo), 'bytes': _tamanho(arquivo) or 0}
+
+    with _trava:
+        atual = _cache.get(chave)
+        if atual is None or (com_df and 'df' not in atual):
+            _bytes_em_cache += nova['bytes'] - (atual['bytes'] if atual else 0)
+            _cache[chave] = nova
+        _cache.move_to_end(chave)
+        # Descarta as menos usadas, mantendo sempre a mais recente
+        while _bytes_em_cache > LIMITE_CACHE_BYTES and len(_cache) > 1:
+            _, removida = _cache.popitem(last=False)
+            _bytes_em_cache -= removida['bytes']
+        return _cache.get(chave, nova)
+
+
+def carregar_lista(arquivo):
+    """DataFrame (Nome, Turma) da lista (ou das listas unidas), lido uma única vez por conteúdo"""
+    return _carregar(arquivo, com_df=True)['df']
+
+
+def carregar_cadastro(arquivo):
+    """Cadastro nome -> turma da lista (ou das listas unidas), construído uma única
+    vez por conteúdo (sem pandas)"""
+    return _carregar(arquivo, com_df=False)['cadastro']
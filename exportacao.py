@@ -0,0 +1,107 @@
+"""Exportação dos grupos em CSV, Parquet ou Excel.
+
+Sem dependência do Streamlit: as tabelas são montadas de uma vez, com
+uma única junção entre os alunos dos grupos e a lista de chamada, e
+convertidas no formato pedido só quando alguém baixa o arquivo.
+
+O pandas só é importado ao gerar um arquivo. Parquet depende do
+pyarrow (já instalado com o Streamlit) e Excel do openpyxl ou do
+xlsxwriter; os formatos sem dependência instalada não são oferecidos.
+"""
+import io
+from importlib.util import find_spec
+
+# Formato -> (extensão, tipo MIME, módulos que o habilitam)
+FORMATOS = {
+    'CSV': ('csv', 'text/csv', ()),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet', ('pyarrow',)),
+    'Excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+              ('openpyxl', 'xlsxwriter')),
+}
+
+
+def formatos_disponiveis():
+    """Formatos que podem ser gerados com as dependências instaladas"""
+    return [
+        formato for formato, (_, _, modulos) in FORMATOS.items()
+        if not modulos or any(find_spec(modulo) for modulo in modulos)
+    ]
+
+
+def nome_arquivo(base, formato):
+    """Nome do arquivo exportado, com a extensão do formato"""
+    return f"{base}.{FORMATOS[formato][0]}"
+
+
+def tipo_mime(formato):
+    """Tipo MIME do arquivo exportado"""
+    return FORMATOS[formato][1]
+
+
+def _com_turmas(tabela, alunos, lista):
+    """Acrescenta a coluna Turma com uma única junção com a lista de chamada
+    (em nomes repetidos vale a primeira ocorrência, como no Cadastro)"""
+    import pandas as pd
+
+    # Junção por texto simples: com a coluna Nome categórica da lista, os
+    # nomes que não estão nela virariam NaN ao receber o mesmo tipo
+    tabela['Nome'] = pd.array(alunos, dtype='str')
+    turmas = lista[['Nome', 'Turma']].drop_duplicates('Nome')
+    turmas = turmas.assign(Nome=turmas['Nome'].astype('str'))
+    tabela = tabela.merge(turmas, on='Nome', how='left')
+    tabela['Turma'] = tabela['Turma'].astype('Int8')
+    return tabela
+
+
+def _rotulos(grupos, prefixo):
+    """Um rótulo por aluno ('Grupo 1', 'Grupo 1', ...) e os alunos, na ordem dos grupos"""
+    rotulos = [f"{prefixo}{numero}" for numero, grupo in enumerate(grupos, start=1) for _ in grupo]
+    alunos = [aluno for grupo in grupos for aluno in grupo]
+    return rotulos, alunos
+
+
+def tabela_grupos(grupos, lista, grupos_manuais=None):
+    """Tabela Grupo, Nome, Turma: grupos manuais primeiro, depois os sorteados"""
+    import pandas as pd
+
+    rotulos_manuais, manuais = _rotulos(grupos_manuais or [], 'Manual ')
+    rotulos, alunos = _rotulos(grupos, 'Grupo ')
+    return _com_turmas(pd.DataFrame({'Grupo': rotulos_manuais + rotulos}), manuais + alunos, lista)
+
+
+def tabela_sorteios(sorteios, lista=None):
+    """Tabela de sorteios salvos, uma linha por aluno: ID, Sorteio, Data, Grupo, Nome
+    e, com a lista de chamada, Turma"""
+    import pandas as pd
+
+    ids, nomes, datas, rotulos, alunos = [], [], [], [], []
+    for sorteio in sorteios:
+        rotulos_manuais, manuais = _rotulos(sorteio['grupos_manuais'], 'Manual ')
+        rotulos_sorteio, alunos_sorteio = _rotulos(sorteio['grupos_automaticos'], 'Grupo ')
+        total = len(manuais) + len(alunos_sorteio)
+        ids += [sorteio['id']] * total
+        nomes += [sorteio['nome']] * total
+        datas += [sorteio['data']] * total
+        rotulos += rotulos_manuais + rotulos_sorteio
+        alunos += manuais + alunos_sorteio
+
+    tabela = pd.DataFrame({'ID': ids, 'Sorteio': nomes, 'Data': datas, 'Grupo': rotulos})
+    if lista is None:
+        tabela['Nome'] = alunos
+        return tabela
+    return _com_turmas(tabela, alunos, lista)
+
+
+def exportar(tabela, formato):
+    """Arquivo da tabela no formato pedido, como um objeto de arquivo em memória"""
+    saida = io.BytesIO()
+    if formato == 'CSV':
+        tabela.to_csv(saida, index=False, encoding='utf-8')
+    elif formato == 'Parquet':
+        tabela.to_parquet(saida, index=False)
+    elif formato == 'Excel':
+        tabela.to_excel(saida, index=False, sheet_name='Grupos')
+    else:
+        raise ValueError(f"Formato desconhecido: {formato}")
+    saida.seek(0)
+    return saida
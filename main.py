@@ -1,6 +1,118 @@
-def main():
-    print("Hello from sorteio!")
+"""Sorteio em lote pela linha de comando, sem a interface Streamlit.
+
+Sorteia os grupos de todas as listas de chamada (*.csv) de um diretório
+usando vários processos e grava os resultados à medida que cada turma
+termina:
+
+    python main.py dados_chamada/ --tamanho 4 --saida grupos.csv --salvar
+"""
+import argparse
+import csv
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+import armazenamento
+from dados import listas_disponiveis
+from sorteador import nova_semente
+
+
+def _sortear_arquivo(arquivo, tamanho_grupo, semente):
+    """Carrega uma lista de chamada e sorteia seus grupos (roda em um processo do pool)"""
+    # Importados aqui para o processo principal não pagar o custo do pandas
+    from cadastro import Cadastro
+    from dados import carregar_lista
+    from sorteador import gerador, sortear_grupos
+
+    # Pela cópia colunar da lista, quando já houver uma em dia
+    df = carregar_lista(arquivo)
+    cadastro = Cadastro.de_dataframe(df)
+    # Fluxo próprio por arquivo: o resultado não depende da ordem de execução
+    fluxo = Path(arquivo).name
+    grupos = sortear_grupos(df, tamanho_grupo, rng=gerador(semente, fluxo))
+    turmas = [[cadastro.turma(aluno) for aluno in grupo] for grupo in grupos]
+    return grupos, turmas, fluxo
+
+
+def _escrever_csv(saida):
+    """Escritor de resultados em CSV (uma linha por aluno)"""
+    writer = csv.writer(saida)
+    writer.writerow(['Arquivo', 'Sorteio', 'Grupo', 'Nome', 'Turma'])
+
+    def escrever(arquivo, sorteio_id, grupos, turmas):
+        for idx, (grupo, turmas_grupo) in enumerate(zip(grupos, turmas)):
+            for aluno, turma in zip(grupo, turmas_grupo):
+                writer.writerow([arquivo.name, sorteio_id or '', f'Grupo {idx + 1}', aluno, turma])
+        saida.flush()
+
+    return escrever
+
+
+def _escrever_json(saida):
+    """Escritor de resultados em JSON Lines (um objeto por arquivo)"""
+    def escrever(arquivo, sorteio_id, grupos, turmas):
+        registro = {'arquivo': arquivo.name, 'sorteio_id': sorteio_id, 'grupos': grupos}
+        saida.write(json.dumps(registro, ensure_ascii=False) + '\n')
+        saida.flush()
+
+    return escrever
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sorteio de grupos em lote, sem interface")
+    parser.add_argument('diretorio', type=Path, help="Diretório com as listas de chamada (*.csv)")
+    parser.add_argument('--tamanho', type=int, default=4, help="Número máximo de alunos por grupo")
+    parser.add_argument('--seed', type=int, help="Seed para resultados reproduzíveis")
+    parser.add_argument('--processos', type=int, help="Número de processos (padrão: número de CPUs)")
+    parser.add_argument('--formato', choices=['csv', 'json'], default='csv', help="Formato da saída")
+    parser.add_argument('--saida', type=Path, help="Arquivo de saída (padrão: saída padrão)")
+    parser.add_argument('--salvar', action='store_true', help="Salva cada sorteio no histórico")
+    parser.add_argument('--banco', type=Path, default=armazenamento.ARQUIVO_PADRAO,
+                        help="Banco de sorteios usado com --salvar")
+    args = parser.parse_args(argv)
+
+    arquivos = listas_disponiveis(args.diretorio)
+    if not arquivos:
+        print(f"Nenhum arquivo CSV encontrado em {args.diretorio}", file=sys.stderr)
+        return 1
+
+    saida = open(args.saida, 'w', encoding='utf-8', newline='') if args.saida else sys.stdout
+    escrever = (_escrever_json if args.formato == 'json' else _escrever_csv)(saida)
+    data = datetime.now().strftime('%d/%m/%Y %H:%M')
+    # Sem --seed, uma semente nova para o lote (guardada no histórico com --salvar)
+    semente = args.seed if args.seed is not None else nova_semente()
+    falhas = 0
+
+    try:
+        with ProcessPoolExecutor(max_workers=args.processos) as pool:
+            futuros = {
+                pool.submit(_sortear_arquivo, arquivo, args.tamanho, semente): arquivo
+                for arquivo in arquivos
+            }
+            for futuro in as_completed(futuros):
+                arquivo = futuros[futuro]
+                try:
+                    grupos, turmas, fluxo = futuro.result()
+                except Exception as erro:
+                    print(f"❌ {arquivo.name}: {erro}", file=sys.stderr)
+                    falhas += 1
+                    continue
+
+                sorteio_id = None
+                if args.salvar:
+                    sorteio_id = armazenamento.salvar(
+                        args.banco, grupos, f"{arquivo.stem} {data}", semente=semente, fluxo=fluxo
+                    )
+                escrever(arquivo, sorteio_id, grupos, turmas)
+                print(f"✅ {arquivo.name}: {len(grupos)} grupos", file=sys.stderr)
+    finally:
+        if args.saida:
+            saida.close()
+
+    return 1 if falhas else 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
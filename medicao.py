@@ -0,0 +1,92 @@
+"""Medição do tempo de cada etapa de uma execução (rerun) do app.
+
+Uso:
+
+    medicao.iniciar()
+    with medicao.etapa('carregar_dados'):
+        ...
+    registro = medicao.finalizar()
+
+Cada execução finalizada vira uma linha JSON no logger `medicao`. Para
+gravar essas linhas em arquivo, defina a variável de ambiente
+SORTEIO_MEDICAO_LOG com o caminho desejado. Quando a medição não está
+ativa, `etapa` devolve um contexto vazio e o custo é de uma consulta a
+um atributo da thread.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Caminho do log em JSON Lines (opcional)
+ARQUIVO_LOG = os.environ.get('SORTEIO_MEDICAO_LOG')
+
+if ARQUIVO_LOG:
+    _handler = logging.FileHandler(ARQUIVO_LOG, encoding='utf-8')
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# Execução em andamento em cada thread (o Streamlit roda cada sessão em uma thread)
+_local = threading.local()
+_NULO = nullcontext()
+
+
+def iniciar(ativa=True):
+    """Começa a medir uma execução na thread atual"""
+    if ativa:
+        _local.execucao = {
+            'inicio': datetime.now().isoformat(timespec='milliseconds'),
+            't0': time.perf_counter(),
+            'nivel': 0,
+            'etapas': [],
+        }
+    else:
+        _local.execucao = None
+
+
+def etapa(nome):
+    """Contexto que mede uma etapa da execução atual (não faz nada se inativa)"""
+    execucao = getattr(_local, 'execucao', None)
+    if execucao is None:
+        return _NULO
+    return _medir(execucao, nome)
+
+
+@contextmanager
+def _medir(execucao, nome):
+    inicio = time.perf_counter()
+    nivel = execucao['nivel']
+    execucao['nivel'] = nivel + 1
+    try:
+        yield
+    finally:
+        execucao['nivel'] = nivel
+        execucao['etapas'].append({
+            'etapa': nome,
+            'nivel': nivel,
+            'inicio_ms': round((inicio - execucao['t0']) * 1000, 3),
+            'duracao_ms': round((time.perf_counter() - inicio) * 1000, 3),
+        })
+
+
+def finalizar():
+    """Encerra a execução atual, registra a linha JSON e retorna o registro"""
+    execucao = getattr(_local, 'execucao', None)
+    _local.execucao = None
+    if execucao is None:
+        return None
+
+    registro = {
+        'inicio': execucao['inicio'],
+        'total_ms': round((time.perf_counter() - execucao['t0']) * 1000, 3),
+        'etapas': sorted(execucao['etapas'], key=lambda e: e['inicio_ms']),
+    }
+    logger.info(json.dumps(registro, ensure_ascii=False))
+    return registro
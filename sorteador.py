@@ -0,0 +1,611 @@
+"""Algoritmo de sorteio dos grupos.
+
+Fica separado do app Streamlit para poder ser usado também pela linha
+de comando e pelos scripts de benchmark.
+"""
+import multiprocessing
+import os
+import random
+import secrets
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from cadastro import CALOURO, REGRAS_PADRAO
+
+# Abaixo disso, abrir processos custa mais do que avaliar os candidatos
+_MIN_CANDIDATOS_PARALELO = 200
+
+# Estado de cada processo do pool, preenchido por _iniciar_processo
+_contexto = {}
+
+
+def numero_de_grupos(total_alunos, tamanho_grupo):
+    """Quantidade de grupos balanceados para o total de alunos.
+
+    Usa o menor número de grupos com no máximo `tamanho_grupo` alunos. O
+    limite só é excedido (em 1 aluno, em um único grupo) quando não há
+    outro jeito de evitar alguém sozinho: grupos de 2 com total ímpar.
+    """
+    if total_alunos == 0:
+        return 0
+    total_grupos = -(-total_alunos // tamanho_grupo)
+    if total_alunos >= 2 and total_alunos // total_grupos < 2:
+        total_grupos = total_alunos // 2
+    return total_grupos
+
+
+def gerador(semente, fluxo=0):
+    """Gerador aleatório próprio para o par (semente, fluxo).
+
+    Cada sessão, processo ou candidato usa seu próprio fluxo, então nada
+    depende do estado global do módulo random e sorteios simultâneos não
+    interferem entre si. O mesmo par sempre gera a mesma sequência: basta
+    guardar semente e fluxo para refazer um sorteio.
+    """
+    return random.Random(f"{semente}:{fluxo}")
+
+
+def nova_semente():
+    """Semente aleatória (63 bits, cabe em um inteiro do SQLite)"""
+    return secrets.randbits(63)
+
+
+def _participantes(df, grupos_manuais):
+    """Linhas da lista sem os alunos que já estão em grupos manuais"""
+    if not grupos_manuais:
+        return df
+    alunos_manuais = {aluno for grupo in grupos_manuais for aluno in grupo}
+    return df[~df['Nome'].isin(alunos_manuais)]
+
+
+def separar_por_turma(df, grupos_manuais=None):
+    """Alunos que entram no sorteio, agrupados por turma: {turma: [nomes]}.
+
+    Todas as turmas da lista entram, em ordem crescente do número da turma.
+    """
+    df = _participantes(df, grupos_manuais)
+    return {int(turma): nomes.tolist() for turma, nomes in df.groupby('Turma', sort=True)['Nome']}
+
+
+def contar_por_turma(df, grupos_manuais=None):
+    """Quantos alunos de cada turma entram no sorteio: {turma: quantidade}"""
+    contagens = _participantes(df, grupos_manuais)['Turma'].value_counts()
+    return {int(turma): int(quantidade) for turma, quantidade in contagens.items()}
+
+
+def verificar_regras(contagens, tamanho_grupo=4, regras=None):
+    """Problemas que tornam o sorteio impossível (lista vazia se ele é viável).
+
+    `contagens` é {turma: número de alunos} e `regras` é {turma: (mínimo,
+    máximo)} por grupo, com máximo None para sem limite. Como `distribuir`
+    espalha cada turma por igual entre os grupos, o sorteio é viável
+    exatamente quando cada turma tem alunos suficientes para o mínimo e
+    não passa do máximo em todos os grupos. Custo O(número de turmas).
+    """
+    regras = REGRAS_PADRAO if regras is None else regras
+    total_grupos = numero_de_grupos(sum(contagens.values()), tamanho_grupo)
+    problemas = []
+
+    for turma, (minimo, maximo) in sorted(regras.items()):
+        quantidade = contagens.get(turma, 0)
+        if maximo is not None and minimo > maximo:
+            problemas.append(f"Turma {turma}: o mínimo ({minimo}) é maior que o máximo ({maximo}) por grupo.")
+        elif quantidade < minimo * total_grupos:
+            problemas.append(
+                f"Turma {turma} insuficiente: são necessários pelo menos {minimo * total_grupos} "
+                f"alunos para {total_grupos} grupos de até {tamanho_grupo} alunos com {minimo} "
+                f"ou mais cada, mas há apenas {quantidade}."
+            )
+        elif maximo == 0 and quantidade:
+            problemas.append(f"Turma {turma}: o máximo é 0 por grupo, mas há {quantidade} alunos dela.")
+        elif maximo is not None and quantidade > maximo * total_grupos:
+            problemas.append(
+                f"Turma {turma} excedente: {quantidade} alunos não cabem em {total_grupos} grupos "
+                f"com no máximo {maximo} cada (seriam necessários {-(-quantidade // maximo)} grupos)."
+            )
+
+    return problemas
+
+
+def distribuir(por_turma, tamanho_grupo=4, regras=None, rng=None):
+    """Embaralha e distribui os alunos nos grupos (as listas não são alteradas).
+
+    `por_turma` é o dicionário de `separar_por_turma`. Cada turma é
+    embaralhada e os alunos são distribuídos em rodízio, uma turma após a
+    outra: os tamanhos diferem em no máximo 1 e cada turma fica espalhada
+    por igual (cada grupo recebe o piso ou o teto de alunos/grupos dela),
+    o que garante as cotas de `regras`. Custo O(n).
+
+    Lança ValueError, antes de embaralhar, se as regras forem inviáveis
+    (veja `verificar_regras`). Sem regras, vale REGRAS_PADRAO: pelo menos
+    1 calouro por grupo.
+    """
+    rng = rng or gerador(nova_semente())
+
+    contagens = {turma: len(alunos) for turma, alunos in por_turma.items()}
+    problemas = verificar_regras(contagens, tamanho_grupo, regras)
+    if problemas:
+        raise ValueError(" ".join(problemas))
+
+    # Embaralhar cada turma
+    alunos = []
+    for turma in sorted(por_turma):
+        embaralhados = list(por_turma[turma])
+        rng.shuffle(embaralhados)
+        alunos.extend(embaralhados)
+
+    # Rodízio: o aluno i vai para o grupo i % total_grupos
+    total_grupos = numero_de_grupos(len(alunos), tamanho_grupo)
+    return [alunos[idx::total_grupos] for idx in range(total_grupos)]
+
+
+def sortear_grupos(df, tamanho_grupo=4, grupos_manuais=None, rng=None, regras=None):
+    """Sorteia grupos respeitando as cotas por turma de `regras`
+    (por padrão, pelo menos 1 calouro por grupo) e sem ninguém sozinho.
+
+    `rng` é o gerador usado para embaralhar; use `gerador(semente, fluxo)`
+    para um sorteio reproduzível. Sem ele, usa uma semente nova.
+    Veja `distribuir` para as regras de distribuição e erros.
+    """
+    return distribuir(separar_por_turma(df, grupos_manuais), tamanho_grupo, regras, rng)
+
+
+def pontuar_repeticoes(grupos, cadastro, pares):
+    """Pontuação de um sorteio (menor é melhor): duplas repetidas de sorteios anteriores.
+
+    Com o rodízio de `distribuir`, tamanhos e contagens por turma de cada
+    grupo dependem só das quantidades, e são iguais em todos os
+    candidatos; o que muda entre eles é quem fica com quem. `pares` é o
+    dicionário de armazenamento.carregar_pares.
+    """
+    return contar_repeticoes(grupos, pares)
+
+
+def _iniciar_processo(por_turma, tamanho_grupo, regras, cadastro, pontuar, semente, fluxo):
+    """Guarda no processo os dados comuns a todos os candidatos"""
+    _contexto.update(
+        por_turma=por_turma,
+        tamanho_grupo=tamanho_grupo,
+        regras=regras,
+        cadastro=cadastro,
+        pontuar=pontuar,
+        semente=semente,
+        fluxo=fluxo,
+    )
+
+
+def _fluxo_candidato(fluxo, indice):
+    """Fluxo do i-ésimo candidato de um sorteio 'melhor de N'"""
+    return f"{fluxo}/{indice}"
+
+
+def _avaliar_candidatos(indices):
+    """Gera e pontua um candidato por índice; retorna (pontuação, índice) do melhor"""
+    melhor = None
+    for indice in indices:
+        grupos = distribuir(
+            _contexto['por_turma'],
+            _contexto['tamanho_grupo'],
+            _contexto['regras'],
+            gerador(_contexto['semente'], _fluxo_candidato(_contexto['fluxo'], indice)),
+        )
+        candidato = (_contexto['pontuar'](grupos, _contexto['cadastro']), indice)
+        if melhor is None or candidato < melhor:
+            melhor = candidato
+    return melhor
+
+
+def melhor_de_n(df, cadastro, n_candidatos, tamanho_grupo=4, grupos_manuais=None,
+                pares=None, pontuar=None, semente=0, fluxo=0, processos=None, regras=None):
+    """Gera `n_candidatos` sorteios e retorna o melhor segundo `pontuar`.
+
+    Por padrão, o melhor é o que repete menos duplas dos sorteios salvos
+    (`pontuar_repeticoes` com os `pares` de carregar_pares). O candidato i
+    usa o fluxo "<fluxo>/<i>" da `semente`, então o vencedor pode ser
+    refeito exatamente com `gerador(semente, fluxo_vencedor)`. Os
+    candidatos são avaliados em paralelo em um pool de processos; em caso
+    de empate vence o menor índice, então o resultado não depende do
+    número de processos.
+
+    `pontuar(grupos, cadastro)` deve ser uma função de módulo (ou partial)
+    para poder ser enviada aos processos, e não pode ser negativa: um
+    candidato com pontuação 0 não pode ser superado e encerra a busca (sem
+    sorteios salvos, o primeiro candidato já vence).
+
+    Retorna (grupos, pontuação, fluxo do vencedor).
+    """
+    if pontuar is None:
+        pontuar = partial(pontuar_repeticoes, pares=pares or {})
+    por_turma = separar_por_turma(df, grupos_manuais)
+    args = (por_turma, tamanho_grupo, regras, cadastro, pontuar, semente, fluxo)
+    indices = range(max(n_candidatos, 1))
+
+    # O primeiro candidato roda aqui mesmo: valida a configuração antes de abrir o pool
+    _iniciar_processo(*args)
+    melhor = _avaliar_candidatos(indices[:1])
+
+    processos = processos or os.cpu_count() or 1
+    restantes = indices[1:] if melhor[0] > 0 else indices[:0]
+    if processos == 1 or len(restantes) < _MIN_CANDIDATOS_PARALELO:
+        resultados = [_avaliar_candidatos(restantes)] if restantes else []
+    else:
+        tamanho_lote = -(-len(restantes) // (processos * 4))
+        lotes = [restantes[i:i + tamanho_lote] for i in range(0, len(restantes), tamanho_lote)]
+        # spawn: o processo do Streamlit tem threads, e fork com threads não é seguro
+        with ProcessPoolExecutor(
+            max_workers=processos,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_iniciar_processo,
+            initargs=args,
+        ) as pool:
+            resultados = list(pool.map(_avaliar_candidatos, lotes))
+
+    pontuacao, indice = min([melhor, *resultados])
+    fluxo_vencedor = _fluxo_candidato(fluxo, indice)
+    grupos = distribuir(por_turma, tamanho_grupo, regras, gerador(semente, fluxo_vencedor))
+    return grupos, pontuacao, fluxo_vencedor
+
+
+def contar_repeticoes(grupos, pares):
+    """Total de duplas repetidas: soma, para cada par no mesmo grupo, das vezes
+    em que ele já esteve junto em sorteios anteriores"""
+    total = 0
+    for grupo in grupos:
+        for i, aluno in enumerate(grupo):
+            vizinhos = pares.get(aluno)
+            if vizinhos:
+                total += sum(vizinhos.get(outro, 0) for outro in grupo[i + 1:])
+    return total
+
+
+def minimizar_repeticoes(grupos, cadastro, pares, tempo_limite=0.5, tentativas=8, rng=None):
+    """Troca alunos entre grupos para reduzir duplas já formadas antes.
+
+    `pares` é o dicionário de carregar_pares. Só alunos da mesma turma são
+    trocados entre si, então tamanhos e número de calouros de cada grupo
+    não mudam. Busca local gulosa: a cada rodada, cada aluno com repetição
+    no grupo tenta `tentativas` trocas aleatórias e aplica a que mais
+    reduzir o total. Para quando uma rodada não melhora nada ou quando
+    `tempo_limite` segundos se esgotam.
+
+    Retorna (grupos, repetições antes, repetições depois).
+    """
+    rng = rng or gerador(nova_semente())
+    prazo = time.perf_counter() + tempo_limite
+    grupos = [list(grupo) for grupo in grupos]
+    antes = contar_repeticoes(grupos, pares)
+
+    grupo_de = {aluno: idx for idx, grupo in enumerate(grupos) for aluno in grupo}
+    por_turma = {}
+    for aluno in grupo_de:
+        por_turma.setdefault(cadastro.turma(aluno), []).append(aluno)
+
+    def custo(aluno, idx_grupo, ignorar=None):
+        vizinhos = pares.get(aluno)
+        if not vizinhos:
+            return 0
+        return sum(
+            vizinhos.get(outro, 0)
+            for outro in grupos[idx_grupo]
+            if outro != aluno and outro != ignorar
+        )
+
+    atual = antes
+    melhorou = True
+    while melhorou and atual > 0 and time.perf_counter() < prazo:
+        melhorou = False
+        conflitantes = [a for a in grupo_de if a in pares and custo(a, grupo_de[a]) > 0]
+        rng.shuffle(conflitantes)
+
+        for x in conflitantes:
+            if time.perf_counter() >= prazo:
+                break
+            gx = grupo_de[x]
+            custo_x = custo(x, gx)
+            if custo_x == 0:
+                continue
+
+            candidatos = por_turma[cadastro.turma(x)]
+            melhor_delta, melhor_y = 0, None
+            for _ in range(tentativas):
+                y = rng.choice(candidatos)
+                gy = grupo_de[y]
+                if gy == gx:
+                    continue
+                delta = (
+                    custo(x, gy, ignorar=y) + custo(y, gx, ignorar=x)
+                    - custo_x - custo(y, gy)
+                )
+                if delta < melhor_delta:
+                    melhor_delta, melhor_y = delta, y
+
+            if melhor_y is not None:
+                gy = grupo_de[melhor_y]
+                grupos[gx][grupos[gx].index(x)] = melhor_y
+                grupos[gy][grupos[gy].index(melhor_y)] = x
+                grupo_de[x], grupo_de[melhor_y] = gy, gx
+                atual += melhor_delta
+                melhorou = True
+
+    return grupos, antes, atual
+
+
+def _classificar(indice, idx, antes, depois):
+    """Move o grupo `idx` entre os conjuntos do índice quando passa de `antes` para `depois` alunos"""
+    tamanho_grupo = indice['tamanho_grupo']
+    for tamanho, entra in ((antes, False), (depois, True)):
+        if 0 < tamanho < tamanho_grupo:
+            conjunto = indice['vagas'].setdefault(tamanho, set())
+        elif tamanho > tamanho_grupo:
+            conjunto = indice['acima']
+        else:
+            continue
+        if entra:
+            conjunto.add(idx)
+        else:
+            conjunto.discard(idx)
+
+
+def indexar_grupos(grupos, tamanho_grupo=4, alunos=None):
+    """Índice de um sorteio para reparar_grupos.
+
+    Guarda o grupo (posição na lista) de cada aluno, os grupos com vaga
+    separados por tamanho e os que passam de `tamanho_grupo`. Montá-lo
+    percorre a lista inteira; reparar_grupos o mantém em dia, então
+    basta um por sorteio. Com `alunos`, só o grupo deles é guardado.
+    """
+    indice = {'tamanho_grupo': tamanho_grupo, 'grupo_de': {}, 'vagas': {}, 'acima': set()}
+    for idx, grupo in enumerate(grupos):
+        if alunos is None:
+            for aluno in grupo:
+                indice['grupo_de'][aluno] = idx
+        elif alunos:
+            for aluno in alunos.intersection(grupo):
+                indice['grupo_de'][aluno] = idx
+        if len(grupo) != tamanho_grupo:
+            _classificar(indice, idx, 0, len(grupo))
+    return indice
+
+
+def reparar_grupos(grupos, cadastro, ausentes=(), novos=(), tamanho_grupo=4, renumerar=False,
+                   indice=None, regras=None):
+    """Ajusta um sorteio já anunciado a faltas e chegadas, mexendo no mínimo possível.
+
+    Tira os `ausentes` dos seus grupos e coloca os `novos` (alunos que
+    ainda não estão no sorteio) nos grupos com vaga, calouros primeiro
+    onde falta calouro. Depois corrige só os grupos afetados:
+
+    - aluno sozinho: vai para outro grupo com vaga ou, sem vaga, recebe
+      alguém de um grupo com mais de 2 alunos; com grupos de 2, como no
+      sorteio, um único grupo pode ficar com 3;
+    - grupo sem calouro: troca um veterano por um calouro de um grupo
+      que tenha 2 ou mais; sem calouro sobrando, o grupo é desfeito.
+
+    Grupos desfeitos ficam vazios ([]) para que nenhum outro grupo mude de
+    número (os vazios do final são removidos); com `renumerar`, o último
+    grupo assume o número de cada grupo desfeito. Os tamanhos continuam
+    entre 2 e `tamanho_grupo` (com a mesma exceção de numero_de_grupos),
+    mas podem deixar de diferir em no máximo 1. Os grupos alterados são
+    conferidos com as cotas de `regras` (as do sorteio); se algum sair
+    delas, o reparo é recusado.
+
+    `indice` é o de indexar_grupos para estes `grupos` e este
+    `tamanho_grupo`; ausentes e vagas são achados nele e, se o reparo der
+    certo, ele é atualizado no lugar para o próximo. Assim o custo segue
+    o tamanho da alteração, fora a cópia da lista externa de grupos e a
+    procura de um calouro para doar, que pode percorrer vários grupos.
+    Sem `indice`, cada chamada faz uma passada pela lista inteira.
+
+    Retorna (grupos, movimentos), em que cada movimento é um dicionário
+    {'aluno', 'de', 'para'} com os números (a partir de 1) do grupo
+    anterior e do novo; 'de' é None para quem chegou e 'para' é None
+    para quem saiu. Lança ValueError se não houver calouros suficientes
+    ou se as cotas não forem respeitadas.
+    """
+    ausentes = set(ausentes)
+    if indice is None:
+        indice = indexar_grupos(grupos, tamanho_grupo, ausentes)
+    elif indice['tamanho_grupo'] != tamanho_grupo:
+        raise ValueError("O índice foi montado para outro tamanho de grupo.")
+    recebidos = grupos
+    grupos = list(grupos)
+    copiados = set()
+    calouros_no_grupo = {}
+    afetados = set()
+    origem = {}
+    local = {}
+
+    def editavel(idx):
+        """Copia o grupo na primeira alteração (a lista recebida não muda)"""
+        if idx not in copiados:
+            grupos[idx] = list(grupos[idx])
+            copiados.add(idx)
+        return grupos[idx]
+
+    def n_calouros(idx):
+        if idx not in calouros_no_grupo:
+            calouros_no_grupo[idx] = sum(1 for aluno in grupos[idx] if cadastro.turma(aluno) == CALOURO)
+        return calouros_no_grupo[idx]
+
+    def mover(aluno, de, para):
+        origem.setdefault(aluno, de)
+        calouro = cadastro.turma(aluno) == CALOURO
+        for idx, sinal in ((de, -1), (para, 1)):
+            if idx is None:
+                continue
+            n_calouros(idx)
+            if sinal < 0:
+                editavel(idx).remove(aluno)
+            else:
+                editavel(idx).append(aluno)
+            calouros_no_grupo[idx] += sinal * calouro
+            afetados.add(idx)
+        local[aluno] = para
+
+    def valido(idx):
+        """Grupos não afetados já estavam válidos"""
+        return idx not in afetados or (len(grupos[idx]) >= 2 and n_calouros(idx) > 0)
+
+    # Os conjuntos do índice continuam com os tamanhos recebidos: servem
+    # para os grupos não afetados, e os afetados são olhados um a um.
+    def com_vaga(excluir, precisa_calouro):
+        """Menor grupo com vaga, procurando primeiro entre os afetados"""
+        vagas = [
+            idx for idx in sorted(afetados)
+            if idx != excluir and 0 < len(grupos[idx]) < tamanho_grupo
+            and (not precisa_calouro or n_calouros(idx) > 0)
+        ]
+        if vagas:
+            return min(vagas, key=lambda idx: len(grupos[idx]))
+        for tamanho in range(1, tamanho_grupo):
+            for idx in indice['vagas'].get(tamanho, ()):
+                if idx != excluir and idx not in afetados:
+                    return idx
+        return None
+
+    def doador(excluir, calouro, minimo_tamanho):
+        """(grupo, aluno) que pode sair de um grupo sem deixá-lo inválido"""
+        if minimo_tamanho > tamanho_grupo:
+            outros = sorted(indice['acima'])
+        else:
+            outros = range(len(recebidos))
+        for candidatos in (sorted(afetados), outros):
+            for idx in candidatos:
+                if idx == excluir or len(grupos[idx]) < minimo_tamanho or not valido(idx):
+                    continue
+                if calouro:
+                    if n_calouros(idx) >= 2:
+                        return idx, next(a for a in grupos[idx] if cadastro.turma(a) == CALOURO)
+                else:
+                    veterano = next((a for a in grupos[idx] if cadastro.turma(a) != CALOURO), None)
+                    if veterano is not None:
+                        return idx, veterano
+        return None
+
+    def vaga_extra(excluir, precisa_calouro):
+        """Grupo que pode passar do limite em 1: só com grupos de 2 e se nenhum outro já passou"""
+        if tamanho_grupo != 2 or any(len(grupos[idx]) > tamanho_grupo for idx in afetados):
+            return None
+        if any(idx not in afetados for idx in indice['acima']):
+            return None
+        for idx in sorted(afetados):
+            if (idx != excluir and len(grupos[idx]) == tamanho_grupo
+                    and (not precisa_calouro or n_calouros(idx) > 0)):
+                return idx
+        # Sem vaga em nenhum grupo, os não afetados estão todos cheios
+        return next((idx for idx in range(len(recebidos)) if idx != excluir and idx not in afetados), None)
+
+    for aluno in ausentes:
+        idx = indice['grupo_de'].get(aluno)
+        if idx is not None:
+            mover(aluno, idx, None)
+
+    for aluno in sorted(novos, key=lambda a: cadastro.turma(a) != CALOURO):
+        calouro = cadastro.turma(aluno) == CALOURO
+        destino = None
+        if calouro:
+            destino = next(
+                (idx for idx in sorted(afetados)
+                 if grupos[idx] and n_calouros(idx) == 0 and len(grupos[idx]) < tamanho_grupo),
+                None
+            )
+        if destino is None:
+            destino = com_vaga(None, not calouro)
+        if destino is None:
+            grupos.append([])
+            destino = len(grupos) - 1
+            copiados.add(destino)
+        mover(aluno, None, destino)
+
+    while True:
+        problema = next((idx for idx in sorted(afetados) if grupos[idx] and not valido(idx)), None)
+        if problema is None:
+            break
+        grupo = grupos[problema]
+
+        if len(grupo) < 2:
+            aluno = grupo[0]
+            destino = com_vaga(problema, cadastro.turma(aluno) != CALOURO)
+            if destino is not None:
+                mover(aluno, problema, destino)
+                continue
+            # Sem vaga em outro grupo: alguém de um grupo com mais de 2 vem fazer companhia
+            sem_calouro = n_calouros(problema) == 0
+            encontrado = doador(problema, sem_calouro, 3) or (None if sem_calouro else doador(problema, True, 3))
+            if encontrado is None:
+                destino = vaga_extra(problema, cadastro.turma(aluno) != CALOURO)
+                if destino is not None:
+                    mover(aluno, problema, destino)
+                    continue
+                raise ValueError(
+                    f"Não há como completar o grupo de {aluno} sem deixar outro grupo inválido."
+                )
+            idx, outro = encontrado
+            mover(outro, idx, problema)
+            continue
+
+        # Sem calouro: troca um veterano por um calouro de um grupo que tenha 2 ou mais
+        encontrado = doador(problema, True, 2)
+        if encontrado is not None:
+            idx, calouro = encontrado
+            veterano = grupo[-1]
+            mover(calouro, idx, problema)
+            mover(veterano, problema, idx)
+            continue
+
+        # Nenhum calouro sobrando: o grupo é desfeito
+        for aluno in list(grupo):
+            destino = com_vaga(problema, True)
+            if destino is None:
+                destino = vaga_extra(problema, True)
+            if destino is None:
+                raise ValueError(
+                    f"Calouros insuficientes: não há calouro para o grupo {problema + 1} "
+                    f"nem vaga para desfazê-lo em grupos de até {tamanho_grupo} alunos."
+                )
+            mover(aluno, problema, destino)
+
+    alterados = sorted(idx for idx in afetados if grupos[idx])
+    situacoes = cadastro.situacao_grupos([grupos[idx] for idx in alterados], regras)
+    fora = [idx + 1 for idx, situacao in zip(alterados, situacoes) if situacao != 'valido']
+    if fora:
+        raise ValueError(
+            f"O ajuste deixaria fora das cotas por turma o(s) grupo(s) {', '.join(map(str, fora))}."
+        )
+
+    # Com renumerar, o último grupo assume o número de cada grupo que ficou vazio
+    mudaram = set(afetados)
+    if renumerar:
+        for idx in sorted((idx for idx in afetados if not grupos[idx]), reverse=True):
+            ultimo = len(grupos) - 1
+            if idx != ultimo:
+                grupos[idx] = grupos[ultimo]
+                for aluno in grupos[idx]:
+                    origem.setdefault(aluno, ultimo)
+                    local[aluno] = idx
+            grupos.pop()
+            mudaram.add(ultimo)
+    while grupos and not grupos[-1]:
+        grupos.pop()
+
+    # Deu certo: o índice passa a descrever os grupos novos
+    for idx in mudaram:
+        antes = len(recebidos[idx]) if idx < len(recebidos) else 0
+        depois = len(grupos[idx]) if idx < len(grupos) else 0
+        _classificar(indice, idx, antes, depois)
+    for aluno in origem:
+        if local[aluno] is None:
+            indice['grupo_de'].pop(aluno, None)
+        else:
+            indice['grupo_de'][aluno] = local[aluno]
+
+    def numero(idx):
+        return None if idx is None else idx + 1
+
+    movimentos = [
+        {'aluno': aluno, 'de': numero(de), 'para': numero(local[aluno])}
+        for aluno, de in origem.items()
+        if de != local[aluno]
+    ]
+    return grupos, movimentos
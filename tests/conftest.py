@@ -0,0 +1,34 @@
+"""Utilitários comuns dos testes"""
+import random
+
+import pytest
+
+from cadastro import CALOURO, VETERANO, Cadastro
+
+
+def lista_aleatoria(rng, n_alunos, n_calouros, turmas_extras=0, prefixo='ALUNO'):
+    """{turma: [nomes]} com `n_calouros` calouros e os demais veteranos
+    (ou, com `turmas_extras`, espalhados também pelas turmas 3, 4, ...)"""
+    turmas = [VETERANO, *range(3, 3 + turmas_extras)]
+    por_turma = {CALOURO: [f"{prefixo} {i}" for i in range(n_calouros)]}
+    for i in range(n_calouros, n_alunos):
+        por_turma.setdefault(rng.choice(turmas), []).append(f"{prefixo} {i}")
+    return por_turma
+
+
+def cadastro_de(por_turma):
+    """Cadastro de um dicionário {turma: [nomes]}"""
+    pares = [(nome, turma) for turma, nomes in por_turma.items() for nome in nomes]
+    return Cadastro([nome for nome, _ in pares], [turma for _, turma in pares])
+
+
+@pytest.fixture
+def rng(request):
+    """Gerador com semente fixa por teste, para falhas reproduzíveis"""
+    return random.Random(request.node.name)
+
+
+@pytest.fixture
+def banco(tmp_path):
+    """Banco de sorteios novo em um diretório temporário"""
+    return tmp_path / "grupos_salvos.db"
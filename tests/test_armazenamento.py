@@ -0,0 +1,258 @@
+"""Testes do histórico de sorteios (armazenamento.py)"""
+import json
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+import armazenamento
+
+
+def historico_aleatorio(banco, rng, n_sorteios, n_alunos=40):
+    """Salva sorteios aleatórios com nomes repetidos entre si e alguns grupos manuais"""
+    nomes = [f"{rng.choice(['Ana', 'Davi', 'Eloá', 'João'])} {rng.choice(['Silva', 'Lima', 'Durães'])} {i}"
+             for i in range(n_alunos)]
+    ids = []
+    for i in range(n_sorteios):
+        alunos = rng.sample(nomes, rng.randint(4, n_alunos))
+        manuais = [alunos[:2]] if rng.random() < 0.3 else []
+        resto = alunos[len(manuais) * 2:]
+        grupos = [resto[j:j + 4] for j in range(0, len(resto), 4)]
+        ids.append(armazenamento.salvar(banco, grupos, f"Sorteio {i}", manuais))
+    return nomes, ids
+
+
+def buscar_por_varredura(sorteios, nome_parcial):
+    """Busca antiga do app: varre todos os grupos de todos os sorteios"""
+    nome_parcial = nome_parcial.lower().strip()
+    resultados = []
+    for sorteio in sorteios:
+        for tipo, chave in (('Automático', 'grupos_automaticos'), ('Manual', 'grupos_manuais')):
+            for idx, grupo in enumerate(sorteio[chave]):
+                for aluno in grupo:
+                    if nome_parcial in aluno.lower():
+                        resultados.append({
+                            'sorteio_id': sorteio['id'],
+                            'sorteio_nome': sorteio['nome'],
+                            'data': sorteio['data'],
+                            'tipo_grupo': tipo,
+                            'numero_grupo': idx + 1,
+                            'aluno': aluno,
+                            'grupo_completo': grupo,
+                        })
+    return resultados
+
+
+def test_salvar_e_carregar(banco):
+    sorteio_id = armazenamento.salvar(banco, [['A', 'B'], ['C', 'D']], "Turma", [['E', 'F']], 42, 'x')
+
+    sorteio = armazenamento.carregar_sorteio(banco, sorteio_id)
+    assert sorteio['grupos_automaticos'] == [['A', 'B'], ['C', 'D']]
+    assert sorteio['grupos_manuais'] == [['E', 'F']]
+    assert (sorteio['semente'], sorteio['fluxo']) == (42, 'x')
+    resumos, total = armazenamento.listar(banco)
+    assert total == 1
+    assert resumos[0]['total_grupos'] == 3 and resumos[0]['total_alunos'] == 6
+
+
+def test_historico_relido_decodifica_os_grupos_sob_demanda(banco):
+    ids = [
+        armazenamento.salvar(banco, [['Ana', 'Bia'], ['Caio', 'Davi']], "Um", [['Eloá', 'Fábio']], 1, '0'),
+        armazenamento.salvar(banco, [['Ana', 'Caio']], "Dois"),
+    ]
+    esperados = [dict(armazenamento.carregar_sorteio(banco, sorteio_id)) for sorteio_id in ids]
+    # Descarta o histórico em memória para forçar a releitura do banco
+    armazenamento._cache_historico.clear()
+
+    relidos = armazenamento.carregar(banco)
+
+    assert [dict(sorteio) for sorteio in relidos] == esperados
+    assert relidos[0]['grupos_manuais'] == [['Eloá', 'Fábio']]
+    assert list(relidos[1]) == ['id', 'nome', 'data', 'grupos_automaticos', 'grupos_manuais', 'semente', 'fluxo']
+
+
+def test_migracao_do_json_preserva_ids(banco):
+    legado = [
+        {'id': 3, 'nome': 'Antigo', 'data': '2024-01-01 10:00:00',
+         'grupos_automaticos': [['Ana', 'Bia'], ['Caio', 'Davi']], 'grupos_manuais': []},
+        {'id': 7, 'nome': 'Outro', 'data': '2024-02-01 10:00:00',
+         'grupos_automaticos': [['Ana', 'Caio']], 'grupos_manuais': [['Bia', 'Davi']]},
+    ]
+    banco.with_suffix('.json').write_text(json.dumps(legado), encoding='utf-8')
+
+    sorteios = armazenamento.carregar(banco)
+
+    assert [s['id'] for s in sorteios] == [3, 7]
+    assert [s['grupos_automaticos'] for s in sorteios] == [l['grupos_automaticos'] for l in legado]
+    assert sorteios[1]['grupos_manuais'] == [['Bia', 'Davi']]
+    # A sequência continua depois do maior ID importado
+    assert armazenamento.salvar(banco, [['Ana', 'Davi']], 'Novo') == 8
+    assert [r['sorteio_id'] for r in armazenamento.buscar(banco, 'davi')] == [3, 7, 8]
+
+
+def test_migracao_do_json_com_ids_repetidos(banco):
+    # O JSON antigo dava len(dados) + 1 como ID: excluir e salvar de novo repetia IDs
+    legado = [
+        {'id': 1, 'nome': 'Primeiro', 'data': '2024-01-01 10:00:00', 'grupos_automaticos': [['Ana', 'Bia']]},
+        {'id': 2, 'nome': 'Segundo', 'data': '2024-01-02 10:00:00', 'grupos_automaticos': [['Caio', 'Davi']]},
+        {'id': 2, 'nome': 'Terceiro', 'data': '2024-01-03 10:00:00', 'grupos_automaticos': [['Ana', 'Davi']]},
+    ]
+    banco.with_suffix('.json').write_text(json.dumps(legado), encoding='utf-8')
+
+    sorteios = armazenamento.carregar(banco)
+
+    assert [(s['id'], s['nome']) for s in sorteios] == [(1, 'Primeiro'), (2, 'Segundo'), (3, 'Terceiro')]
+    assert armazenamento.salvar(banco, [['Bia', 'Caio']], 'Novo') == 4
+    assert [r['sorteio_id'] for r in armazenamento.buscar(banco, 'davi')] == [2, 3]
+
+
+def test_migracao_do_json_acontece_uma_vez(banco):
+    banco.with_suffix('.json').write_text(json.dumps([
+        {'id': 1, 'nome': 'Antigo', 'data': '2024-01-01 10:00:00', 'grupos_automaticos': [['A', 'B']]},
+    ]), encoding='utf-8')
+    armazenamento.carregar(banco)
+    armazenamento.deletar(banco, 1)
+
+    # Uma nova conexão (outra thread) não importa o JSON de novo
+    resultado = []
+    thread = threading.Thread(target=lambda: resultado.append(armazenamento.carregar(banco)))
+    thread.start()
+    thread.join()
+    assert resultado == [[]]
+
+
+def test_salvamentos_simultaneos_nao_repetem_ids(banco):
+    armazenamento.carregar(banco)
+    ids = []
+    trava = threading.Lock()
+
+    def salvar(indice):
+        for i in range(25):
+            sorteio_id = armazenamento.salvar(banco, [[f"A{indice}", f"B{i}"]], f"s{indice}-{i}")
+            with trava:
+                ids.append((f"s{indice}-{i}", sorteio_id))
+
+    threads = [threading.Thread(target=salvar, args=(indice,)) for indice in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    salvos = {s['nome']: s['id'] for s in armazenamento.carregar(banco)}
+    assert len(ids) == 200
+    assert len({sorteio_id for _, sorteio_id in ids}) == 200
+    assert salvos == dict(ids)
+
+
+def test_busca_equivale_a_varredura(banco, rng):
+    nomes, ids = historico_aleatorio(banco, rng, 40)
+    for sorteio_id in rng.sample(ids, 5):
+        armazenamento.deletar(banco, sorteio_id)
+    sorteios = armazenamento.carregar(banco)
+
+    consultas = ['a', 'da', 'SILVA', ' lima ', 'eloá d', 'xyz', 'ana silva 1']
+    for nome in rng.sample(nomes, 10):
+        inicio = rng.randrange(len(nome) - 2)
+        consultas.append(nome[inicio:inicio + rng.randint(1, 8)])
+
+    for consulta in consultas:
+        assert armazenamento.buscar(banco, consulta) == buscar_por_varredura(sorteios, consulta), consulta
+
+
+def arquivar_tudo(banco):
+    """Move todos os sorteios salvos até agora para um segmento de arquivo"""
+    return armazenamento.compactar(banco, dias=1, agora=datetime.now() + timedelta(days=2))
+
+
+def test_busca_le_o_arquivo_so_para_quem_nao_esta_no_banco(banco, rng):
+    nomes, _ = historico_aleatorio(banco, rng, 15)
+    arquivados = [dict(sorteio) for sorteio in armazenamento.carregar(banco)]
+    assert arquivar_tudo(banco)['total_sorteios'] == 15
+    # Metade dos nomes volta a aparecer em sorteios do banco
+    armazenamento.salvar(banco, [nomes[i:i + 2] for i in range(0, len(nomes) // 2, 2)], "Novo")
+    no_banco = armazenamento.carregar(banco)
+
+    consultas = ['a', 'silva', 'ana', 'eloá d', 'xyz'] + [nome[-3:] for nome in rng.sample(nomes, 8)]
+    for consulta in consultas:
+        recentes = buscar_por_varredura(no_banco, consulta)
+        com_recentes = {r['aluno'] for r in recentes}
+        antigos = [r for r in buscar_por_varredura(arquivados, consulta) if r['aluno'] not in com_recentes]
+        assert armazenamento.buscar(banco, consulta) == antigos + recentes, consulta
+
+
+def test_deletar_sorteio_arquivado_ou_inexistente(banco):
+    arquivado = armazenamento.salvar(banco, [['Ana', 'Bia']], "Antigo")
+    arquivar_tudo(banco)
+    versao = armazenamento.versao(banco)
+
+    with pytest.raises(ValueError, match="arquivado"):
+        armazenamento.deletar(banco, arquivado)
+    assert armazenamento.deletar(banco, arquivado + 1) is False
+    assert armazenamento.versao(banco) == versao
+    assert armazenamento.carregar_sorteio(banco, arquivado)['grupos_automaticos'] == [['Ana', 'Bia']]
+
+
+def test_todos_os_sorteios_inclui_os_arquivados(banco, rng):
+    historico_aleatorio(banco, rng, 6)
+    arquivar_tudo(banco)
+    armazenamento.salvar(banco, [['Ana', 'Bia']], "Novo")
+    arquivar_tudo(banco)
+    armazenamento.salvar(banco, [['Caio', 'Davi']], "Recente")
+
+    todos = [dict(sorteio) for sorteio in armazenamento.todos_os_sorteios(banco)]
+    assert [sorteio['id'] for sorteio in todos] == list(range(1, 9))
+    assert todos[-1] == dict(armazenamento.carregar(banco)[0])
+    assert todos == [dict(armazenamento.carregar_sorteio(banco, sorteio_id)) for sorteio_id in range(1, 9)]
+
+
+def contagens_do_historico(sorteios):
+    """Participações e pares recalculados a partir dos sorteios"""
+    participacoes = {}
+    pares = Counter()
+    for sorteio in sorteios:
+        vistos = set()
+        for tipo, chave in enumerate(('grupos_automaticos', 'grupos_manuais')):
+            for grupo in sorteio[chave]:
+                for aluno in grupo:
+                    contagem = participacoes.setdefault(aluno, [0, 0, 0])
+                    contagem[1 + tipo] += 1
+                    if aluno not in vistos:
+                        vistos.add(aluno)
+                        contagem[0] += 1
+                membros = sorted(set(grupo))
+                pares.update((a, b) for i, a in enumerate(membros) for b in membros[i + 1:])
+    return participacoes, pares
+
+
+def test_estatisticas_incrementais_batem_com_a_reconstrucao(banco, rng):
+    _, ids = historico_aleatorio(banco, rng, 30)
+    for sorteio_id in rng.sample(ids, 8):
+        armazenamento.deletar(banco, sorteio_id)
+    historico_aleatorio(banco, rng, 10)
+
+    participacoes, pares = contagens_do_historico(armazenamento.carregar(banco))
+
+    assert {
+        p['aluno']: [p['sorteios'], p['automaticos'], p['manuais']]
+        for p in armazenamento.participacoes(banco)
+    } == participacoes
+    matriz = armazenamento.carregar_pares(banco)
+    assert {(a, b): vezes for a, vizinhos in matriz.items() for b, vezes in vizinhos.items() if a < b} == pares
+
+    aluno = max(participacoes, key=lambda a: participacoes[a][0])
+    estatisticas = armazenamento.estatisticas_aluno(banco, aluno, limite_parceiros=3)
+    assert estatisticas['sorteios'] == participacoes[aluno][0]
+    vezes = sorted((v for par, v in pares.items() if aluno in par), reverse=True)
+    assert [v for _, v in estatisticas['parceiros']] == vezes[:3]
+
+    assert armazenamento.reconstruir_estatisticas(banco) == {'pares': 0, 'participacoes': 0}
+
+
+def test_reconstrucao_corrige_divergencias(banco, rng):
+    historico_aleatorio(banco, rng, 5)
+    conn = armazenamento._conexao(banco)
+    conn.execute('UPDATE participacoes SET sorteios = sorteios + 1 WHERE rowid IN (SELECT rowid FROM participacoes LIMIT 2)')
+
+    assert armazenamento.reconstruir_estatisticas(banco) == {'pares': 0, 'participacoes': 2}
+    assert armazenamento.reconstruir_estatisticas(banco) == {'pares': 0, 'participacoes': 0}
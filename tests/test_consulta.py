@@ -0,0 +1,87 @@
+"""Testes da consulta pública (consulta.py): snapshot e republicação pelo servidor"""
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.request import urlopen
+
+import pytest
+
+import armazenamento
+import consulta
+
+
+def salvar_exemplos(banco):
+    armazenamento.salvar(banco, [['Ana Silva', 'Bia Lima'], ['Caio Durães', 'Davi Silva']], "Primeiro")
+    armazenamento.salvar(banco, [['Ana Silva', 'Davi Silva']], "Segundo", [['Bia Lima', 'Eloá']])
+
+
+def test_snapshot_equivale_a_busca(banco, tmp_path):
+    salvar_exemplos(banco)
+    destino = tmp_path / "snapshot.consulta"
+
+    versao = consulta.publicar(banco, destino)
+
+    snapshot = consulta.Snapshot(destino)
+    assert snapshot.versao == versao == armazenamento.versao(banco)
+    for nome in ['silva', 'BIA', ' eloá ', 'a', 'xyz']:
+        assert snapshot.buscar(nome) == armazenamento.buscar(banco, nome), nome
+
+
+def test_snapshot_inclui_sorteios_arquivados(banco, tmp_path):
+    salvar_exemplos(banco)
+    armazenamento.compactar(banco, dias=1, agora=datetime.now() + timedelta(days=2))
+    armazenamento.salvar(banco, [['Ana Silva', 'Fábio']], "Depois do arquivo")
+    destino = tmp_path / "snapshot.consulta"
+
+    consulta.publicar(banco, destino)
+
+    snapshot = consulta.Snapshot(destino)
+    for nome in ['silva', 'bia', 'eloá', 'a', 'fábio']:
+        assert snapshot.buscar(nome) == armazenamento.buscar(banco, nome), nome
+    assert {r['sorteio_nome'] for r in snapshot.buscar('bia')} == {"Primeiro", "Segundo"}
+
+
+def test_publicar_nao_refaz_snapshot_atual(banco, tmp_path):
+    salvar_exemplos(banco)
+    destino = tmp_path / "snapshot.consulta"
+    consulta.publicar(banco, destino)
+    identidade = consulta.Snapshot(destino).identidade
+
+    consulta.publicar(banco, destino)
+
+    assert consulta.Snapshot(destino).identidade == identidade
+
+
+def _get(servidor, caminho):
+    with urlopen(f"http://127.0.0.1:{servidor.server_port}{caminho}", timeout=5) as resposta:
+        return json.loads(resposta.read())
+
+
+def _aguardar(condicao, prazo=5):
+    limite = time.monotonic() + prazo
+    while time.monotonic() < limite:
+        try:
+            if condicao():
+                return
+        except OSError:
+            pass
+        time.sleep(0.02)
+    pytest.fail("O servidor não republicou o snapshot a tempo")
+
+
+def test_servidor_republica_quando_o_banco_muda(banco):
+    salvar_exemplos(banco)
+    servidor = consulta._Servidor(('127.0.0.1', 0), consulta.caminho_snapshot(banco), 0, banco, intervalo=0.05)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    try:
+        _aguardar(lambda: _get(servidor, '/saude')['versao'] == armazenamento.versao(banco))
+
+        # O salvamento só grava no banco; a republicação é do servidor
+        sorteio_id = armazenamento.salvar(banco, [['Fábio', 'Gil']], "Terceiro")
+        _aguardar(lambda: _get(servidor, '/saude')['versao'] == armazenamento.versao(banco))
+
+        assert [r['sorteio_id'] for r in _get(servidor, '/buscar?nome=gil')] == [sorteio_id]
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
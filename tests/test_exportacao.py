@@ -0,0 +1,29 @@
+"""Testes das tabelas exportadas (exportacao.py)"""
+import pandas as pd
+import pytest
+
+import exportacao
+
+
+@pytest.mark.parametrize('tipo_nome', ['str', 'category'])
+def test_tabela_grupos_com_nomes_fora_da_lista(tipo_nome):
+    lista = pd.DataFrame({'Nome': ['Ana', 'Bia', 'Caio', 'Ana'], 'Turma': [1, 2, 2, 1]})
+    lista['Nome'] = lista['Nome'].astype(tipo_nome)
+
+    tabela = exportacao.tabela_grupos([['Ana', 'Davi'], ['Bia', 'Caio']], lista, [['Eloá', 'Bia']])
+
+    assert tabela['Grupo'].tolist() == ['Manual 1', 'Manual 1', 'Grupo 1', 'Grupo 1', 'Grupo 2', 'Grupo 2']
+    assert tabela['Nome'].tolist() == ['Eloá', 'Bia', 'Ana', 'Davi', 'Bia', 'Caio']
+    assert tabela['Turma'].tolist() == [pd.NA, 2, 1, pd.NA, 2, 2]
+
+
+def test_tabela_sorteios():
+    lista = pd.DataFrame({'Nome': pd.Categorical(['Ana', 'Bia']), 'Turma': [1, 2]})
+    sorteios = [{'id': 3, 'nome': 'Aula', 'data': '2024-01-01 10:00:00',
+                 'grupos_automaticos': [['Ana', 'Bia']], 'grupos_manuais': [['Caio', 'Ana']]}]
+
+    tabela = exportacao.tabela_sorteios(sorteios, lista)
+
+    assert tabela.columns.tolist() == ['ID', 'Sorteio', 'Data', 'Grupo', 'Nome', 'Turma']
+    assert tabela['Nome'].tolist() == ['Caio', 'Ana', 'Ana', 'Bia']
+    assert tabela['Turma'].tolist() == [pd.NA, 1, 1, 2]
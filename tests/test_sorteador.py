@@ -0,0 +1,310 @@
+"""Testes do sorteio (sorteador.py): invariantes, cotas por turma e reparo"""
+from collections import Counter
+
+import pandas as pd
+import pytest
+
+from cadastro import CALOURO, REGRAS_PADRAO, VETERANO
+from conftest import cadastro_de, lista_aleatoria
+from sorteador import (
+    distribuir,
+    contar_repeticoes,
+    gerador,
+    indexar_grupos,
+    melhor_de_n,
+    numero_de_grupos,
+    pontuar_repeticoes,
+    reparar_grupos,
+    sortear_grupos,
+    verificar_regras,
+)
+
+
+def conferir_grupos(grupos, turma_de, tamanho_grupo, esperados):
+    """Invariantes do sorteio: todos colocados uma vez, 1 calouro por grupo,
+    limite de tamanho e ninguém sozinho"""
+    assert Counter(aluno for grupo in grupos for aluno in grupo) == Counter(esperados)
+    acima_do_limite = [grupo for grupo in grupos if len(grupo) > tamanho_grupo]
+    for grupo in grupos:
+        assert len(grupo) >= 2
+        assert any(turma_de(aluno) == CALOURO for aluno in grupo)
+    # Só grupos de 2 com total ímpar passam do limite, e em 1 aluno de um único grupo
+    if acima_do_limite:
+        assert tamanho_grupo == 2 and len(esperados) % 2 == 1
+        assert [len(grupo) for grupo in acima_do_limite] == [3]
+
+
+def test_numero_de_grupos():
+    assert numero_de_grupos(0, 4) == 0
+    assert numero_de_grupos(8, 4) == 2
+    assert numero_de_grupos(9, 4) == 3
+    assert numero_de_grupos(5, 2) == 2
+    assert numero_de_grupos(4, 3) == 2
+
+
+def test_invariantes_em_listas_aleatorias(rng):
+    for _ in range(1000):
+        tamanho_grupo = rng.randint(2, 6)
+        n_alunos = rng.randint(2, 300)
+        n_calouros = rng.randint(numero_de_grupos(n_alunos, tamanho_grupo), n_alunos)
+        por_turma = lista_aleatoria(rng, n_alunos, n_calouros, turmas_extras=rng.randint(0, 2))
+        turma_de = cadastro_de(por_turma).turma
+
+        grupos = distribuir(por_turma, tamanho_grupo, rng=gerador(rng.random()))
+
+        conferir_grupos(grupos, turma_de, tamanho_grupo, [a for nomes in por_turma.values() for a in nomes])
+        # Rodízio: os tamanhos diferem em no máximo 1
+        assert max(map(len, grupos)) - min(map(len, grupos)) <= 1
+
+
+def test_invariantes_com_um_milhao_de_alunos(rng):
+    por_turma = lista_aleatoria(rng, 1_000_000, 400_000)
+    grupos = distribuir(por_turma, 4, rng=gerador(1))
+
+    calouros = set(por_turma[CALOURO])
+    assert len(grupos) == 250_000
+    assert sum(map(len, grupos)) == 1_000_000
+    assert len({aluno for grupo in grupos for aluno in grupo}) == 1_000_000
+    assert all(len(grupo) == 4 for grupo in grupos)
+    assert all(not calouros.isdisjoint(grupo) for grupo in grupos)
+
+
+def test_sortear_grupos_pelo_dataframe(rng):
+    por_turma = lista_aleatoria(rng, 57, 20)
+    df = pd.DataFrame({
+        'Nome': [nome for nomes in por_turma.values() for nome in nomes],
+        'Turma': [turma for turma, nomes in por_turma.items() for _ in nomes],
+    })
+    manuais = [[por_turma[CALOURO][0], por_turma[VETERANO][0]]]
+
+    grupos = sortear_grupos(df, 4, manuais, rng=gerador(7))
+
+    esperados = [nome for nome in df['Nome'] if nome not in manuais[0]]
+    conferir_grupos(grupos, cadastro_de(por_turma).turma, 4, esperados)
+    # Mesmo par (semente, fluxo), mesmo sorteio
+    assert sortear_grupos(df, 4, manuais, rng=gerador(7)) == grupos
+
+
+def test_calouros_insuficientes():
+    with pytest.raises(ValueError, match="Turma 1 insuficiente"):
+        distribuir({CALOURO: ['C1'], VETERANO: ['V1', 'V2', 'V3', 'V4', 'V5']}, 2)
+
+
+def test_verificar_regras_decide_a_viabilidade(rng):
+    viaveis = 0
+    for _ in range(2000):
+        tamanho_grupo = rng.randint(2, 6)
+        contagens = {turma: rng.randint(0, 30) for turma in (1, 2, 3)}
+        if sum(contagens.values()) < 2:
+            continue
+        regras = {}
+        for turma in rng.sample([1, 2, 3], rng.randint(0, 3)):
+            minimo = rng.randint(0, 2)
+            regras[turma] = (minimo, rng.choice([None, rng.randint(0, 4)]))
+        por_turma = {turma: [f"T{turma} {i}" for i in range(n)] for turma, n in contagens.items() if n}
+        total_grupos = numero_de_grupos(sum(contagens.values()), tamanho_grupo)
+
+        problemas = verificar_regras(contagens, tamanho_grupo, regras)
+
+        inviavel = any(
+            (maximo is not None and minimo > maximo)
+            or contagens[turma] < minimo * total_grupos
+            or (maximo is not None and contagens[turma] > maximo * total_grupos)
+            for turma, (minimo, maximo) in regras.items()
+        )
+        assert bool(problemas) == inviavel
+        if problemas:
+            with pytest.raises(ValueError):
+                distribuir(por_turma, tamanho_grupo, regras, gerador(0))
+            continue
+
+        viaveis += 1
+        grupos = distribuir(por_turma, tamanho_grupo, regras, gerador(rng.random()))
+        assert len(grupos) == total_grupos
+        for grupo in grupos:
+            contagem = Counter(int(nome.split()[0][1:]) for nome in grupo)
+            for turma, (minimo, maximo) in regras.items():
+                assert contagem[turma] >= minimo
+                assert maximo is None or contagem[turma] <= maximo
+    assert viaveis > 100
+
+
+def test_regras_padrao_exigem_um_calouro():
+    assert REGRAS_PADRAO == {CALOURO: (1, None)}
+    assert verificar_regras({CALOURO: 2, VETERANO: 10}, 4) != []
+    assert verificar_regras({CALOURO: 3, VETERANO: 9}, 4) == []
+
+
+def pares_de(sorteios):
+    """Matriz simétrica de pares no formato de armazenamento.carregar_pares"""
+    pares = {}
+    for grupos in sorteios:
+        for grupo in grupos:
+            for a in grupo:
+                for b in grupo:
+                    if a != b:
+                        pares.setdefault(a, {})[b] = pares.get(a, {}).get(b, 0) + 1
+    return pares
+
+
+def test_melhor_de_n_escolhe_o_que_repete_menos(rng):
+    por_turma = lista_aleatoria(rng, 40, 12)
+    df = pd.DataFrame({
+        'Nome': [nome for nomes in por_turma.values() for nome in nomes],
+        'Turma': [turma for turma, nomes in por_turma.items() for _ in nomes],
+    })
+    cadastro = cadastro_de(por_turma)
+    pares = pares_de(distribuir(por_turma, 4, rng=gerador(s)) for s in range(5))
+
+    pontuacoes = {
+        pontuar_repeticoes(sortear_grupos(df, 4, rng=gerador(3, f"0/{i}")), cadastro, pares)
+        for i in range(20)
+    }
+    assert len(pontuacoes) > 1
+
+    grupos, pontuacao, fluxo = melhor_de_n(df, cadastro, 20, pares=pares, semente=3, fluxo='0', processos=1)
+    assert pontuacao == min(pontuacoes) == contar_repeticoes(grupos, pares)
+    assert sortear_grupos(df, 4, rng=gerador(3, fluxo)) == grupos
+    # Com candidatos suficientes para abrir o pool, o vencedor não depende do número de processos
+    assert (melhor_de_n(df, cadastro, 250, pares=pares, semente=3, fluxo='0', processos=2)
+            == melhor_de_n(df, cadastro, 250, pares=pares, semente=3, fluxo='0', processos=1))
+
+
+def test_melhor_de_n_sem_historico_fica_com_o_primeiro(rng):
+    por_turma = lista_aleatoria(rng, 20, 6)
+    df = pd.DataFrame({
+        'Nome': [nome for nomes in por_turma.values() for nome in nomes],
+        'Turma': [turma for turma, nomes in por_turma.items() for _ in nomes],
+    })
+    grupos, pontuacao, fluxo = melhor_de_n(df, cadastro_de(por_turma), 50, semente=1, fluxo='0')
+    assert (pontuacao, fluxo) == (0, '0/0')
+    assert sortear_grupos(df, 4, rng=gerador(1, '0/0')) == grupos
+
+
+def conferir_reparo(antes, grupos, movimentos, turma_de, tamanho_grupo, ausentes, novos):
+    """Invariantes do reparo: lista final, grupos válidos e movimentos fiéis"""
+    esperados = [a for grupo in antes for a in grupo if a not in ausentes] + list(novos)
+    conferir_grupos([grupo for grupo in grupos if grupo], turma_de, tamanho_grupo, esperados)
+
+    numero_antes = {a: idx + 1 for idx, grupo in enumerate(antes) for a in grupo}
+    numero_depois = {a: idx + 1 for idx, grupo in enumerate(grupos) for a in grupo}
+    mudancas = {
+        a: (numero_antes.get(a), numero_depois.get(a))
+        for a in numero_antes.keys() | numero_depois.keys()
+        if numero_antes.get(a) != numero_depois.get(a)
+    }
+    assert {m['aluno']: (m['de'], m['para']) for m in movimentos} == mudancas
+
+
+def test_reparo_em_sorteios_aleatorios(rng):
+    reparados = 0
+    for _ in range(500):
+        tamanho_grupo = rng.randint(2, 6)
+        n_alunos = rng.randint(4, 120)
+        n_calouros = rng.randint(numero_de_grupos(n_alunos, tamanho_grupo), n_alunos)
+        por_turma = lista_aleatoria(rng, n_alunos, n_calouros)
+        chegaram = lista_aleatoria(rng, rng.randint(0, 6), rng.randint(0, 3), prefixo='NOVO')
+        cadastro = cadastro_de({t: por_turma.get(t, []) + chegaram.get(t, []) for t in (CALOURO, VETERANO)})
+
+        antes = distribuir(por_turma, tamanho_grupo, rng=gerador(rng.random()))
+        copia = [list(grupo) for grupo in antes]
+        alunos = [a for grupo in antes for a in grupo]
+        ausentes = rng.sample(alunos, rng.randint(0, len(alunos) // 5))
+        novos = [a for nomes in chegaram.values() for a in nomes]
+
+        try:
+            grupos, movimentos = reparar_grupos(antes, cadastro, ausentes, novos, tamanho_grupo)
+        except ValueError:
+            continue
+
+        reparados += 1
+        assert antes == copia
+        conferir_reparo(antes, grupos, movimentos, cadastro.turma, tamanho_grupo, set(ausentes), novos)
+    assert reparados > 300
+
+
+def sem_vazios(indice):
+    """Índice sem os conjuntos de vagas que ficaram vazios, para comparar"""
+    return {**indice, 'vagas': {t: v for t, v in indice['vagas'].items() if v}}
+
+
+def test_reparos_seguidos_mantem_o_indice(rng):
+    for _ in range(100):
+        tamanho_grupo = rng.randint(2, 5)
+        n_alunos = rng.randint(6, 80)
+        por_turma = lista_aleatoria(rng, n_alunos, rng.randint(n_alunos // 2, n_alunos))
+        chegaram = lista_aleatoria(rng, 15, 8, prefixo='NOVO')
+        cadastro = cadastro_de({t: por_turma.get(t, []) + chegaram.get(t, []) for t in (CALOURO, VETERANO)})
+        fila = [a for nomes in chegaram.values() for a in nomes]
+
+        grupos = distribuir(por_turma, tamanho_grupo, rng=gerador(rng.random()))
+        indice = indexar_grupos(grupos, tamanho_grupo)
+        for _ in range(5):
+            alunos = [a for grupo in grupos for a in grupo]
+            ausentes = rng.sample(alunos, rng.randint(0, 3))
+            novos = [fila.pop() for _ in range(min(len(fila), rng.randint(0, 3)))]
+            anterior = sem_vazios(indice)
+            try:
+                reparados, movimentos = reparar_grupos(
+                    grupos, cadastro, ausentes, novos, tamanho_grupo,
+                    renumerar=rng.random() < 0.5, indice=indice,
+                )
+            except ValueError:
+                assert sem_vazios(indice) == anterior
+                break
+            conferir_reparo(grupos, reparados, movimentos, cadastro.turma, tamanho_grupo, set(ausentes), novos)
+            assert sem_vazios(indice) == sem_vazios(indexar_grupos(reparados, tamanho_grupo))
+            grupos = reparados
+
+
+def test_reparo_sem_alteracoes():
+    grupos = [['C1', 'V1'], ['C2', 'V2']]
+    cadastro = cadastro_de({CALOURO: ['C1', 'C2'], VETERANO: ['V1', 'V2']})
+    assert reparar_grupos(grupos, cadastro) == (grupos, [])
+
+
+def test_reparo_troca_calouro_para_grupo_sem_calouro():
+    grupos = [['C1', 'V1', 'V2'], ['C2', 'C3', 'V3']]
+    cadastro = cadastro_de({CALOURO: ['C1', 'C2', 'C3'], VETERANO: ['V1', 'V2', 'V3']})
+
+    novos_grupos, movimentos = reparar_grupos(grupos, cadastro, ausentes=['C1'], tamanho_grupo=3)
+
+    assert all(cadastro.tem_calouro(grupo) for grupo in novos_grupos)
+    assert {m['aluno'] for m in movimentos} == {'C1', 'C2', 'V2'}
+
+
+def test_reparo_com_grupos_de_2_usa_a_mesma_excecao_do_sorteio():
+    grupos = [['C1', 'V1'], ['C2', 'V2'], ['C3', 'V3']]
+    cadastro = cadastro_de({CALOURO: ['C1', 'C2', 'C3'], VETERANO: ['V1', 'V2', 'V3']})
+
+    novos_grupos, movimentos = reparar_grupos(grupos, cadastro, ausentes=['V1'], tamanho_grupo=2)
+
+    conferir_reparo(grupos, novos_grupos, movimentos, cadastro.turma, 2, {'V1'}, [])
+    assert sorted(map(len, filter(None, novos_grupos))) == [2, 3]
+
+
+def test_reparo_recusa_grupos_fora_das_cotas():
+    grupos = [['C1', 'V1'], ['C2', 'V2']]
+    cadastro = cadastro_de({CALOURO: ['C1', 'C2'], VETERANO: ['V1', 'V2', 'V3']})
+    regras = {CALOURO: (1, None), VETERANO: (0, 1)}
+
+    with pytest.raises(ValueError, match='cotas'):
+        reparar_grupos(grupos, cadastro, novos=['V3'], tamanho_grupo=3, regras=regras)
+    # Sem o máximo de veteranos o mesmo reparo é aceito
+    novos_grupos, _ = reparar_grupos(grupos, cadastro, novos=['V3'], tamanho_grupo=3)
+    assert sum(map(len, novos_grupos)) == 5
+
+
+def test_reparo_nao_renumera_grupos_desfeitos():
+    grupos = [['C1', 'V1'], ['C2', 'V2'], ['C3', 'V3']]
+    cadastro = cadastro_de({CALOURO: ['C1', 'C2', 'C3'], VETERANO: ['V1', 'V2', 'V3']})
+
+    novos_grupos, movimentos = reparar_grupos(grupos, cadastro, ausentes=['V1'], tamanho_grupo=2)
+
+    # O grupo 1 fica vazio e o grupo 3 continua sendo o 3
+    assert novos_grupos[0] == [] and novos_grupos[2] == ['C3', 'V3']
+    assert {m['aluno'] for m in movimentos} == {'V1', 'C1'}
+
+    renumerados, movimentos = reparar_grupos(grupos, cadastro, ausentes=['V1'], tamanho_grupo=2, renumerar=True)
+    assert [] not in renumerados
+    conferir_reparo(grupos, renumerados, movimentos, cadastro.turma, 2, {'V1'}, [])